@@ -0,0 +1,112 @@
+"""
+Calentamiento de workers y endpoint de salud.
+
+Gunicorn llama a `calentar()` en cada worker antes de que atienda tráfico (ver
+gunicorn.conf.py): importa las vistas, abre las conexiones a la base de datos y
+deja en memoria los caches e índices que de otro modo pagaría la primera
+petición. /api/health/ responde 503 hasta que el worker está caliente, así el
+health check de la plataforma solo le envía tráfico a workers listos.
+"""
+import logging
+import os
+import threading
+import time
+
+from django.db import connections
+from django.http import JsonResponse
+from django.urls import get_resolver
+
+from . import throttling
+from .db_pool import pool
+
+logger = logging.getLogger(__name__)
+
+estado = {
+    'caliente': False,
+    'iniciado': False,
+    'duracion_ms': None,
+    'errores': [],
+}
+_lock = threading.Lock()
+
+
+def _paso(nombre, funcion):
+    try:
+        funcion()
+    except Exception as e:  # Un paso fallido no debe impedir que el worker arranque
+        logger.warning('Calentamiento: falló %s: %s', nombre, e)
+        estado['errores'].append(f'{nombre}: {e}')
+
+
+def _abrir_conexiones():
+    for alias in connections:
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+
+def _cachear_consultas():
+    from reportes import consultas
+
+    consultas.categorias()
+    consultas.estadisticas()
+    # Parámetros por defecto del dashboard
+    consultas.heatmap(consultas.parametros_heatmap({}))
+
+
+def _cargar_indices():
+    from reportes import asignacion, clustering, columnar, comunas
+
+    clustering.obtener_indice().sincronizar()
+    columnar.obtener_snapshot()
+    comunas.obtener_indice()
+    asignacion.obtener_indice()
+
+
+def calentar():
+    """Deja el worker listo para atender. Se ejecuta una sola vez por proceso"""
+    with _lock:
+        if estado['iniciado']:
+            return
+        estado['iniciado'] = True
+
+        inicio = time.monotonic()
+        _paso('urls', lambda: get_resolver().url_patterns)
+        _paso('base de datos', _abrir_conexiones)
+        _paso('límites', throttling.metricas)
+        # Primero los índices: las consultas cacheadas ya usan la copia columnar
+        _paso('índices', _cargar_indices)
+        _paso('consultas', _cachear_consultas)
+
+        estado['duracion_ms'] = round((time.monotonic() - inicio) * 1000, 1)
+        estado['caliente'] = True
+        logger.info('Worker %s caliente en %s ms', os.getpid(), estado['duracion_ms'])
+
+
+def health_view(request):
+    """Readiness: 200 si la base de datos responde y el worker está caliente"""
+    if not estado['iniciado']:
+        # Sin gunicorn (runserver, tests) nadie llamó a calentar()
+        calentar()
+
+    data = {
+        'pid': os.getpid(),
+        'caliente': estado['caliente'],
+        'calentamiento_ms': estado['duracion_ms'],
+    }
+    try:
+        inicio = time.perf_counter()
+        with connections['default'].cursor() as cursor:
+            cursor.execute('SELECT 1')
+        data['db_ms'] = round((time.perf_counter() - inicio) * 1000, 2)
+    except Exception as e:
+        data.update(status='error', error=str(e))
+        return JsonResponse(data, status=503)
+
+    data['limites'] = throttling.metricas()
+    data['pool_db'] = pool.metricas()
+    from reportes import columnar
+    data['snapshot'] = columnar.memoria()
+    if estado['errores']:
+        data['advertencias'] = estado['errores']
+    data['status'] = 'ok' if estado['caliente'] else 'calentando'
+    return JsonResponse(data, status=200 if estado['caliente'] else 503)
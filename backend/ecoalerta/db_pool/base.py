@@ -0,0 +1,62 @@
+"""
+Backend PostgreSQL con pool de conexiones (ENGINE 'ecoalerta.db_pool').
+
+Es el backend estándar de Django; solo cambia de dónde sale la conexión al
+conectar (del pool del proceso, pool.py) y qué pasa al cerrarla (vuelve al
+pool). Requiere CONN_MAX_AGE 0 para que cada petición devuelva su conexión.
+"""
+from django.conf import settings
+from django.db.backends.postgresql.base import Database
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgresDatabaseWrapper
+
+from .pool import TRANSACCION_INACTIVA, PoolAgotado, estado_transaccion, obtener_pool
+
+
+class DatabaseWrapper(PostgresDatabaseWrapper):
+    usa_pool = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Pool del que salió la conexión actual (al cerrarse vuelve a ese)
+        self.pool_de_conexion = None
+
+    def pool_conexiones(self):
+        return obtener_pool(
+            self.alias,
+            tamano=settings.DB_POOL_TAMANO,
+            espera=settings.DB_POOL_ESPERA,
+            vida_maxima=settings.DB_POOL_VIDA_MAXIMA,
+            inactividad_maxima=settings.DB_POOL_INACTIVIDAD_MAXIMA,
+            verificar_tras=settings.DB_POOL_VERIFICAR_TRAS,
+        )
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool_conexiones()
+        try:
+            conexion = pool.obtener(
+                lambda: super(DatabaseWrapper, self).get_new_connection(conn_params),
+                self._verificar,
+            )
+        except PoolAgotado as e:
+            # wrap_database_errors la convierte en django.db.OperationalError
+            raise Database.OperationalError(str(e)) from e
+        self.pool_de_conexion = pool
+        return conexion
+
+    @staticmethod
+    def _verificar(conexion):
+        try:
+            with conexion.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            # Sin autocommit el SELECT abre una transacción
+            if estado_transaccion(conexion) != TRANSACCION_INACTIVA:
+                conexion.rollback()
+        except Database.Error:
+            return False
+        return True
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                conexion, self.connection = self.connection, None
+                (self.pool_de_conexion or self.pool_conexiones()).devolver(conexion)
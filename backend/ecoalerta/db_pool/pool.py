@@ -0,0 +1,338 @@
+"""
+Pool de conexiones a PostgreSQL por proceso.
+
+Cada worker de gunicorn tiene su propio pool por alias de base de datos
+(default y réplicas), con hasta DB_POOL_TAMANO conexiones abiertas. Django
+cierra la conexión al terminar cada petición; el backend (base.py) la devuelve
+aquí y la siguiente petición la reutiliza sin pagar otra vez la conexión TCP,
+el TLS y la autenticación con Azure.
+
+Al entregar una conexión:
+- Se descartan las que superaron DB_POOL_VIDA_MAXIMA desde que se abrieron o
+  DB_POOL_INACTIVIDAD_MAXIMA sin usarse (el servidor o el firewall pueden
+  haberlas cortado).
+- Se revisa su estado local (cerrada, transacción a medias) y, si estuvo libre
+  más de DB_POOL_VERIFICAR_TRAS segundos, se prueba con SELECT 1.
+- Si el pool está lleno se espera hasta DB_POOL_ESPERA segundos a que otra
+  petición devuelva una.
+
+Las conexiones no se pueden compartir entre procesos: después de un fork el
+hijo empieza con pools vacíos y nunca usa ni cierra las heredadas (cerrarlas
+terminaría la sesión del padre por el socket compartido). gunicorn.conf.py
+cierra los pools del maestro antes de crear cada worker.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Estado de transacción de libpq (PQtransactionStatus), igual en psycopg2 y psycopg 3
+TRANSACCION_INACTIVA = 0
+TRANSACCION_ABIERTA = 2
+TRANSACCION_CON_ERROR = 3
+
+
+class PoolAgotado(Exception):
+    """No se liberó ninguna conexión dentro de DB_POOL_ESPERA"""
+
+
+class _Libre:
+    __slots__ = ('conexion', 'creada', 'devuelta')
+
+    def __init__(self, conexion, creada, devuelta):
+        self.conexion = conexion
+        self.creada = creada
+        self.devuelta = devuelta
+
+
+def estado_transaccion(conexion):
+    try:
+        return int(conexion.info.transaction_status)
+    except Exception:
+        return None
+
+
+def _cerrar(conexion):
+    try:
+        conexion.close()
+    except Exception as e:
+        logger.debug('Error al cerrar conexión del pool: %s', e)
+
+
+class PoolConexiones:
+    def __init__(self, alias, tamano, espera, vida_maxima, inactividad_maxima, verificar_tras):
+        self.alias = alias
+        self.tamano = max(1, tamano)
+        self.espera = espera
+        self.vida_maxima = vida_maxima
+        self.inactividad_maxima = inactividad_maxima
+        self.verificar_tras = verificar_tras
+        self.pid = os.getpid()
+
+        self._condicion = threading.Condition()
+        self._libres = deque()  # la última devuelta al final: se reutiliza primero
+        self._en_uso = {}  # id(conexion) -> momento en que se abrió
+        self._abiertas = 0  # libres + en uso + las que se están abriendo
+
+        self.creadas = 0
+        self.reutilizadas = 0
+        self.descartadas = 0
+        self.verificaciones = 0
+        self.verificaciones_fallidas = 0
+        self.esperas = 0
+        self.agotado = 0
+        self.creacion_ms = 0.0
+        self.verificacion_ms = 0.0
+        self.espera_ms = 0.0
+        self.espera_max_ms = 0.0
+
+    # Entregar y devolver
+
+    def obtener(self, crear, verificar):
+        """
+        Conexión libre o, si hay cupo, una nueva abierta con `crear()`.
+        `verificar(conexion)` hace un viaje a la base y devuelve si responde.
+        PoolAgotado si no se obtiene ninguna dentro de `espera` segundos.
+        """
+        inicio = time.monotonic()
+        while True:
+            libre, vencidas = self._reservar(inicio)
+            for conexion in vencidas:
+                _cerrar(conexion)
+
+            if libre is None:
+                apertura = time.monotonic()
+                try:
+                    conexion = crear()
+                except BaseException:
+                    self._liberar_cupo()
+                    raise
+                with self._condicion:
+                    self.creadas += 1
+                    self.creacion_ms += (time.monotonic() - apertura) * 1000
+                    self._en_uso[id(conexion)] = apertura
+                return conexion
+
+            if self._sana(libre, verificar):
+                with self._condicion:
+                    self.reutilizadas += 1
+                    self._en_uso[id(libre.conexion)] = libre.creada
+                return libre.conexion
+
+            _cerrar(libre.conexion)
+            with self._condicion:
+                self.descartadas += 1
+            self._liberar_cupo()
+
+    def devolver(self, conexion):
+        """
+        Deja la conexión disponible para la siguiente petición. Se cierra si
+        quedó en mal estado o vencida; si no la entregó este pool (p. ej. se
+        heredó del proceso padre) no se toca.
+        """
+        with self._condicion:
+            creada = self._en_uso.pop(id(conexion), None)
+        if creada is None or os.getpid() != self.pid:
+            _heredadas.append(conexion)
+            return
+
+        ahora = time.monotonic()
+        if not self._reiniciar(conexion) or ahora - creada >= self.vida_maxima:
+            _cerrar(conexion)
+            with self._condicion:
+                self.descartadas += 1
+            self._liberar_cupo()
+            return
+
+        vencidas = []
+        with self._condicion:
+            self._libres.append(_Libre(conexion, creada, ahora))
+            # Las que llevan más tiempo sin usarse quedan al inicio
+            while self._libres and self._vencida(self._libres[0], ahora):
+                vencidas.append(self._libres.popleft().conexion)
+                self._abiertas -= 1
+                self.descartadas += 1
+            self._condicion.notify(1 + len(vencidas))
+        for vencida in vencidas:
+            _cerrar(vencida)
+
+    def cerrar(self):
+        """Cierra las conexiones libres (las que están en uso se cierran al devolverlas)"""
+        with self._condicion:
+            libres = [libre.conexion for libre in self._libres]
+            self._libres.clear()
+            self._abiertas -= len(libres)
+            # Las que vuelvan después se cierran por vida máxima
+            self.vida_maxima = 0
+            self._condicion.notify_all()
+        for conexion in libres:
+            _cerrar(conexion)
+
+    # Internos
+
+    def _reservar(self, inicio):
+        """(libre, vencidas) o (None, vencidas) si se reservó cupo para una conexión nueva"""
+        limite = inicio + self.espera
+        vencidas = []
+        espero = False
+        with self._condicion:
+            while True:
+                ahora = time.monotonic()
+                while self._libres:
+                    libre = self._libres.pop()
+                    if not self._vencida(libre, ahora):
+                        break
+                    vencidas.append(libre.conexion)
+                    self._abiertas -= 1
+                    self.descartadas += 1
+                else:
+                    libre = None
+
+                if libre is not None or self._abiertas < self.tamano:
+                    if libre is None:
+                        self._abiertas += 1
+                    if espero:
+                        self._registrar_espera(ahora - inicio)
+                    return libre, vencidas
+
+                restante = limite - ahora
+                if restante <= 0:
+                    self.agotado += 1
+                    self._registrar_espera(ahora - inicio)
+                    raise PoolAgotado(
+                        f'Pool de conexiones "{self.alias}" agotado: {self.tamano} en uso '
+                        f'por más de {self.espera:g} s (DB_POOL_TAMANO, DB_POOL_ESPERA)'
+                    )
+                if not espero:
+                    espero = True
+                    self.esperas += 1
+                self._condicion.wait(restante)
+
+    def _registrar_espera(self, segundos):
+        milisegundos = segundos * 1000
+        self.espera_ms += milisegundos
+        self.espera_max_ms = max(self.espera_max_ms, milisegundos)
+
+    def _liberar_cupo(self):
+        with self._condicion:
+            self._abiertas -= 1
+            self._condicion.notify()
+
+    def _vencida(self, libre, ahora):
+        return (
+            ahora - libre.creada >= self.vida_maxima
+            or ahora - libre.devuelta >= self.inactividad_maxima
+        )
+
+    def _sana(self, libre, verificar):
+        conexion = libre.conexion
+        if conexion.closed or estado_transaccion(conexion) != TRANSACCION_INACTIVA:
+            return False
+        if time.monotonic() - libre.devuelta < self.verificar_tras:
+            return True
+        inicio = time.monotonic()
+        sana = verificar(conexion)
+        with self._condicion:
+            self.verificaciones += 1
+            self.verificacion_ms += (time.monotonic() - inicio) * 1000
+            if not sana:
+                self.verificaciones_fallidas += 1
+        return sana
+
+    @staticmethod
+    def _reiniciar(conexion):
+        """Deshace una transacción a medias; False si la conexión no se puede reutilizar"""
+        if conexion.closed:
+            return False
+        estado = estado_transaccion(conexion)
+        if estado == TRANSACCION_INACTIVA:
+            return True
+        if estado not in (TRANSACCION_ABIERTA, TRANSACCION_CON_ERROR):
+            # Consulta en curso o conexión rota
+            return False
+        try:
+            conexion.rollback()
+        except Exception:
+            return False
+        return estado_transaccion(conexion) == TRANSACCION_INACTIVA
+
+    # Métricas
+
+    def metricas(self):
+        with self._condicion:
+            creacion_promedio = self.creacion_ms / self.creadas if self.creadas else None
+            entregas = self.creadas + self.reutilizadas
+            return {
+                'tamano': self.tamano,
+                'en_uso': len(self._en_uso),
+                'libres': len(self._libres),
+                'creadas': self.creadas,
+                'reutilizadas': self.reutilizadas,
+                'descartadas': self.descartadas,
+                'verificaciones': self.verificaciones,
+                'verificaciones_fallidas': self.verificaciones_fallidas,
+                'esperas': self.esperas,
+                'agotado': self.agotado,
+                'espera_ms_promedio': round(self.espera_ms / entregas, 3) if entregas else None,
+                'espera_ms_max': round(self.espera_max_ms, 1),
+                'creacion_ms_promedio': round(creacion_promedio, 1) if creacion_promedio is not None else None,
+                # Conexiones que no hubo que abrir, menos lo que costaron las verificaciones
+                'ahorro_estimado_ms': (
+                    round(self.reutilizadas * creacion_promedio - self.verificacion_ms)
+                    if creacion_promedio is not None else None
+                ),
+            }
+
+
+# Pools del proceso
+
+_pools = {}
+_lock = threading.Lock()
+# Conexiones heredadas del proceso padre: se guardan para que el recolector de
+# basura no las cierre (el cierre le llega al servidor por el socket del padre)
+_heredadas = []
+
+
+def obtener_pool(alias, **opciones):
+    pool = _pools.get(alias)
+    if pool is None or pool.pid != os.getpid():
+        with _lock:
+            pool = _pools.get(alias)
+            if pool is None or pool.pid != os.getpid():
+                pool = _pools[alias] = PoolConexiones(alias, **opciones)
+    return pool
+
+
+def cerrar_pools():
+    """Cierra las conexiones libres de todos los pools del proceso"""
+    for pool in list(_pools.values()):
+        if pool.pid == os.getpid():
+            pool.cerrar()
+    _pools.clear()
+
+
+def metricas():
+    """{alias: métricas} de los pools de este proceso"""
+    return {alias: pool.metricas() for alias, pool in sorted(_pools.items()) if pool.pid == os.getpid()}
+
+
+def _despues_de_fork():
+    global _lock
+    _lock = threading.Lock()
+    for pool in _pools.values():
+        _heredadas.extend(libre.conexion for libre in pool._libres)
+    _pools.clear()
+
+    # Las conexiones que el proceso padre tenía en uso siguen en los
+    # DatabaseWrapper del hilo que hizo fork
+    from django.db import connections
+    for wrapper in connections.all(initialized_only=True):
+        if getattr(wrapper, 'usa_pool', False) and wrapper.connection is not None:
+            _heredadas.append(wrapper.connection)
+            wrapper.connection = None
+
+
+os.register_at_fork(after_in_child=_despues_de_fork)
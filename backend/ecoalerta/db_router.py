@@ -0,0 +1,107 @@
+"""
+Enrutamiento de base de datos con réplicas de lectura.
+
+Las escrituras van siempre a 'default' (primaria). Las lecturas solo van a una
+réplica cuando la vista lo pide explícitamente (LecturaEnReplicaMixin o
+@lectura_en_replica) y la petición no está fijada a la primaria, ya sea porque
+escribió algo o porque la misma sesión escribió hace menos de
+REPLICA_LAG_SECONDS (cookie puesta por ReplicaPinningMiddleware).
+"""
+import contextvars
+import functools
+import inspect
+import random
+
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+PRIMARIA = 'default'
+
+_estado_peticion = contextvars.ContextVar('ecoalerta_estado_db', default=None)
+
+
+class EstadoPeticion:
+    """Estado de enrutamiento de la petición en curso"""
+    def __init__(self, fijada_a_primaria=False):
+        self.usar_replica = False
+        self.fijada_a_primaria = fijada_a_primaria
+        self.escribio = False
+
+
+def iniciar_peticion(fijada_a_primaria=False):
+    estado = EstadoPeticion(fijada_a_primaria)
+    return estado, _estado_peticion.set(estado)
+
+
+def terminar_peticion(token):
+    _estado_peticion.reset(token)
+
+
+def marcar_lectura_en_replica():
+    """Permite que la petición en curso lea desde una réplica"""
+    estado = _estado_peticion.get()
+    if estado is not None:
+        estado.usar_replica = True
+
+
+def replicas_disponibles():
+    return getattr(settings, 'REPLICA_DATABASES', [])
+
+
+class ReplicaRouter:
+    """Router que envía lecturas opt-in a réplicas y todo lo demás a la primaria"""
+
+    def db_for_read(self, model, **hints):
+        estado = _estado_peticion.get()
+        if estado is None or not estado.usar_replica or estado.fijada_a_primaria:
+            return PRIMARIA
+        replicas = replicas_disponibles()
+        if not replicas:
+            return PRIMARIA
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        estado = _estado_peticion.get()
+        if estado is not None:
+            # Leer lo recién escrito: el resto de la petición usa la primaria
+            estado.escribio = True
+            estado.fijada_a_primaria = True
+        return PRIMARIA
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primaria y réplicas contienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARIA
+
+
+class LecturaEnReplicaMixin:
+    """
+    Mixin para ViewSets: las acciones en `acciones_replica` leen desde réplica
+    cuando la petición es de solo lectura.
+    """
+    acciones_replica = ('list', 'retrieve')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and self.action in self.acciones_replica:
+            marcar_lectura_en_replica()
+
+
+def lectura_en_replica(view_func):
+    """Decorador para vistas de función de solo lectura (síncronas o async)"""
+    if inspect.iscoroutinefunction(view_func):
+        @functools.wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            if request.method in SAFE_METHODS:
+                marcar_lectura_en_replica()
+            return await view_func(request, *args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            marcar_lectura_en_replica()
+        return view_func(request, *args, **kwargs)
+    return wrapper
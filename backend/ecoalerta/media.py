@@ -0,0 +1,174 @@
+"""
+Servicio de archivos subidos (/media/) en producción.
+
+WhiteNoise solo sirve los estáticos; las fotos de los reportes se sirven con
+esta vista:
+
+- Cache-Control largo e `immutable` para los nombres derivados del contenido
+  (reportes/<sha256>.jpg, ver reportes.models.ruta_foto): el archivo de un
+  nombre nunca cambia. El resto usa MEDIA_CACHE_SECONDS.
+- ETag / If-None-Match e If-Modified-Since con 304.
+- Range de un solo tramo (206 / 416), para reanudar descargas y visores.
+- MEDIA_OFFLOAD='x-accel-redirect' (nginx) o 'x-sendfile' (Apache/lighttpd)
+  delega el envío al servidor web. Sin offload se devuelve un FileResponse
+  sobre el archivo real: gunicorn lo envía con os.sendfile (sin copiar a
+  Python), también para un tramo, porque respeta la posición del archivo y el
+  Content-Length.
+"""
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotAllowed, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+
+# <32+ hex>[_sufijo].ext: el sufijo lo agrega el storage si el nombre ya existía
+NOMBRE_POR_CONTENIDO = re.compile(r'^[0-9a-f]{32,64}(_[A-Za-z0-9]+)?\.[A-Za-z0-9]+$')
+UN_ANIO = 60 * 60 * 24 * 365
+RANGO = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class TramoArchivo:
+    """
+    Archivo abierto en `inicio` que solo deja leer `largo` bytes. Expone
+    fileno() para que el servidor pueda usar sendfile desde la posición actual.
+    """
+    def __init__(self, archivo, inicio, largo):
+        self.archivo = archivo
+        self.restante = largo
+        archivo.seek(inicio)
+
+    def read(self, tamano=-1):
+        if self.restante <= 0:
+            return b''
+        if tamano < 0 or tamano > self.restante:
+            tamano = self.restante
+        datos = self.archivo.read(tamano)
+        self.restante -= len(datos)
+        return datos
+
+    def fileno(self):
+        return self.archivo.fileno()
+
+    def tell(self):
+        return self.archivo.tell()
+
+    def seek(self, *args):
+        return self.archivo.seek(*args)
+
+    def close(self):
+        self.archivo.close()
+
+
+def cache_control(nombre):
+    if NOMBRE_POR_CONTENIDO.match(os.path.basename(nombre)):
+        return f'public, max-age={UN_ANIO}, immutable'
+    return f'public, max-age={settings.MEDIA_CACHE_SECONDS}'
+
+
+def etag_de(info):
+    return f'"{info.st_size:x}-{info.st_mtime_ns:x}"'
+
+
+def no_modificado(request, etag, mtime):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        etags = parse_etags(if_none_match)
+        # Comparación débil: W/"x" equivale a "x" para If-None-Match
+        return '*' in etags or etag in etags or etag in (e.removeprefix('W/') for e in etags)
+    desde = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return desde is not None and int(mtime) <= desde
+
+
+def tramo_pedido(request, etag, tamano):
+    """
+    (inicio, fin) inclusivos del Range pedido, None para enviar todo o
+    ValueError si el tramo no se puede satisfacer
+    """
+    encabezado = request.META.get('HTTP_RANGE', '').strip()
+    if not encabezado:
+        return None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range.strip() != etag:
+        # El cliente tiene otra versión: se envía completo
+        return None
+    match = RANGO.match(encabezado)
+    if not match or match.groups() == ('', ''):
+        # Varios tramos o sintaxis desconocida: se ignora el Range
+        return None
+    inicio, fin = match.groups()
+    if inicio == '':
+        largo = int(fin)
+        if largo == 0:
+            raise ValueError
+        return max(0, tamano - largo), tamano - 1
+    inicio = int(inicio)
+    fin = min(int(fin), tamano - 1) if fin else tamano - 1
+    if inicio >= tamano or fin < inicio:
+        raise ValueError
+    return inicio, fin
+
+
+def media_view(request, ruta):
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    try:
+        completa = safe_join(settings.MEDIA_ROOT, ruta)
+        info = os.stat(completa)
+    except (SuspiciousFileOperation, OSError, ValueError):
+        raise Http404('Archivo no encontrado')
+    if not stat.S_ISREG(info.st_mode):
+        raise Http404('Archivo no encontrado')
+
+    etag = etag_de(info)
+    encabezados = {
+        'ETag': etag,
+        'Last-Modified': http_date(info.st_mtime),
+        'Cache-Control': cache_control(ruta),
+        'Accept-Ranges': 'bytes',
+    }
+    if no_modificado(request, etag, info.st_mtime):
+        response = HttpResponseNotModified()
+        for nombre, valor in encabezados.items():
+            response[nombre] = valor
+        return response
+
+    tipo, codificacion = mimetypes.guess_type(completa)
+    tipo = tipo or 'application/octet-stream'
+
+    if settings.MEDIA_OFFLOAD:
+        # El servidor web envía el archivo (y resuelve Range por su cuenta)
+        response = HttpResponse(content_type=tipo)
+        if settings.MEDIA_OFFLOAD == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = quote(settings.MEDIA_ACCEL_PREFIX.rstrip('/') + '/' + ruta)
+        else:
+            response['X-Sendfile'] = completa
+        for nombre, valor in encabezados.items():
+            response[nombre] = valor
+        return response
+
+    try:
+        tramo = tramo_pedido(request, etag, info.st_size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{info.st_size}'
+        return response
+
+    archivo = open(completa, 'rb')
+    if tramo is None:
+        response = FileResponse(archivo, content_type=tipo)
+    else:
+        inicio, fin = tramo
+        response = FileResponse(TramoArchivo(archivo, inicio, fin - inicio + 1), content_type=tipo, status=206)
+        response['Content-Range'] = f'bytes {inicio}-{fin}/{info.st_size}'
+        response['Content-Length'] = str(fin - inicio + 1)
+    if codificacion:
+        response['Content-Encoding'] = codificacion
+    for nombre, valor in encabezados.items():
+        response[nombre] = valor
+    return response
@@ -1,9 +1,21 @@
 """
 Middleware personalizado para manejar requests en Azure App Service
 """
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
 from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_sequence, compress_string
 from django.http import HttpResponse, JsonResponse
 import logging
+import re
+import sqlite3
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se usa gzip
+    brotli = None
+
+from . import db_router, throttling
 
 logger = logging.getLogger(__name__)
 
@@ -67,3 +79,157 @@ class PreventRedirectsMiddleware(MiddlewareMixin):
         
         return response
 
+
+class LimiteCreacionMiddleware(MiddlewareMixin):
+    """
+    Token buckets por IP y global para la creación anónima de reportes
+    (ecoalerta/throttling.py). Corre antes de que la vista lea el cuerpo, así
+    una petición rechazada no llega a parsear el multipart ni a tocar la base
+    de datos.
+    """
+    def process_request(self, request):
+        if not settings.THROTTLE_HABILITADO:
+            return None
+        if request.method != 'POST' or request.path not in settings.THROTTLE_RUTAS:
+            return None
+
+        ip = throttling.ip_cliente(request)
+        try:
+            rechazo, espera = throttling.obtener_almacen().consumir(throttling.limites_creacion(ip))
+        except sqlite3.Error as e:
+            logger.warning(f"Límite de creación no disponible, se deja pasar: {e}")
+            return None
+        if rechazo is None:
+            return None
+
+        logger.warning(f"Creación rechazada por límite {rechazo.split(':', 1)[0]} (ip {ip})")
+        response = JsonResponse({
+            'error': 'Demasiados reportes en poco tiempo. Intenta nuevamente más tarde.',
+            'reintentar_en': espera,
+        }, status=429)
+        response['Retry-After'] = str(espera)
+        return response
+
+
+class ReplicaPinningMiddleware(MiddlewareMixin):
+    """
+    Fija a la base de datos primaria las peticiones que escriben y, mediante una
+    cookie, las lecturas de la misma sesión durante REPLICA_LAG_SECONDS
+    """
+    COOKIE_NAME = 'ecoalerta_primaria'
+
+    def process_request(self, request):
+        fijada = (
+            request.method not in ('GET', 'HEAD', 'OPTIONS')
+            or self.COOKIE_NAME in request.COOKIES
+        )
+        request._db_estado, request._db_token = db_router.iniciar_peticion(fijada)
+        return None
+
+    def process_response(self, request, response):
+        token = getattr(request, '_db_token', None)
+        if token is None:
+            return response
+        db_router.terminar_peticion(token)
+        if request._db_estado.escribio:
+            response.set_cookie(
+                self.COOKIE_NAME, '1',
+                max_age=settings.REPLICA_LAG_SECONDS,
+                httponly=True,
+                # El frontend está en otro dominio: en producción la cookie debe ser cross-site
+                samesite='Lax' if settings.DEBUG else 'None',
+                secure=not settings.DEBUG,
+            )
+        return response
+
+
+class CompresionAPIMiddleware(MiddlewareMixin):
+    """
+    Comprime las respuestas de /api/ con brotli o gzip según Accept-Encoding.
+    Solo comprime respuestas mayores a COMPRESSION_MIN_BYTES; las respuestas en
+    streaming se comprimen por partes sin cargarlas completas en memoria.
+    """
+    TIPOS_COMPRIMIBLES = ('application/json', 'text/', 'application/javascript')
+
+    def process_response(self, request, response):
+        if not request.path.startswith('/api/'):
+            return response
+        if response.status_code != 200 or response.has_header('Content-Encoding'):
+            return response
+        if not response.get('Content-Type', '').startswith(self.TIPOS_COMPRIMIBLES):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_BYTES:
+            return response
+        if response.streaming and getattr(response, 'is_async', False):
+            # Streaming async (ASGI): se envía sin comprimir
+            return response
+
+        codificacion = self._elegir_codificacion(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if codificacion is None:
+            return response
+
+        if response.streaming:
+            if codificacion == 'br':
+                response.streaming_content = self._brotli_sequence(response.streaming_content)
+            else:
+                response.streaming_content = compress_sequence(response.streaming_content)
+            # Ya no se conoce el tamaño final
+            del response['Content-Length']
+        else:
+            if codificacion == 'br':
+                comprimido = brotli.compress(response.content, quality=settings.BROTLI_QUALITY)
+            else:
+                comprimido = compress_string(response.content)
+            if len(comprimido) >= len(response.content):
+                return response
+            response.content = comprimido
+            response['Content-Length'] = str(len(comprimido))
+
+        # El ETag fuerte ya no corresponde al cuerpo comprimido
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+
+        response['Content-Encoding'] = codificacion
+        return response
+
+    @staticmethod
+    def _elegir_codificacion(accept_encoding):
+        """Devuelve 'br', 'gzip' o None respetando los q-values del cliente"""
+        preferencias = {}
+        for parte in accept_encoding.split(','):
+            partes = parte.strip().split(';')
+            nombre = partes[0].strip().lower()
+            if not nombre:
+                continue
+            q = 1.0
+            for param in partes[1:]:
+                match = re.match(r'\s*q=([0-9.]+)', param)
+                if match:
+                    try:
+                        q = float(match.group(1))
+                    except ValueError:
+                        q = 0.0
+            preferencias[nombre] = q
+
+        comodin = preferencias.get('*', 0.0)
+        candidatas = []
+        if brotli is not None:
+            candidatas.append(('br', preferencias.get('br', comodin)))
+        candidatas.append(('gzip', preferencias.get('gzip', comodin)))
+
+        # max() mantiene la primera en caso de empate: brotli tiene preferencia
+        codificacion, q = max(candidatas, key=lambda c: c[1])
+        return codificacion if q > 0 else None
+
+    @staticmethod
+    def _brotli_sequence(sequence):
+        compresor = brotli.Compressor(quality=settings.BROTLI_QUALITY)
+        for item in sequence:
+            datos = compresor.process(item)
+            if datos:
+                yield datos
+        yield compresor.finish()
@@ -0,0 +1,112 @@
+"""
+Paginación con conteo aproximado para tablas grandes.
+
+Un COUNT(*) exacto en PostgreSQL recorre todas las filas que cumplen el filtro.
+Aquí primero se cuenta con tope (PAGINACION_CONTEO_EXACTO_HASTA + 1 filas): si
+el resultado es chico el conteo es exacto y barato. Si supera el tope, en
+PostgreSQL se usa la estimación de filas del planificador (EXPLAIN, que sin
+filtros sale de pg_class.reltuples, mantenido por autovacuum) y el conteo se
+marca como aproximado. En otros motores se hace el conteo exacto.
+
+Las páginas se piden con una fila extra para saber si hay siguiente aunque la
+estimación se quede corta, y al llegar a la última página el total se corrige
+al valor exacto.
+"""
+import json
+
+from django.conf import settings
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+
+def estimar_filas(queryset):
+    """Filas estimadas por el planificador de PostgreSQL (o None)"""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class PaginadorAproximado(Paginator):
+    """Paginator de Django que evita el COUNT(*) completo en resultados grandes"""
+
+    aproximado = False
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, 'query'):
+            return super().count
+
+        tope = settings.PAGINACION_CONTEO_EXACTO_HASTA
+        queryset = self.object_list.order_by()
+        minimo = queryset[:tope + 1].count()
+        if minimo <= tope:
+            return minimo
+
+        estimado = estimar_filas(queryset)
+        if estimado is None:
+            return queryset.count()
+        self.aproximado = True
+        return max(estimado, minimo)
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            # Con conteo aproximado puede haber páginas más allá de num_pages
+            if not self.aproximado or int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.aproximado:
+            return super().page(number)
+
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        filas = list(self.object_list[bottom:top + 1])
+        if not filas and number > 1:
+            raise EmptyPage(self.error_messages['no_results'])
+
+        if len(filas) > self.per_page:
+            # Hay al menos una página más
+            self._corregir_total(max(self.count, top + 1), aproximado=True)
+            filas = filas[:self.per_page]
+        else:
+            # Última página: ahora se conoce el total exacto
+            self._corregir_total(bottom + len(filas), aproximado=False)
+        return self._get_page(filas, number, self)
+
+    def _corregir_total(self, total, aproximado):
+        self.__dict__['count'] = total
+        self.__dict__.pop('num_pages', None)
+        self.aproximado = aproximado
+
+
+class PaginacionAproximada(PageNumberPagination):
+    """PageNumberPagination de DRF que indica si `count` es aproximado"""
+    django_paginator_class = PaginadorAproximado
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.page.paginator.count,
+            'conteo_aproximado': self.page.paginator.aproximado,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        respuesta = super().get_paginated_response_schema(schema)
+        respuesta['properties']['conteo_aproximado'] = {'type': 'boolean'}
+        return respuesta
@@ -0,0 +1,66 @@
+"""
+Renderer y parser JSON rápidos para DRF.
+
+Usan orjson cuando está instalado y, si no, caen a las clases estándar de DRF
+(json de la librería estándar), por lo que la salida es la misma en ambos casos.
+"""
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+
+_encoder = JSONEncoder()
+
+if orjson is not None:
+    # OPT_UTC_Z: '...Z' en lugar de '+00:00', igual que el encoder de DRF
+    ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _orjson_default(obj):
+    # Tipos que orjson no conoce (Decimal, lazy strings, QuerySets...) los
+    # resuelve el encoder de DRF
+    return _encoder.default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer de DRF acelerado con orjson"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if data is None:
+            return b''
+
+        # orjson solo soporta indentación de 2 espacios: si el cliente pide
+        # otra cosa (p. ej. la API navegable) se usa el renderer estándar
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        return orjson.dumps(data, default=_orjson_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser de DRF acelerado con orjson"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            body = stream.read()
+            if encoding.lower().replace('-', '') != 'utf8':
+                body = body.decode(encoding)
+            return orjson.loads(body)
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
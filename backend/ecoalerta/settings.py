@@ -3,7 +3,9 @@ Django settings for ecoalerta project.
 """
 
 from pathlib import Path
+import json
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Cargar variables de entorno
@@ -49,7 +51,10 @@ MIDDLEWARE = [
     # SecurityMiddleware DESACTIVADO completamente - está causando bucles de redirección
     # 'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'ecoalerta.middleware.LimiteCreacionMiddleware',  # Token buckets para POST /api/reportes/
+    'ecoalerta.middleware.CompresionAPIMiddleware',  # gzip/brotli para respuestas grandes de /api/
     'ecoalerta.middleware.DisableCSRFForAPI',  # Desactivar CSRF para API
+    'ecoalerta.middleware.ReplicaPinningMiddleware',  # Lecturas en réplica / escrituras en primaria
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     # CommonMiddleware DESACTIVADO temporalmente - está causando redirecciones 301
@@ -85,29 +90,91 @@ WSGI_APPLICATION = 'ecoalerta.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Milisegundos máximos por consulta (0 = sin límite). Para migraciones o
+# comandos largos: DB_STATEMENT_TIMEOUT_MS=0 python manage.py ...
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '30000'))
+
+# Pool de conexiones por worker (ecoalerta/db_pool/): las peticiones reutilizan
+# la conexión TLS a Azure en vez de abrir una nueva cada vez. Desactivado por
+# defecto: activarlo tras pasar reportes/tests/test_db_pool.py contra el
+# PostgreSQL de destino (DB_POOL_PRUEBAS)
+DB_POOL = os.getenv('DB_POOL', 'False') == 'True'
+# Conexiones abiertas por worker y alias (cubrir DASHBOARD_HILOS + la petición)
+DB_POOL_TAMANO = int(os.getenv('DB_POOL_TAMANO', '6'))
+# Segundos que una petición espera una conexión con el pool lleno
+DB_POOL_ESPERA = float(os.getenv('DB_POOL_ESPERA', '5'))
+# Segundos de vida de una conexión y sin usarse antes de cerrarla
+DB_POOL_VIDA_MAXIMA = float(os.getenv('DB_POOL_VIDA_MAXIMA', '1800'))
+DB_POOL_INACTIVIDAD_MAXIMA = float(os.getenv('DB_POOL_INACTIVIDAD_MAXIMA', '300'))
+# Una conexión libre por más de estos segundos se prueba con SELECT 1 antes de entregarla
+DB_POOL_VERIFICAR_TRAS = float(os.getenv('DB_POOL_VERIFICAR_TRAS', '30'))
+
+DB_ENGINE_POSTGRESQL = 'ecoalerta.db_pool' if DB_POOL else 'django.db.backends.postgresql'
+DB_ENGINE_SQLITE = 'django.db.backends.sqlite3'
+# Motor de la base de datos: PostgreSQL por defecto. Para desarrollo local sin
+# servidor, DB_ENGINE=django.db.backends.sqlite3 y DB_NAME=<archivo>
+DB_ENGINE = os.getenv('DB_ENGINE', DB_ENGINE_POSTGRESQL)
+
 # Azure PostgreSQL - Usando PostgreSQL estándar (NO PostGIS)
 # IMPORTANTE: Forzar ENGINE explícitamente como PostgreSQL estándar
 # Aunque instalamos GDAL/GEOS, NO usamos PostGIS para evitar problemas
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',  # PostgreSQL estándar, NO PostGIS
+        'ENGINE': DB_ENGINE,  # PostgreSQL estándar, NO PostGIS
         'NAME': os.getenv('DB_NAME', 'postgres'),
         'USER': os.getenv('DB_USER', 'administrador'),
         'PASSWORD': os.getenv('DB_PASSWORD', 'Ecoalerta1'),
         'HOST': os.getenv('DB_HOST', 'ecoalerta.postgres.database.azure.com'),
         'PORT': os.getenv('DB_PORT', '5432'),
+        # Con el pool cada petición devuelve su conexión al terminar (debe ser 0);
+        # sin él, DB_CONN_MAX_AGE segundos de conexión persistente por hilo
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.getenv('DB_CONN_MAX_AGE', '0')),
+        'CONN_HEALTH_CHECKS': not DB_POOL,
         'OPTIONS': {
-            'sslmode': 'require',  # Azure requiere SSL
+            'sslmode': os.getenv('DB_SSLMODE', 'require'),  # Azure requiere SSL
         },
     }
 }
+if DB_ENGINE == DB_ENGINE_SQLITE:
+    DATABASES['default']['OPTIONS'] = {}
+elif DB_STATEMENT_TIMEOUT_MS:
+    DATABASES['default']['OPTIONS']['options'] = f'-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}'
 
 # Validar que el ENGINE sea correcto (forzar PostgreSQL estándar)
-if DATABASES['default']['ENGINE'] != 'django.db.backends.postgresql':
+if DATABASES['default']['ENGINE'] not in (DB_ENGINE_POSTGRESQL, DB_ENGINE_SQLITE):
     # Si por alguna razón el ENGINE no es PostgreSQL estándar, forzarlo
     print(f"⚠️ ADVERTENCIA: ENGINE no es PostgreSQL estándar: {DATABASES['default']['ENGINE']}")
-    print("   Forzando a django.db.backends.postgresql")
-    DATABASES['default']['ENGINE'] = 'django.db.backends.postgresql'
+    print(f"   Forzando a {DB_ENGINE_POSTGRESQL}")
+    DATABASES['default']['ENGINE'] = DB_ENGINE_POSTGRESQL
+
+# Réplicas de lectura (opcional). Solo las vistas marcadas con
+# LecturaEnReplicaMixin / @lectura_en_replica leen de ellas.
+# - DB_REPLICA_HOSTS=host1,host2: mismas credenciales que la primaria, otro host.
+# - DB_REPLICAS: lista JSON con la configuración de cada réplica; las claves que
+#   falten se toman de la primaria. P. ej. con SQLite en local (la réplica es
+#   una copia del archivo de la primaria):
+#   DB_REPLICAS='[{"ENGINE": "django.db.backends.sqlite3", "NAME": "replica.sqlite3"}]'
+REPLICA_DATABASES = []
+_replicas = [
+    {'HOST': host.strip()} for host in filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(','))
+] + json.loads(os.getenv('DB_REPLICAS') or '[]')
+for i, replica in enumerate(_replicas, start=1):
+    alias = f'replica_{i}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'TEST': {'MIRROR': 'default'},
+        **replica,
+    }
+    if 'OPTIONS' not in replica and DATABASES[alias]['ENGINE'] != DATABASES['default']['ENGINE']:
+        # Las opciones de la primaria (sslmode, statement_timeout) son de PostgreSQL
+        DATABASES[alias]['OPTIONS'] = {}
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['ecoalerta.db_router.ReplicaRouter']
+
+# Segundos que una sesión sigue leyendo de la primaria después de escribir
+# (debe cubrir el retraso de replicación)
+REPLICA_LAG_SECONDS = int(os.getenv('REPLICA_LAG_SECONDS', '5'))
 
 
 # Password validation
@@ -150,6 +217,13 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Servicio de /media/ desde Django (ecoalerta/media.py)
+MEDIA_SERVIR = os.getenv('MEDIA_SERVIR', 'True') == 'True'
+MEDIA_CACHE_SECONDS = int(os.getenv('MEDIA_CACHE_SECONDS', str(60 * 60 * 24)))  # Nombres no derivados del contenido
+# '' (gunicorn con sendfile), 'x-accel-redirect' (nginx) o 'x-sendfile' (Apache/lighttpd)
+MEDIA_OFFLOAD = os.getenv('MEDIA_OFFLOAD', '')
+MEDIA_ACCEL_PREFIX = os.getenv('MEDIA_ACCEL_PREFIX', '/protected-media/')  # location internal de nginx
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -157,23 +231,106 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Django REST Framework
 REST_FRAMEWORK = {
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'ecoalerta.pagination.PaginacionAproximada',
     'PAGE_SIZE': 20,
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
-    'DEFAULT_AUTHENTICATION_CLASSES': [],
-    # Desactivar autenticación por defecto para API pública
+    # Sin sesiones ni Basic: la API pública no requiere credenciales y las
+    # acciones de inspector usan el token firmado emitido en /api/auth/login/
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'reportes.authentication.TokenFirmadoAuthentication',
+    ],
+    # orjson si está instalado, con fallback al json estándar
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'ecoalerta.renderers.FastJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
-        'rest_framework.parsers.JSONParser',
+        'ecoalerta.renderers.FastJSONParser',
         'rest_framework.parsers.FormParser',
         'rest_framework.parsers.MultiPartParser',
     ],
 }
 
+# Paginación: hasta este número de resultados el conteo es exacto; sobre eso
+# se usa la estimación del planificador de PostgreSQL (ecoalerta/pagination.py)
+PAGINACION_CONTEO_EXACTO_HASTA = int(os.getenv('PAGINACION_CONTEO_EXACTO_HASTA', '10000'))
+
+# Segundos que se reutilizan categorías, estadísticas y heatmap (0 = sin cache)
+ANALYTICS_CACHE_SECONDS = int(os.getenv('ANALYTICS_CACHE_SECONDS', '30'))
+
+# Hilos que calculan en paralelo las secciones de /api/dashboard/
+DASHBOARD_HILOS = int(os.getenv('DASHBOARD_HILOS', '4'))
+
+# Compresión de respuestas de /api/ (CompresionAPIMiddleware)
+COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', '1024'))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', '4'))  # Calidad media: buen ratio con poco CPU
+
+# Índice de clusters del mapa (reportes/clustering.py)
+CLUSTER_REFRESH_SECONDS = int(os.getenv('CLUSTER_REFRESH_SECONDS', '5'))  # Cambios de otros workers
+CLUSTER_REBUILD_SECONDS = int(os.getenv('CLUSTER_REBUILD_SECONDS', '600'))  # Reconstrucción completa
+CLUSTER_MAX_PUNTOS = int(os.getenv('CLUSTER_MAX_PUNTOS', '2000'))  # Sobre esto, clusters aunque el zoom sea alto
+
+# Copia columnar de reportes en memoria para heatmap y estadísticas (reportes/columnar.py)
+SNAPSHOT_HABILITADO = os.getenv('SNAPSHOT_HABILITADO', 'True') == 'True'
+SNAPSHOT_MAX_REPORTES = int(os.getenv('SNAPSHOT_MAX_REPORTES', '2000000'))  # ~40 bytes por reporte y worker
+SNAPSHOT_REFRESH_SECONDS = int(os.getenv('SNAPSHOT_REFRESH_SECONDS', '5'))  # Cambios de otros workers
+SNAPSHOT_REBUILD_SECONDS = int(os.getenv('SNAPSHOT_REBUILD_SECONDS', '600'))  # Eliminaciones y archivo
+
+# Detección de hotspots (manage.py detectar_hotspots)
+HOTSPOT_EPS_METROS = float(os.getenv('HOTSPOT_EPS_METROS', '150'))
+HOTSPOT_MIN_REPORTES = int(os.getenv('HOTSPOT_MIN_REPORTES', '5'))
+HOTSPOT_VENTANA_DIAS = int(os.getenv('HOTSPOT_VENTANA_DIAS', '180'))
+HOTSPOT_COMPLETA_HORAS = int(os.getenv('HOTSPOT_COMPLETA_HORAS', '24'))  # Recalcular todo al menos cada tanto
+
+# Detección de duplicados al crear reportes
+DUPLICADOS_RADIO_METROS = float(os.getenv('DUPLICADOS_RADIO_METROS', '50'))
+DUPLICADOS_VENTANA_DIAS = int(os.getenv('DUPLICADOS_VENTANA_DIAS', '30'))
+
+# Prioridad de inspección (reportes/prioridad.py, manage.py actualizar_prioridades)
+PRIORIDAD_CELDA_METROS = float(os.getenv('PRIORIDAD_CELDA_METROS', '200'))  # Densidad: celdas vecinas 3x3
+PRIORIDAD_MAX_DIAS = int(os.getenv('PRIORIDAD_MAX_DIAS', '30'))  # La antigüedad deja de sumar después
+
+# Ruta diaria de inspección (reportes/rutas.py)
+RUTAS_MAX_PARADAS = int(os.getenv('RUTAS_MAX_PARADAS', '500'))  # Sobre esto se toman las de mayor prioridad
+RUTAS_MAX_SEGUNDOS = float(os.getenv('RUTAS_MAX_SEGUNDOS', '0.5'))  # Tope de la mejora 2-opt
+
+# Asignación automática de reportes a inspectores (zonas y capacidad)
+ASIGNACION_AUTOMATICA = os.getenv('ASIGNACION_AUTOMATICA', 'True') == 'True'
+ASIGNACION_ZONAS_SECONDS = int(os.getenv('ASIGNACION_ZONAS_SECONDS', '60'))
+
+# Idempotency-Key al crear reportes (reportes/idempotencia.py)
+IDEMPOTENCIA_TTL_HORAS = int(os.getenv('IDEMPOTENCIA_TTL_HORAS', '24'))
+# Cuánto espera un reintento a que termine la petición original antes del 409
+IDEMPOTENCIA_ESPERA_SEGUNDOS = float(os.getenv('IDEMPOTENCIA_ESPERA_SEGUNDOS', '3'))
+# Una reserva sin terminar más antigua que esto se considera abandonada
+IDEMPOTENCIA_EN_CURSO_SEGUNDOS = int(os.getenv('IDEMPOTENCIA_EN_CURSO_SEGUNDOS', '120'))
+
+# Archivo de reportes resueltos/cerrados (manage.py archivar_reportes)
+ARCHIVO_DIAS = int(os.getenv('ARCHIVO_DIAS', '180'))
+
+# Límites comunales (GeoJSON en WGS84) para asignar la comuna de cada reporte
+COMUNAS_GEOJSON = os.getenv('COMUNAS_GEOJSON', str(BASE_DIR / 'datos' / 'comunas.geojson'))
+# Propiedad con el nombre de la comuna (vacío: se prueban nombres comunes)
+COMUNAS_PROPIEDAD_NOMBRE = os.getenv('COMUNAS_PROPIEDAD_NOMBRE', '')
+COMUNAS_CELDA_GRADOS = float(os.getenv('COMUNAS_CELDA_GRADOS', '0.02'))
+
+# Límite de creación de reportes anónimos (ecoalerta/throttling.py). Los buckets
+# se comparten entre los workers de la instancia mediante un archivo SQLite local
+THROTTLE_HABILITADO = os.getenv('THROTTLE_HABILITADO', 'True') == 'True'
+THROTTLE_DB = os.getenv('THROTTLE_DB', os.path.join(tempfile.gettempdir(), 'ecoalerta_throttle.sqlite3'))
+THROTTLE_RUTAS = ('/api/reportes/',)
+THROTTLE_IP_CAPACIDAD = int(os.getenv('THROTTLE_IP_CAPACIDAD', '10'))  # Ráfaga por IP
+THROTTLE_IP_POR_MINUTO = float(os.getenv('THROTTLE_IP_POR_MINUTO', '5'))
+THROTTLE_GLOBAL_CAPACIDAD = int(os.getenv('THROTTLE_GLOBAL_CAPACIDAD', '100'))
+THROTTLE_GLOBAL_POR_MINUTO = float(os.getenv('THROTTLE_GLOBAL_POR_MINUTO', '300'))
+# Proxies delante de la app que agregan a X-Forwarded-For (1 en App Service, 0 en local)
+THROTTLE_PROXIES = int(os.getenv('THROTTLE_PROXIES', '0' if DEBUG else '1'))
+
+# Token de autenticación del dashboard
+AUTH_TOKEN_MAX_AGE = int(os.getenv('AUTH_TOKEN_MAX_AGE', str(60 * 60 * 8)))  # 8 horas
+AUTH_TOKEN_CACHE_SECONDS = int(os.getenv('AUTH_TOKEN_CACHE_SECONDS', '300'))
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     'http://localhost:5173',  # Vite dev server
@@ -206,6 +363,7 @@ CORS_ALLOW_HEADERS = [
     'authorization',
     'content-type',
     'dnt',
+    'idempotency-key',  # Reintentos del formulario sin duplicar reportes
     'origin',
     'user-agent',
     'x-csrftoken',
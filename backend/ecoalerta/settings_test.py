@@ -0,0 +1,30 @@
+"""
+Configuración de las pruebas: python manage.py test --settings=ecoalerta.settings_test
+
+SQLite con una réplica separada de la primaria (las pruebas del router crean
+en ella solo las tablas que necesitan, así se nota desde dónde se leyó).
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'pruebas.sqlite3',
+        # En archivo y no en memoria: las pruebas de concurrencia abren una
+        # conexión por hilo
+        'TEST': {'NAME': BASE_DIR / 'pruebas_test.sqlite3'},
+    },
+    'replica_1': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'pruebas_replica.sqlite3',
+    },
+}
+REPLICA_DATABASES = ['replica_1']
+
+THROTTLE_HABILITADO = False
+
+# La historia de migraciones no parte de una base vacía (0003 vuelve a agregar
+# columnas que 0001 ya crea): las tablas de las pruebas salen de los modelos,
+# y el índice de búsqueda lo agrega la señal post_migrate (reportes/apps.py)
+MIGRATION_MODULES = {'reportes': None}
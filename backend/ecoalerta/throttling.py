@@ -0,0 +1,159 @@
+"""
+Token buckets compartidos entre los workers de gunicorn.
+
+El estado vive en un archivo SQLite local (THROTTLE_DB) en modo WAL: todos los
+workers de la instancia ven los mismos buckets sin Redis ni otro servicio. Cada
+consulta es una transacción corta (BEGIN IMMEDIATE) que repone los tokens según
+el tiempo transcurrido, descuenta uno y suma las métricas de la misma pasada.
+
+Si el archivo no está disponible se deja pasar la petición (fail-open): el
+límite protege a la base de datos, no debe convertirse en un punto de falla.
+"""
+import logging
+import math
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+ESQUEMA = (
+    'CREATE TABLE IF NOT EXISTS bucket ('
+    ' clave TEXT PRIMARY KEY, tokens REAL NOT NULL, actualizado REAL NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS metrica ('
+    ' nombre TEXT PRIMARY KEY, valor INTEGER NOT NULL DEFAULT 0)',
+)
+
+# Cada cuántas consultas (por proceso) se borran los buckets ya llenos
+LIMPIAR_CADA = 1000
+
+
+class AlmacenBuckets:
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._local = threading.local()
+        self._consultas = 0
+
+    def _conexion(self):
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            # isolation_level=None: las transacciones se controlan a mano
+            conexion = sqlite3.connect(self.ruta, timeout=1.0, isolation_level=None)
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.execute('PRAGMA synchronous=NORMAL')
+            for sql in ESQUEMA:
+                conexion.execute(sql)
+            self._local.conexion = conexion
+        return conexion
+
+    def consumir(self, limites, ahora=None):
+        """
+        Descuenta un token de cada bucket de `limites`, una lista de
+        (clave, capacidad, tokens_por_segundo). Si alguno está vacío no se
+        descuenta nada y se devuelve (clave_rechazada, segundos_de_espera);
+        si todos tienen tokens, (None, 0).
+        """
+        ahora = time.time() if ahora is None else ahora
+        conexion = self._conexion()
+        conexion.execute('BEGIN IMMEDIATE')
+        try:
+            nuevos = []
+            rechazo = (None, 0)
+            for clave, capacidad, tasa in limites:
+                fila = conexion.execute(
+                    'SELECT tokens, actualizado FROM bucket WHERE clave = ?', (clave,)
+                ).fetchone()
+                if fila is None:
+                    tokens = capacidad
+                else:
+                    tokens = min(capacidad, fila[0] + max(0.0, ahora - fila[1]) * tasa)
+                if tokens < 1:
+                    rechazo = (clave, math.ceil((1 - tokens) / tasa) if tasa > 0 else 60)
+                    break
+                nuevos.append((clave, tokens - 1, ahora))
+
+            if rechazo[0] is None:
+                conexion.executemany(
+                    'INSERT OR REPLACE INTO bucket (clave, tokens, actualizado) VALUES (?, ?, ?)', nuevos
+                )
+                metrica = 'permitidas'
+            else:
+                metrica = 'rechazadas:' + rechazo[0].split(':', 1)[0]
+            conexion.execute(
+                'INSERT INTO metrica (nombre, valor) VALUES (?, 1) '
+                'ON CONFLICT(nombre) DO UPDATE SET valor = valor + 1', (metrica,)
+            )
+            conexion.execute('COMMIT')
+        except BaseException:
+            conexion.execute('ROLLBACK')
+            raise
+
+        self._consultas += 1
+        if self._consultas % LIMPIAR_CADA == 0:
+            self._limpiar(ahora, max(c / t for _, c, t in limites if t > 0))
+        return rechazo
+
+    def _limpiar(self, ahora, segundos_para_llenar):
+        """Un bucket sin uso durante lo que tarda en llenarse equivale a no tenerlo"""
+        try:
+            self._conexion().execute(
+                'DELETE FROM bucket WHERE actualizado < ?', (ahora - segundos_para_llenar,)
+            )
+        except sqlite3.Error as e:
+            logger.warning('No se pudieron limpiar los buckets: %s', e)
+
+    def metricas(self):
+        filas = self._conexion().execute('SELECT nombre, valor FROM metrica').fetchall()
+        return dict(filas)
+
+
+_almacen = None
+_almacen_lock = threading.Lock()
+
+
+def obtener_almacen():
+    global _almacen
+    if _almacen is None:
+        with _almacen_lock:
+            if _almacen is None:
+                _almacen = AlmacenBuckets(settings.THROTTLE_DB)
+    return _almacen
+
+
+def ip_cliente(request):
+    """
+    IP del cliente. Detrás de THROTTLE_PROXIES proxies (el front-end de App
+    Service agrega la IP real al final de X-Forwarded-For) se toma la entrada que
+    agregó el proxy más externo; las anteriores las controla el cliente.
+    """
+    proxies = settings.THROTTLE_PROXIES
+    reenviadas = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+    if proxies and len(reenviadas) >= proxies:
+        ip = reenviadas[-proxies]
+    else:
+        ip = request.META.get('REMOTE_ADDR', '')
+    # App Service incluye el puerto: "1.2.3.4:5678" o "[2001:db8::1]:5678"
+    if ip.startswith('['):
+        return ip[1:].split(']', 1)[0]
+    if ip.count(':') == 1:
+        return ip.split(':', 1)[0]
+    return ip
+
+
+def limites_creacion(ip):
+    """Buckets que debe pasar una creación de reporte: por IP y global"""
+    return [
+        (f'ip:{ip}', settings.THROTTLE_IP_CAPACIDAD, settings.THROTTLE_IP_POR_MINUTO / 60),
+        ('global:crear', settings.THROTTLE_GLOBAL_CAPACIDAD, settings.THROTTLE_GLOBAL_POR_MINUTO / 60),
+    ]
+
+
+def metricas():
+    """Contadores de peticiones permitidas y rechazadas (por tipo de bucket)"""
+    try:
+        return obtener_almacen().metricas()
+    except sqlite3.Error as e:
+        return {'error': str(e)}
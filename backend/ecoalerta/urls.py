@@ -1,10 +1,13 @@
 """
 URL configuration for ecoalerta project.
 """
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.http import JsonResponse, HttpResponse
 from django.views.decorators.http import require_http_methods
+from ecoalerta.calentamiento import health_view
+from ecoalerta.media import media_view
 
 def root_view(request):
     """Vista raíz para evitar bucles de redirección"""
@@ -27,5 +30,10 @@ def root_view(request):
 urlpatterns = [
     path('', root_view, name='root'),
     path('admin/', admin.site.urls),
+    path('api/health/', health_view, name='health'),
     path('api/', include('reportes.urls')),
 ]
+
+# Fotos de los reportes (WhiteNoise solo cubre los estáticos)
+if settings.MEDIA_SERVIR:
+    urlpatterns.append(re_path(r'^%s(?P<ruta>.+)$' % settings.MEDIA_URL.lstrip('/'), media_view, name='media'))
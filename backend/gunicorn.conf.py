@@ -0,0 +1,36 @@
+"""
+Configuración de gunicorn (startup.sh la usa con -c gunicorn.conf.py).
+
+Con preload_app el proceso maestro importa Django y la aplicación una sola vez
+y los workers la heredan al hacer fork. Cada worker luego se calienta
+(ecoalerta/calentamiento.py) antes de aceptar peticiones.
+"""
+import os
+
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+
+
+def pre_fork(server, worker):
+    # Sin preload_app el maestro no carga Django: no tiene conexiones que cerrar
+    if not server.cfg.preload_app:
+        return
+    from django.conf import settings
+    if not settings.configured:
+        return
+    # Las conexiones abiertas en el maestro no se pueden compartir entre procesos.
+    # Con el pool, close_all() las devuelve a él: cerrar_pools() las cierra de verdad
+    from django.db import connections
+    from ecoalerta.db_pool.pool import cerrar_pools
+    connections.close_all()
+    cerrar_pools()
+
+
+def post_worker_init(worker):
+    if os.getenv('WORKER_WARMUP', 'True') != 'True':
+        return
+    from ecoalerta.calentamiento import calentar, estado
+    calentar()
+    worker.log.info(
+        'Worker %s caliente en %s ms%s', worker.pid, estado['duracion_ms'],
+        f" (advertencias: {estado['errores']})" if estado['errores'] else ''
+    )
@@ -1,23 +1,42 @@
 from django.contrib import admin
-from .models import Reporte, CategoriaResiduo, Usuario, Notificacion
+from ecoalerta.pagination import PaginadorAproximado
+from . import busqueda
+from .models import (
+    Reporte, CategoriaResiduo, Usuario, Notificacion, Hotspot, EjecucionHotspots, ZonaInspector,
+    ReporteArchivado, NotificacionArchivada, ClaveIdempotencia
+)
 
 
 @admin.register(Reporte)
 class ReporteAdmin(admin.ModelAdmin):
-    list_display = ['codigo_seguimiento', 'categoria', 'estado', 'fecha_creacion', 'asignado_a']
-    list_filter = ['estado', 'categoria', 'fecha_creacion']
+    list_display = ['codigo_seguimiento', 'categoria', 'comuna', 'estado', 'prioridad', 'fecha_creacion', 'asignado_a']
+    list_filter = ['estado', 'categoria', 'comuna', 'fecha_creacion']
     search_fields = ['codigo_seguimiento', 'descripcion', 'email']
     date_hierarchy = 'fecha_creacion'
+    raw_id_fields = ['duplicado_de']
+    list_select_related = ['categoria', 'asignado_a']
+    # Evita el COUNT(*) de toda la tabla en cada página del listado
+    paginator = PaginadorAproximado
+    show_full_result_count = False
+    
+    def get_search_results(self, request, queryset, search_term):
+        """Usa el índice de texto completo en vez de icontains (LIKE '%...%')"""
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        if '@' in search_term:
+            return queryset.filter(email__iexact=search_term), False
+        return busqueda.buscar(queryset, search_term), False
     
     fieldsets = (
         ('Información Básica', {
             'fields': ('codigo_seguimiento', 'categoria', 'descripcion', 'foto', 'email')
         }),
         ('Ubicación', {
-            'fields': ('ubicacion_lat', 'ubicacion_lng', 'direccion')
+            'fields': ('ubicacion_lat', 'ubicacion_lng', 'direccion', 'comuna')
         }),
         ('Estado y Seguimiento', {
-            'fields': ('estado', 'notas_internas', 'asignado_a')
+            'fields': ('estado', 'notas_internas', 'asignado_a', 'duplicado_de', 'cantidad_duplicados')
         }),
         ('Auditoría', {
             'fields': ('creado_por', 'fecha_creacion', 'fecha_actualizacion')
@@ -27,20 +46,73 @@ class ReporteAdmin(admin.ModelAdmin):
 
 @admin.register(CategoriaResiduo)
 class CategoriaResiduoAdmin(admin.ModelAdmin):
-    list_display = ['nombre', 'descripcion']
+    list_display = ['nombre', 'severidad', 'descripcion']
+    list_editable = ['severidad']
     search_fields = ['nombre']
 
 
 @admin.register(Usuario)
 class UsuarioAdmin(admin.ModelAdmin):
-    list_display = ['username', 'email', 'tipo', 'is_staff']
+    list_display = ['username', 'email', 'tipo', 'capacidad', 'is_staff']
     list_filter = ['tipo', 'is_staff']
     search_fields = ['username', 'email']
 
 
+@admin.register(ZonaInspector)
+class ZonaInspectorAdmin(admin.ModelAdmin):
+    list_display = ['nombre', 'inspector', 'centro_lat', 'centro_lng', 'radio_metros', 'activa']
+    list_filter = ['activa', 'inspector']
+    search_fields = ['nombre', 'inspector__username']
+
+
 @admin.register(Notificacion)
 class NotificacionAdmin(admin.ModelAdmin):
     list_display = ['titulo', 'reporte', 'leido', 'fecha_creacion']
     list_filter = ['leido', 'fecha_creacion']
     search_fields = ['titulo', 'mensaje']
 
+
+@admin.register(Hotspot)
+class HotspotAdmin(admin.ModelAdmin):
+    list_display = ['id', 'centro_lat', 'centro_lng', 'cantidad_reportes', 'reportes_abiertos', 'fecha_ultimo_reporte']
+    list_filter = ['fecha_ultimo_reporte']
+    readonly_fields = ['fecha_calculo']
+
+
+@admin.register(EjecucionHotspots)
+class EjecucionHotspotsAdmin(admin.ModelAdmin):
+    list_display = ['fecha', 'completa', 'celdas_procesadas', 'hotspots_detectados', 'marca_de_agua']
+    list_filter = ['completa']
+
+
+@admin.register(ReporteArchivado)
+class ReporteArchivadoAdmin(admin.ModelAdmin):
+    list_display = ['codigo_seguimiento', 'categoria', 'estado', 'fecha_creacion', 'fecha_archivado']
+    list_filter = ['estado']
+    # Coincidencia exacta: usa el índice único en vez de LIKE '%...%'
+    search_fields = ['=codigo_seguimiento']
+    list_select_related = ['categoria']
+    paginator = PaginadorAproximado
+    show_full_result_count = False
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(NotificacionArchivada)
+class NotificacionArchivadaAdmin(admin.ModelAdmin):
+    list_display = ['titulo', 'reporte', 'leido', 'fecha_creacion']
+    raw_id_fields = ['reporte']
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(ClaveIdempotencia)
+class ClaveIdempotenciaAdmin(admin.ModelAdmin):
+    list_display = ['clave', 'estado', 'codigo_respuesta', 'fecha_creacion', 'expira']
+    list_filter = ['estado']
+    search_fields = ['=clave']
+    
+    def has_add_permission(self, request):
+        return False
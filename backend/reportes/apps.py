@@ -1,7 +1,20 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def reparar_busqueda(sender, using, **kwargs):
+    # En SQLite, las migraciones que reconstruyen reportes_reporte pierden los
+    # triggers del índice de texto completo
+    from django.db import connections
+
+    from .busqueda import reparar_indice_busqueda
+    reparar_indice_busqueda(connections[using])
 
 
 class ReportesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reportes'
 
+    def ready(self):
+        from . import signals  # noqa: F401
+        post_migrate.connect(reparar_busqueda, sender=self)
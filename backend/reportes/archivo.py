@@ -0,0 +1,98 @@
+"""
+Archivo de reportes resueltos/cerrados antiguos.
+
+Los reportes que llevan ARCHIVO_DIAS sin cambios en estado 'resuelto' o
+'cerrado' se mueven, junto a sus notificaciones, de las tablas activas a
+ReporteArchivado / NotificacionArchivada. Así los listados, el heatmap, los
+clusters y los conteos trabajan sobre la tabla activa, mucho más chica.
+
+Cada lote es una transacción corta: se bloquean (saltando las filas ocupadas)
+a lo sumo `lote` reportes, se copian y se borran. Un canónico espera a que se
+archiven todos sus duplicados, así el archivo conserva los vínculos.
+ConteoArchivo se actualiza en la misma transacción para que las estadísticas
+sigan sumando lo archivado.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.db import connections, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from . import hotspots
+from .models import (
+    ConteoArchivo, Notificacion, NotificacionArchivada, Reporte, ReporteArchivado
+)
+
+ESTADOS_ARCHIVABLES = ('resuelto', 'cerrado')
+
+CAMPOS_REPORTE = [
+    'id', 'codigo_seguimiento', 'categoria_id', 'descripcion', 'email', 'foto',
+    'ubicacion_lat', 'ubicacion_lng', 'direccion', 'comuna', 'estado', 'notas_internas',
+    'fecha_creacion', 'fecha_actualizacion', 'creado_por_id', 'asignado_a_id',
+    'duplicado_de_id', 'cantidad_duplicados',
+]
+CAMPOS_NOTIFICACION = ['id', 'reporte_id', 'titulo', 'mensaje', 'leido', 'fecha_creacion']
+
+
+def archivables(dias):
+    """Reportes que ya pueden archivarse"""
+    limite = timezone.now() - timedelta(days=dias)
+    return Reporte.objects.filter(
+        estado__in=ESTADOS_ARCHIVABLES,
+        fecha_actualizacion__lt=limite,
+    ).exclude(
+        # Un reporte canónico se queda mientras tenga duplicados en la tabla
+        # activa: al borrarlo, SET_NULL los dejaría sueltos. Se archiva en un
+        # lote posterior, cuando ya se archivaron sus duplicados
+        duplicados__isnull=False
+    )
+
+
+def archivar_lote(dias, lote):
+    """Mueve hasta `lote` reportes al archivo. Devuelve cuántos movió"""
+    with transaction.atomic():
+        candidatos = archivables(dias).order_by('id')
+        if connections[candidatos.db].features.has_select_for_update_skip_locked:
+            # No esperar por reportes que alguien está editando
+            candidatos = candidatos.select_for_update(skip_locked=True, of=('self',))
+        ids = list(candidatos.values_list('id', flat=True)[:lote])
+        if not ids:
+            return 0
+
+        reportes = list(Reporte.objects.filter(pk__in=ids).values(*CAMPOS_REPORTE))
+        ReporteArchivado.objects.bulk_create([ReporteArchivado(**r) for r in reportes])
+        NotificacionArchivada.objects.bulk_create([
+            NotificacionArchivada(**n)
+            for n in Notificacion.objects.filter(reporte_id__in=ids).values(*CAMPOS_NOTIFICACION)
+        ])
+
+        Notificacion.objects.filter(reporte_id__in=ids).delete()
+        # delete() del ORM para que las señales quiten los reportes del
+        # índice de clusters y anoten sus ubicaciones para los hotspots
+        with hotspots.retiradas_en_lote():
+            Reporte.objects.filter(pk__in=ids).delete()
+
+        sumar_conteos(Counter((r['estado'], r['comuna']) for r in reportes))
+
+        return len(ids)
+
+
+def sumar_conteos(conteos):
+    """Suma {(estado, comuna): cantidad} a ConteoArchivo"""
+    for (estado, comuna), cantidad in conteos.items():
+        conteo, _ = ConteoArchivo.objects.get_or_create(estado=estado, comuna=comuna)
+        ConteoArchivo.objects.filter(pk=conteo.pk).update(cantidad=F('cantidad') + cantidad)
+
+
+def recalcular_conteos():
+    """Rehace ConteoArchivo desde el archivo (p. ej. tras asignar comunas)"""
+    with transaction.atomic():
+        ConteoArchivo.objects.all().delete()
+        ConteoArchivo.objects.bulk_create([
+            ConteoArchivo(estado=estado, comuna=comuna, cantidad=cantidad)
+            for estado, comuna, cantidad in ReporteArchivado.objects.values_list(
+                'estado', 'comuna'
+            ).annotate(n=Count('id')).order_by()
+        ])
+
@@ -0,0 +1,176 @@
+"""
+Asignación automática de reportes a inspectores.
+
+Cada inspector cubre una o más zonas circulares (ZonaInspector) y tiene una
+capacidad máxima de reportes abiertos. Para un reporte se buscan las zonas que
+lo cubren en un índice de cuadrícula; entre sus inspectores gana el de menor
+carga relativa (abiertos / capacidad) que aún tenga cupo. Si ninguna zona lo
+cubre, o todas están llenas, se prueba con las zonas más cercanas.
+
+La asignación masiva (`manage.py reasignar_reportes`) usa el mismo motor en
+memoria, actualizando las cargas a medida que reparte, y escribe el resultado
+con un UPDATE por inspector y lote.
+"""
+import math
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Count
+
+from .models import Reporte, ZonaInspector
+
+METROS_POR_GRADO = 111320.0
+CELDA_GRADOS = 0.05  # ~5 km
+MAX_ANILLOS = 10  # Zonas a más de ~50 km no se consideran
+ESTADOS_ABIERTOS = ('nuevo', 'proceso')
+
+
+def distancia_metros(lat1, lng1, lat2, lng2):
+    """Equirectangular: suficiente a escala urbana"""
+    dy = (lat2 - lat1) * METROS_POR_GRADO
+    dx = (lng2 - lng1) * METROS_POR_GRADO * math.cos(math.radians((lat1 + lat2) / 2))
+    return math.hypot(dx, dy)
+
+
+def _celda(lat, lng):
+    return (math.floor(lat / CELDA_GRADOS), math.floor(lng / CELDA_GRADOS))
+
+
+def cargas_actuales(inspector_ids=None):
+    """{inspector_id: reportes abiertos asignados}"""
+    queryset = Reporte.objects.filter(estado__in=ESTADOS_ABIERTOS, asignado_a__isnull=False)
+    if inspector_ids is not None:
+        queryset = queryset.filter(asignado_a_id__in=inspector_ids)
+    return dict(queryset.values_list('asignado_a_id').annotate(n=Count('id')))
+
+
+class IndiceZonas:
+    """Zonas activas indexadas por las celdas que toca su círculo"""
+
+    def __init__(self):
+        self.zonas = []  # (centro_lat, centro_lng, radio, inspector_id)
+        self.capacidades = {}
+        self.celdas = defaultdict(list)
+        self.cargado_en = time.monotonic()
+
+        filas = ZonaInspector.objects.filter(
+            activa=True,
+            inspector__is_active=True,
+            inspector__tipo='inspector',
+        ).values_list('centro_lat', 'centro_lng', 'radio_metros', 'inspector_id', 'inspector__capacidad')
+        for lat, lng, radio, inspector_id, capacidad in filas:
+            indice = len(self.zonas)
+            self.zonas.append((lat, lng, radio, inspector_id))
+            self.capacidades[inspector_id] = capacidad
+
+            dlat = radio / METROS_POR_GRADO
+            dlng = radio / (METROS_POR_GRADO * max(math.cos(math.radians(lat)), 0.01))
+            i0, j0 = _celda(lat - dlat, lng - dlng)
+            i1, j1 = _celda(lat + dlat, lng + dlng)
+            for i in range(i0, i1 + 1):
+                for j in range(j0, j1 + 1):
+                    self.celdas[(i, j)].append(indice)
+
+    def candidatos(self, lat, lng):
+        """
+        Inspectores ordenados por cercanía: primero los que cubren el punto
+        (distancia 0) y luego los de las zonas más cercanas.
+        Devuelve [(distancia_al_borde, inspector_id)].
+        """
+        if not self.zonas:
+            return []
+
+        ci, cj = _celda(lat, lng)
+        vistos = set()
+        mejor = {}
+        encontrado_en = None
+        for anillo in range(MAX_ANILLOS + 1):
+            for i in range(ci - anillo, ci + anillo + 1):
+                for j in range(cj - anillo, cj + anillo + 1):
+                    if max(abs(i - ci), abs(j - cj)) != anillo:
+                        continue
+                    for indice in self.celdas.get((i, j), ()):
+                        if indice in vistos:
+                            continue
+                        vistos.add(indice)
+                        z_lat, z_lng, radio, inspector_id = self.zonas[indice]
+                        borde = max(0.0, distancia_metros(lat, lng, z_lat, z_lng) - radio)
+                        if borde < mejor.get(inspector_id, math.inf):
+                            mejor[inspector_id] = borde
+            # Un anillo más después del primero con zonas, por si una zona de la
+            # celda siguiente queda más cerca que las encontradas
+            if mejor and encontrado_en is None:
+                encontrado_en = anillo
+            if encontrado_en is not None and anillo > encontrado_en:
+                break
+
+        return sorted((borde, inspector_id) for inspector_id, borde in mejor.items())
+
+
+class MotorAsignacion:
+    """Elige inspector según zona y carga; mantiene las cargas en memoria"""
+
+    def __init__(self, indice=None, cargas=None):
+        self.indice = indice or IndiceZonas()
+        self.cargas = cargas if cargas is not None else cargas_actuales()
+
+    def elegir(self, lat, lng, candidatos=None):
+        if lat is None or lng is None:
+            return None
+
+        if candidatos is None:
+            candidatos = self.indice.candidatos(lat, lng)
+        # Entre los que cubren el punto gana el menos cargado; si no hay cupo,
+        # se pasa a las zonas cercanas en orden de distancia
+        grupos = defaultdict(list)
+        for borde, inspector_id in candidatos:
+            grupos[borde == 0.0].append((borde, inspector_id))
+
+        for cubren in (True, False):
+            opciones = [
+                (self.cargas.get(inspector_id, 0) / max(self.indice.capacidades[inspector_id], 1), borde, inspector_id)
+                for borde, inspector_id in grupos[cubren]
+                if self.cargas.get(inspector_id, 0) < self.indice.capacidades[inspector_id]
+            ]
+            if not opciones:
+                continue
+            if cubren:
+                _, _, elegido = min(opciones)
+            else:
+                _, _, elegido = min(opciones, key=lambda o: (o[1], o[0]))
+            self.cargas[elegido] = self.cargas.get(elegido, 0) + 1
+            return elegido
+        return None
+
+
+_indice = None
+_indice_lock = threading.Lock()
+
+
+def obtener_indice():
+    """Índice de zonas del worker, recargado cada ASIGNACION_ZONAS_SECONDS"""
+    global _indice
+    with _indice_lock:
+        if _indice is None or time.monotonic() - _indice.cargado_en > settings.ASIGNACION_ZONAS_SECONDS:
+            _indice = IndiceZonas()
+        return _indice
+
+
+def invalidar_indice():
+    global _indice
+    with _indice_lock:
+        _indice = None
+
+
+def elegir_inspector(lat, lng):
+    """Inspector para un reporte nuevo (o None si no hay zona con cupo)"""
+    indice = obtener_indice()
+    if not indice.zonas:
+        return None
+    candidatos = indice.candidatos(lat, lng)
+    if not candidatos:
+        return None
+    cargas = cargas_actuales([inspector_id for _, inspector_id in candidatos])
+    return MotorAsignacion(indice, cargas).elegir(lat, lng, candidatos)
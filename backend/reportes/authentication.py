@@ -0,0 +1,78 @@
+"""
+Autenticación por token firmado para el dashboard municipal.
+
+El token se emite una sola vez en /api/auth/login/ (único punto donde se paga
+el hash PBKDF2 de la contraseña). Después cada petición solo verifica la firma
+HMAC y la expiración, y obtiene el usuario desde la caché.
+"""
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare
+from rest_framework import authentication, exceptions
+
+from .models import Usuario
+
+TOKEN_SALT = 'reportes.auth.token'
+CACHE_PREFIX = 'auth_token_usuario'
+
+
+def generar_token(user):
+    """Token firmado con el id del usuario y la huella de su contraseña"""
+    return signing.dumps(
+        {'id': user.pk, 'h': user.get_session_auth_hash()},
+        salt=TOKEN_SALT,
+        compress=True,
+    )
+
+
+def obtener_usuario(user_id):
+    """Usuario desde la caché; solo va a la base de datos si no está"""
+    key = f'{CACHE_PREFIX}:{user_id}'
+    user = cache.get(key)
+    if user is None:
+        user = Usuario.objects.filter(pk=user_id, is_active=True).first()
+        if user is None:
+            return None
+        cache.set(key, user, settings.AUTH_TOKEN_CACHE_SECONDS)
+    return user
+
+
+def invalidar_cache_usuario(user_id):
+    cache.delete(f'{CACHE_PREFIX}:{user_id}')
+
+
+class TokenFirmadoAuthentication(authentication.BaseAuthentication):
+    """
+    Authorization: Bearer <token>
+    Sin header devuelve None para que las vistas públicas sigan funcionando.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = authentication.get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Header de autorización inválido')
+
+        try:
+            token = auth[1].decode()
+            payload = signing.loads(token, salt=TOKEN_SALT, max_age=settings.AUTH_TOKEN_MAX_AGE)
+        except signing.SignatureExpired:
+            raise exceptions.AuthenticationFailed('Token expirado')
+        except (signing.BadSignature, UnicodeError):
+            raise exceptions.AuthenticationFailed('Token inválido')
+
+        user = obtener_usuario(payload.get('id'))
+        if user is None:
+            raise exceptions.AuthenticationFailed('Usuario no encontrado o inactivo')
+
+        # Un cambio de contraseña invalida los tokens emitidos antes
+        if not constant_time_compare(payload.get('h', ''), user.get_session_auth_hash()):
+            raise exceptions.AuthenticationFailed('Token revocado')
+
+        return (user, token)
+
+    def authenticate_header(self, request):
+        return self.keyword
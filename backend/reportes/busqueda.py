@@ -0,0 +1,177 @@
+"""
+Búsqueda de texto completo sobre los reportes (código, dirección y descripción).
+
+- PostgreSQL: columna `busqueda` (tsvector, configuración 'spanish') mantenida
+  por un trigger e indexada con GIN. El ranking es ts_rank_cd.
+- SQLite (desarrollo local): tabla virtual FTS5 `reportes_reporte_fts`
+  sincronizada con triggers. El ranking es bm25.
+- Otros motores: icontains por término (sin índice).
+
+La columna, la tabla FTS5 y los triggers los crea la migración
+0007_busqueda_reportes; el ORM no los conoce como campos, por eso se consultan
+con RawSQL. En PostgreSQL los reportes existentes se indexan aparte, por lotes,
+con `manage.py poblar_busqueda`. En SQLite las migraciones que reconstruyen
+reportes_reporte pierden los triggers: `reparar_indice_busqueda` los recrea
+después de cada migrate (señal post_migrate, reportes/apps.py). Todos los
+términos se buscan como prefijo ("basu" encuentra "basural") y deben aparecer
+todos.
+"""
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+MAX_TERMINOS = 8
+
+
+# Vector de búsqueda de una fila; {fila} es "NEW." en el trigger o vacío
+VECTOR_POSTGRES = (
+    "setweight(to_tsvector('simple', coalesce({fila}codigo_seguimiento, '')), 'A') || "
+    "setweight(to_tsvector('spanish', coalesce({fila}direccion, '')), 'A') || "
+    "setweight(to_tsvector('spanish', coalesce({fila}descripcion, '')), 'B')"
+)
+
+POSTGRES_CREAR = [
+    "ALTER TABLE reportes_reporte ADD COLUMN IF NOT EXISTS busqueda tsvector",
+    f"""
+    CREATE OR REPLACE FUNCTION reportes_reporte_busqueda() RETURNS trigger AS $$
+    BEGIN
+        NEW.busqueda := {VECTOR_POSTGRES.format(fila='NEW.')};
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS reportes_reporte_busqueda_trg ON reportes_reporte",
+    """
+    CREATE TRIGGER reportes_reporte_busqueda_trg
+    BEFORE INSERT OR UPDATE OF codigo_seguimiento, direccion, descripcion
+    ON reportes_reporte
+    FOR EACH ROW EXECUTE PROCEDURE reportes_reporte_busqueda()
+    """,
+    "CREATE INDEX IF NOT EXISTS reporte_busqueda_gin ON reportes_reporte USING gin (busqueda)",
+]
+
+SQLITE_CREAR = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS reportes_reporte_fts USING fts5(
+        codigo_seguimiento, direccion, descripcion,
+        content='reportes_reporte', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS reportes_reporte_fts_ai AFTER INSERT ON reportes_reporte BEGIN
+        INSERT INTO reportes_reporte_fts(rowid, codigo_seguimiento, direccion, descripcion)
+        VALUES (new.id, new.codigo_seguimiento, new.direccion, new.descripcion);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS reportes_reporte_fts_ad AFTER DELETE ON reportes_reporte BEGIN
+        INSERT INTO reportes_reporte_fts(reportes_reporte_fts, rowid, codigo_seguimiento, direccion, descripcion)
+        VALUES ('delete', old.id, old.codigo_seguimiento, old.direccion, old.descripcion);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS reportes_reporte_fts_au
+    AFTER UPDATE OF codigo_seguimiento, direccion, descripcion ON reportes_reporte BEGIN
+        INSERT INTO reportes_reporte_fts(reportes_reporte_fts, rowid, codigo_seguimiento, direccion, descripcion)
+        VALUES ('delete', old.id, old.codigo_seguimiento, old.direccion, old.descripcion);
+        INSERT INTO reportes_reporte_fts(rowid, codigo_seguimiento, direccion, descripcion)
+        VALUES (new.id, new.codigo_seguimiento, new.direccion, new.descripcion);
+    END
+    """,
+]
+SQLITE_TRIGGERS = ('reportes_reporte_fts_ai', 'reportes_reporte_fts_ad', 'reportes_reporte_fts_au')
+SQLITE_RECONSTRUIR = "INSERT INTO reportes_reporte_fts(reportes_reporte_fts) VALUES ('rebuild')"
+
+
+def reparar_indice_busqueda(connection):
+    """
+    Crea lo que falte del índice de texto completo (idempotente). En SQLite, si
+    faltaban triggers, reconstruye la tabla FTS5 con el contenido actual.
+    """
+    tablas = connection.introspection.table_names()
+    if 'reportes_reporte' not in tablas:
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            columnas = connection.introspection.get_table_description(cursor, 'reportes_reporte')
+            if not any(c.name == 'busqueda' for c in columnas):
+                for sql in POSTGRES_CREAR:
+                    cursor.execute(sql)
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name IN (%s, %s, %s)",
+                SQLITE_TRIGGERS,
+            )
+            if cursor.fetchone()[0] < len(SQLITE_TRIGGERS):
+                for sql in SQLITE_CREAR:
+                    cursor.execute(sql)
+                cursor.execute(SQLITE_RECONSTRUIR)
+
+
+def poblar_lote(connection, desde, hasta):
+    """Indexa en PostgreSQL los reportes con id en [desde, hasta) que aún no lo están"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE reportes_reporte SET busqueda = {VECTOR_POSTGRES.format(fila='')} "
+            "WHERE id >= %s AND id < %s AND busqueda IS NULL",
+            [desde, hasta],
+        )
+        return cursor.rowcount
+
+
+def terminos(texto):
+    """Palabras de la consulta, sin operadores ni signos"""
+    return re.findall(r'\w+', (texto or '').lower())[:MAX_TERMINOS]
+
+
+def buscar(queryset, texto):
+    """
+    Filtra el queryset por `texto` y anota `rango_busqueda` (mayor es mejor).
+    El orden lo decide quien llama.
+    """
+    palabras = terminos(texto)
+    if not palabras:
+        return queryset.none()
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        consulta = ' & '.join(f'{p}:*' for p in palabras)
+        return queryset.filter(
+            RawSQL(
+                "reportes_reporte.busqueda @@ to_tsquery('spanish', %s)",
+                [consulta], output_field=BooleanField()
+            )
+        ).annotate(rango_busqueda=RawSQL(
+            "ts_rank_cd(reportes_reporte.busqueda, to_tsquery('spanish', %s))",
+            [consulta], output_field=FloatField()
+        ))
+
+    if vendor == 'sqlite':
+        consulta = ' '.join(f'"{p}"*' for p in palabras)
+        # Join con la tabla FTS5: bm25 solo se puede calcular dentro de la
+        # consulta MATCH, y una subconsulta correlacionada la repetiría por
+        # fila. El "+" impide que SQLite recorra primero reportes_reporte y
+        # ejecute el MATCH una vez por fila
+        return queryset.extra(
+            tables=['reportes_reporte_fts'],
+            where=[
+                '+reportes_reporte_fts.rowid = reportes_reporte.id',
+                'reportes_reporte_fts MATCH %s',
+            ],
+            params=[consulta],
+            # bm25 es menor cuanto más relevante: se invierte el signo.
+            # Pesos: código, dirección, descripción
+            select={'rango_busqueda': '-bm25(reportes_reporte_fts, 10.0, 5.0, 1.0)'},
+        )
+
+    for palabra in palabras:
+        queryset = queryset.filter(
+            Q(descripcion__icontains=palabra)
+            | Q(direccion__icontains=palabra)
+            | Q(codigo_seguimiento__icontains=palabra)
+        )
+    return queryset.annotate(rango_busqueda=Value(0.0, output_field=FloatField()))
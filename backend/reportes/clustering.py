@@ -0,0 +1,353 @@
+"""
+Índice espacial jerárquico en memoria para agrupar marcadores del mapa.
+
+Cada nivel de zoom es una cuadrícula sobre la proyección Web Mercator (la misma
+que usa Leaflet) con CELDAS_POR_TILE celdas por tile. Cada celda guarda la
+cantidad de reportes y la suma de coordenadas (para el centroide), en total y
+por estado. Los niveles gruesos se derivan del más fino al construir, y luego
+se mantienen al día incrementalmente:
+
+- En este worker, con las señales post_save / post_delete de Reporte.
+- Desde otros workers, leyendo los cambios con fecha_actualizacion posterior a
+  la última sincronización (marca de agua).
+- Las eliminaciones hechas por otros workers se recogen con una reconstrucción
+  completa cada CLUSTER_REBUILD_SECONDS.
+
+Una consulta solo recorre las celdas visibles del nivel pedido, por lo que su
+costo no depende del total de reportes. Hay un solo índice por worker: el
+filtro por estado usa el agregado de ese estado en cada celda. La marca de
+agua usa reporte_fecha_act_idx (ver la migración 0013).
+"""
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Max
+
+from .models import Reporte
+
+ZOOM_PUNTOS = 16  # Desde este zoom se devuelven reportes individuales (hasta CLUSTER_MAX_PUNTOS)
+CELDAS_POR_TILE = 4  # Tiles de 256px -> celdas de 64px (radio típico de un cluster)
+
+ESTADOS = [estado for estado, _ in Reporte.ESTADO_CHOICES]
+_INDICE_ESTADO = {estado: i for i, estado in enumerate(ESTADOS)}
+
+# Cada agregado son bloques de (cantidad, suma de latitudes, suma de
+# longitudes): el primero con todos los reportes y luego uno por estado
+_N, _SUMA_LAT, _SUMA_LNG = 0, 1, 2
+_BLOQUE = 3
+
+
+def _bloque(estado=None):
+    """Posición del bloque del estado (o del total) dentro del agregado"""
+    return 0 if estado is None else _BLOQUE * (1 + _INDICE_ESTADO[estado])
+
+
+def proyectar(lat, lng):
+    """Coordenadas Web Mercator normalizadas a [0, 1)"""
+    lat = max(min(lat, 85.0511), -85.0511)
+    x = (lng + 180.0) / 360.0
+    sin_lat = math.sin(math.radians(lat))
+    y = 0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+    return min(max(x, 0.0), 0.999999999), min(max(y, 0.0), 0.999999999)
+
+
+def _celdas_por_eje(zoom):
+    return (1 << zoom) * CELDAS_POR_TILE
+
+
+def _celda(x, y, zoom):
+    n = _celdas_por_eje(zoom)
+    return int(x * n), int(y * n)
+
+
+def _agregado_vacio():
+    return [0, 0.0, 0.0] * (1 + len(ESTADOS))
+
+
+class IndiceClusters:
+    """Índice de clusters de todos los reportes con ubicación"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        # Una sola reconstrucción a la vez; las consultas no lo esperan
+        self._construyendo = threading.Lock()
+        # Reportes quitados en este worker mientras se construye una copia nueva
+        self._quitados = None
+        self._reiniciar()
+
+    def _reiniciar(self):
+        # id -> (lat, lng, estado, categoria_id, x, y)
+        self.puntos = {}
+        # niveles[zoom][(ix, iy)] -> agregado
+        self.niveles = [dict() for _ in range(ZOOM_PUNTOS + 1)]
+        # ids por celda en el nivel más fino, para devolver puntos individuales
+        self.ids_por_celda = {}
+        self.marca_de_agua = None
+        self.ultima_sincronizacion = 0.0
+        self.ultima_reconstruccion = 0.0
+        self.construido = False
+
+    def _queryset(self):
+        return Reporte.objects.filter(
+            ubicacion_lat__isnull=False,
+            ubicacion_lng__isnull=False
+        )
+
+    # Construcción
+
+    def construir(self):
+        """
+        Arma un índice nuevo sin el lock (las consultas siguen con el anterior)
+        y lo reemplaza de una vez. Si otro hilo ya está construyendo, no hace
+        nada (salvo que aún no haya índice: entonces espera).
+        """
+        inicio = time.monotonic()
+        if not self._construyendo.acquire(blocking=not self.construido):
+            return
+        try:
+            # Otro hilo terminó una reconstrucción mientras se esperaba
+            if self.construido and self.ultima_reconstruccion >= inicio:
+                return
+            with self.lock:
+                self._quitados = set()
+            marca = Reporte.objects.aggregate(m=Max('fecha_actualizacion'))['m']
+            puntos = {}
+            niveles = [dict() for _ in range(ZOOM_PUNTOS + 1)]
+            ids_por_celda = {}
+            fino = niveles[ZOOM_PUNTOS]
+            filas = self._queryset().values_list(
+                'id', 'ubicacion_lat', 'ubicacion_lng', 'estado', 'categoria_id'
+            )
+            for pk, lat, lng, estado, categoria_id in filas.iterator(chunk_size=10000):
+                x, y = proyectar(lat, lng)
+                puntos[pk] = (lat, lng, estado, categoria_id, x, y)
+                celda = _celda(x, y, ZOOM_PUNTOS)
+                agregado = fino.get(celda)
+                if agregado is None:
+                    agregado = fino[celda] = _agregado_vacio()
+                    ids_por_celda[celda] = set()
+                self._sumar(agregado, lat, lng, estado, 1)
+                ids_por_celda[celda].add(pk)
+
+            # Niveles gruesos: cada celda padre suma sus 4 hijas
+            for zoom in range(ZOOM_PUNTOS - 1, -1, -1):
+                nivel = niveles[zoom]
+                for (ix, iy), hijo in niveles[zoom + 1].items():
+                    padre = (ix >> 1, iy >> 1)
+                    agregado = nivel.get(padre)
+                    if agregado is None:
+                        nivel[padre] = list(hijo)
+                    else:
+                        for i in range(len(agregado)):
+                            agregado[i] += hijo[i]
+
+            with self.lock:
+                self.puntos = puntos
+                self.niveles = niveles
+                self.ids_por_celda = ids_por_celda
+                self.marca_de_agua = marca
+                self.construido = True
+                # Las altas y cambios de este worker durante la carga vuelven
+                # con la marca de agua; las bajas se repiten aquí
+                for pk in self._quitados:
+                    self.quitar(pk)
+                self.ultima_reconstruccion = self.ultima_sincronizacion = time.monotonic()
+        finally:
+            with self.lock:
+                self._quitados = None
+            self._construyendo.release()
+
+    # Actualización incremental
+
+    @staticmethod
+    def _sumar(agregado, lat, lng, estado, signo):
+        bloques = (0, _bloque(estado)) if estado in _INDICE_ESTADO else (0,)
+        for b in bloques:
+            agregado[b + _N] += signo
+            agregado[b + _SUMA_LAT] += signo * lat
+            agregado[b + _SUMA_LNG] += signo * lng
+
+    def _aplicar_en_niveles(self, pk, lat, lng, estado, x, y, signo):
+        for zoom in range(ZOOM_PUNTOS + 1):
+            nivel = self.niveles[zoom]
+            celda = _celda(x, y, zoom)
+            agregado = nivel.get(celda)
+            if agregado is None:
+                agregado = nivel[celda] = _agregado_vacio()
+            self._sumar(agregado, lat, lng, estado, signo)
+            if agregado[_N] <= 0:
+                del nivel[celda]
+
+        celda = _celda(x, y, ZOOM_PUNTOS)
+        if signo > 0:
+            self.ids_por_celda.setdefault(celda, set()).add(pk)
+        else:
+            ids = self.ids_por_celda.get(celda)
+            if ids is not None:
+                ids.discard(pk)
+                if not ids:
+                    del self.ids_por_celda[celda]
+
+    def quitar(self, pk):
+        with self.lock:
+            if self._quitados is not None:
+                self._quitados.add(pk)
+            punto = self.puntos.pop(pk, None)
+            if punto is not None:
+                lat, lng, estado, _, x, y = punto
+                self._aplicar_en_niveles(pk, lat, lng, estado, x, y, -1)
+
+    def aplicar(self, pk, lat, lng, estado, categoria_id):
+        """Inserta o actualiza un reporte (o lo quita si ya no corresponde)"""
+        with self.lock:
+            if not self.construido:
+                return
+            self.quitar(pk)
+            if lat is None or lng is None:
+                return
+            x, y = proyectar(lat, lng)
+            self.puntos[pk] = (lat, lng, estado, categoria_id, x, y)
+            self._aplicar_en_niveles(pk, lat, lng, estado, x, y, 1)
+
+    def sincronizar(self):
+        """Construye, reconstruye o aplica cambios de otros workers según corresponda"""
+        ahora = time.monotonic()
+        if not self.construido or ahora - self.ultima_reconstruccion > settings.CLUSTER_REBUILD_SECONDS:
+            self.construir()
+            return
+        if ahora - self.ultima_sincronizacion < settings.CLUSTER_REFRESH_SECONDS:
+            return
+
+        # La consulta corre fuera del lock: las consultas no esperan a la base de datos
+        with self.lock:
+            if ahora - self.ultima_sincronizacion < settings.CLUSTER_REFRESH_SECONDS:
+                return
+            self.ultima_sincronizacion = ahora
+            marca = self.marca_de_agua
+        cambios = Reporte.objects.all()
+        if marca is not None:
+            cambios = cambios.filter(fecha_actualizacion__gte=marca)
+        filas = list(cambios.order_by('fecha_actualizacion').values_list(
+            'id', 'ubicacion_lat', 'ubicacion_lng', 'estado', 'categoria_id', 'fecha_actualizacion'
+        ))
+        if not filas:
+            return
+        with self.lock:
+            # Si entretanto hubo una reconstrucción, estos cambios ya están en ella
+            if self.marca_de_agua != marca:
+                return
+            for pk, lat, lng, estado, categoria_id, _ in filas:
+                self.aplicar(pk, lat, lng, estado, categoria_id)
+            self.marca_de_agua = filas[-1][-1]
+
+    # Consultas
+
+    def consultar(self, zoom, bbox, estado=None):
+        """
+        Devuelve los clusters (o puntos, en zoom alto) dentro de
+        bbox = (min_lng, min_lat, max_lng, max_lat), opcionalmente de un estado
+        """
+        self.sincronizar()
+        zoom = max(0, min(int(zoom), ZOOM_PUNTOS))
+        min_lng, min_lat, max_lng, max_lat = bbox
+        x0, y0 = proyectar(max_lat, min_lng)  # esquina superior izquierda
+        x1, y1 = proyectar(min_lat, max_lng)
+        bloque = _bloque(estado)
+
+        with self.lock:
+            celdas = self._celdas_en_bbox(zoom, x0, y0, x1, y1)
+            nivel = self.niveles[zoom]
+            if zoom >= ZOOM_PUNTOS:
+                visibles = sum(nivel[c][bloque + _N] for c in celdas)
+                if visibles <= settings.CLUSTER_MAX_PUNTOS:
+                    return self._puntos(celdas, bbox, estado)
+                # Demasiados para devolverlos uno a uno: clusters del nivel más
+                # fino en que no pasen de CLUSTER_MAX_PUNTOS
+                while zoom > 0 and len(celdas) > settings.CLUSTER_MAX_PUNTOS:
+                    zoom -= 1
+                    celdas = self._celdas_en_bbox(zoom, x0, y0, x1, y1)
+                nivel = self.niveles[zoom]
+            return [
+                self._formatear_cluster(nivel[c], estado)
+                for c in celdas
+                if nivel[c][bloque + _N] > 0
+            ]
+
+    def _celdas_en_bbox(self, zoom, x0, y0, x1, y1):
+        """Celdas ocupadas del viewport: recorre el rango o el nivel, lo que sea menor"""
+        nivel = self.niveles[zoom]
+        ix0, iy0 = _celda(x0, y0, zoom)
+        ix1, iy1 = _celda(x1, y1, zoom)
+        total = (ix1 - ix0 + 1) * (iy1 - iy0 + 1)
+        if total <= len(nivel):
+            return [
+                (ix, iy)
+                for ix in range(ix0, ix1 + 1)
+                for iy in range(iy0, iy1 + 1)
+                if (ix, iy) in nivel
+            ]
+        return [c for c in nivel if ix0 <= c[0] <= ix1 and iy0 <= c[1] <= iy1]
+
+    def _puntos(self, celdas, bbox, filtro_estado=None):
+        min_lng, min_lat, max_lng, max_lat = bbox
+        resultado = []
+        for celda in celdas:
+            for pk in self.ids_por_celda.get(celda, ()):
+                lat, lng, estado, categoria_id, _, _ = self.puntos[pk]
+                if filtro_estado and estado != filtro_estado:
+                    continue
+                if min_lat <= lat <= max_lat and min_lng <= lng <= max_lng:
+                    resultado.append({
+                        'tipo': 'punto',
+                        'id': pk,
+                        'lat': lat,
+                        'lng': lng,
+                        'estado': estado,
+                        'categoria': categoria_id,
+                    })
+        return resultado
+
+    @staticmethod
+    def _formatear_cluster(agregado, estado=None):
+        b = _bloque(estado)
+        n = agregado[b + _N]
+        return {
+            'tipo': 'cluster',
+            'cantidad': n,
+            'lat': agregado[b + _SUMA_LAT] / n,
+            'lng': agregado[b + _SUMA_LNG] / n,
+            'por_estado': {
+                e: agregado[_bloque(e) + _N]
+                for e in ([estado] if estado else ESTADOS)
+                if agregado[_bloque(e) + _N]
+            },
+        }
+
+
+_indice = None
+_indice_lock = threading.Lock()
+
+
+def obtener_indice():
+    """Índice del worker (se construye en la primera consulta)"""
+    global _indice
+    with _indice_lock:
+        if _indice is None:
+            _indice = IndiceClusters()
+    return _indice
+
+
+def notificar_cambio(reporte):
+    """Aplica un reporte guardado en este worker al índice, si ya existe"""
+    if _indice is not None:
+        _indice.aplicar(
+            reporte.pk, reporte.ubicacion_lat, reporte.ubicacion_lng,
+            reporte.estado, reporte.categoria_id
+        )
+
+
+def notificar_eliminacion(pk):
+    if _indice is not None:
+        _indice.quitar(pk)
@@ -0,0 +1,514 @@
+"""
+Copia columnar en memoria de Reporte para heatmap, bbox y conteos.
+
+Cada worker guarda id, lat, lng, estado, categoría, comuna y fecha de creación
+en arreglos tipados (NumPy si está instalado; si no, `array` de la librería
+estándar, con el mismo resultado pero recorriendo en Python). Los filtros y
+agrupaciones son operaciones vectorizadas sobre esas columnas, sin ir a la
+base de datos. Ocupa unos 40 bytes por reporte, más 4 por cada grilla de
+heatmap en caché (hasta _MAX_GRILLAS); sobre SNAPSHOT_MAX_REPORTES no se
+construye y las consultas siguen yendo a la base de datos.
+
+Se mantiene al día igual que el índice de clusters:
+
+- En este worker, con las señales post_save / post_delete de Reporte.
+- Desde otros workers, leyendo los cambios con fecha_actualizacion posterior a
+  la última sincronización (marca de agua), cada SNAPSHOT_REFRESH_SECONDS.
+- Las eliminaciones de otros workers (y el archivo) se recogen con una
+  reconstrucción completa cada SNAPSHOT_REBUILD_SECONDS.
+
+La marca de agua usa reporte_fecha_act_idx (ver la migración 0013).
+"""
+import functools
+import logging
+import math
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db.models import Max
+
+from .models import Reporte
+
+try:
+    import numpy as np
+except ImportError:  # numpy es opcional: sin él se usa array
+    np = None
+
+logger = logging.getLogger(__name__)
+
+ESTADOS = [estado for estado, _ in Reporte.ESTADO_CHOICES]
+_INDICE_ESTADO = {estado: i for i, estado in enumerate(ESTADOS)}
+
+# nombre, código de array, tipo numpy. lat/lng en float64: con float32 los puntos
+# en el borde de una celda caerían en otra distinta que con la base de datos
+COLUMNAS = (
+    ('id', 'q', 'int64'),
+    ('lat', 'd', 'float64'),
+    ('lng', 'd', 'float64'),
+    ('estado', 'b', 'int8'),  # índice en ESTADOS, -1 desconocido
+    ('categoria', 'i', 'int32'),  # -1 sin categoría
+    ('comuna', 'h', 'int16'),  # índice en Snapshot.comunas
+    ('fecha', 'q', 'int64'),  # fecha_creacion en segundos epoch
+    ('vivo', 'b', 'bool'),  # 0 = eliminado (se compacta al reconstruir)
+)
+CAMPOS = ('id', 'ubicacion_lat', 'ubicacion_lng', 'estado', 'categoria_id', 'comuna', 'fecha_creacion')
+
+# Claves de celda del heatmap: (i + DESPLAZAMIENTO) * BASE + (j + DESPLAZAMIENTO)
+_DESPLAZAMIENTO = 1 << 30
+_BASE = 1 << 31
+# Hasta esta cantidad de celdas el conteo usa bincount sobre una grilla densa
+_MAX_CELDAS_DENSAS = 1 << 22
+# Grillas (radios) del heatmap cuya celda por fila se guarda entre consultas
+_MAX_GRILLAS = 4
+
+
+class SnapshotDemasiadoGrande(Exception):
+    pass
+
+
+def _con_lock(metodo):
+    @functools.wraps(metodo)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return metodo(self, *args, **kwargs)
+    return wrapper
+
+
+class Snapshot:
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._construyendo = threading.Lock()
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self.columnas = None
+        self.n = 0
+        self.comunas = ['']
+        self._indice_comuna = {'': 0}
+        self._grillas = {}
+        self.marca_de_agua = None
+        self.ultima_sincronizacion = 0.0
+        self.ultima_reconstruccion = 0.0
+        self.construido = False
+        self.disponible = False
+
+    # Almacenamiento
+
+    def _vacias(self, capacidad=0):
+        if np is not None:
+            return {nombre: np.zeros(capacidad, dtype=tipo) for nombre, _, tipo in COLUMNAS}
+        return {nombre: array(codigo) for nombre, codigo, _ in COLUMNAS}
+
+    def _fila(self, pk, lat, lng, estado, categoria_id, comuna, fecha_creacion):
+        codigo_comuna = self._indice_comuna.get(comuna or '')
+        if codigo_comuna is None:
+            codigo_comuna = self._indice_comuna[comuna] = len(self.comunas)
+            self.comunas.append(comuna)
+        return (
+            pk,
+            math.nan if lat is None else lat,
+            math.nan if lng is None else lng,
+            _INDICE_ESTADO.get(estado, -1),
+            -1 if categoria_id is None else categoria_id,
+            codigo_comuna,
+            int(fecha_creacion.timestamp()) if fecha_creacion else 0,
+            1,
+        )
+
+    def _agregar_bloque(self, filas):
+        """Agrega filas con ids mayores a los existentes (construcción y reportes nuevos)"""
+        if not filas:
+            return
+        if self.n + len(filas) > settings.SNAPSHOT_MAX_REPORTES:
+            raise SnapshotDemasiadoGrande(self.n + len(filas))
+        if np is None:
+            for k, (nombre, _, _) in enumerate(COLUMNAS):
+                self.columnas[nombre].extend(fila[k] for fila in filas)
+            self.n += len(filas)
+            return
+
+        necesaria = self.n + len(filas)
+        capacidad = len(self.columnas['id'])
+        if necesaria > capacidad:
+            # Crecimiento geométrico acotado por SNAPSHOT_MAX_REPORTES
+            capacidad = min(max(necesaria, capacidad * 2, 1024), max(necesaria, settings.SNAPSHOT_MAX_REPORTES))
+            for nombre, _, tipo in COLUMNAS:
+                nueva = np.zeros(capacidad, dtype=tipo)
+                nueva[:self.n] = self.columnas[nombre][:self.n]
+                self.columnas[nombre] = nueva
+        for k, (nombre, _, _) in enumerate(COLUMNAS):
+            self.columnas[nombre][self.n:necesaria] = [fila[k] for fila in filas]
+        self.n = necesaria
+
+    def _posicion(self, pk):
+        """Posición del id en la columna ordenada, o None"""
+        ids = self.columnas['id']
+        if np is not None:
+            pos = int(np.searchsorted(ids[:self.n], pk))
+        else:
+            pos = bisect_left(ids, pk)
+        if pos < self.n and ids[pos] == pk:
+            return pos
+        return None
+
+    def _escribir(self, pos, fila):
+        for k, (nombre, _, _) in enumerate(COLUMNAS):
+            self.columnas[nombre][pos] = fila[k]
+
+    def _insertar_desordenadas(self, filas):
+        """Ids menores al último (transacciones que terminaron fuera de orden): poco frecuente"""
+        if self.n + len(filas) > settings.SNAPSHOT_MAX_REPORTES:
+            raise SnapshotDemasiadoGrande(self.n + len(filas))
+        filas.sort()
+        if np is None:
+            for fila in filas:
+                pos = bisect_left(self.columnas['id'], fila[0])
+                for k, (nombre, _, _) in enumerate(COLUMNAS):
+                    self.columnas[nombre].insert(pos, fila[k])
+            self.n += len(filas)
+            return
+        posiciones = np.searchsorted(self.columnas['id'][:self.n], [fila[0] for fila in filas])
+        for k, (nombre, _, tipo) in enumerate(COLUMNAS):
+            valores = np.array([fila[k] for fila in filas], dtype=tipo)
+            self.columnas[nombre] = np.insert(self.columnas[nombre][:self.n], posiciones, valores)
+        self.n += len(filas)
+
+    # Construcción y actualización
+
+    def _cargar(self):
+        marca = Reporte.objects.aggregate(m=Max('fecha_actualizacion'))['m']
+        total = Reporte.objects.count()
+        if total > settings.SNAPSHOT_MAX_REPORTES:
+            raise SnapshotDemasiadoGrande(total)
+        self.columnas = self._vacias()
+        bloque = []
+        for fila in Reporte.objects.order_by('id').values_list(*CAMPOS).iterator(chunk_size=10000):
+            bloque.append(self._fila(*fila))
+            if len(bloque) >= 10000:
+                self._agregar_bloque(bloque)
+                bloque = []
+        self._agregar_bloque(bloque)
+        self.marca_de_agua = marca
+        self.disponible = True
+
+    def construir(self):
+        """
+        Carga una copia nueva sin bloquear las consultas, que siguen usando la
+        anterior hasta el reemplazo. Si otro hilo ya está construyendo, no hace
+        nada (salvo que aún no haya copia: entonces espera).
+        """
+        if not self._construyendo.acquire(blocking=not self.construido):
+            return
+        try:
+            nuevo = Snapshot()
+            try:
+                nuevo._cargar()
+            except SnapshotDemasiadoGrande as e:
+                logger.warning(
+                    'Snapshot desactivado: %s reportes superan SNAPSHOT_MAX_REPORTES (%s)',
+                    e.args[0], settings.SNAPSHOT_MAX_REPORTES
+                )
+                nuevo = Snapshot()
+            with self.lock:
+                for atributo in (
+                    'columnas', 'n', 'comunas', '_indice_comuna', '_grillas', 'marca_de_agua', 'disponible'
+                ):
+                    setattr(self, atributo, getattr(nuevo, atributo))
+                self.ultima_reconstruccion = self.ultima_sincronizacion = time.monotonic()
+                self.construido = True
+            if self.disponible:
+                logger.info('Snapshot de reportes: %s filas, %.1f MB', self.n, self.memoria()['bytes'] / 1024 / 1024)
+        finally:
+            self._construyendo.release()
+
+    def aplicar(self, filas):
+        """Inserta o actualiza filas (tuplas en el orden de CAMPOS)"""
+        with self.lock:
+            if not self.disponible:
+                return
+            ultimo = self.columnas['id'][self.n - 1] if self.n else 0
+            nuevas, desordenadas = [], []
+            # Las celdas guardadas ya no corresponden a las columnas
+            self._grillas.clear()
+            for fila in filas:
+                fila = self._fila(*fila)
+                pos = self._posicion(fila[0])
+                if pos is not None:
+                    self._escribir(pos, fila)
+                elif fila[0] > ultimo:
+                    nuevas.append(fila)
+                else:
+                    desordenadas.append(fila)
+            try:
+                nuevas.sort()
+                self._agregar_bloque(nuevas)
+                if desordenadas:
+                    self._insertar_desordenadas(desordenadas)
+            except SnapshotDemasiadoGrande:
+                logger.warning('Snapshot desactivado: se superó SNAPSHOT_MAX_REPORTES')
+                self._reiniciar()
+                self.construido = True
+
+    def quitar(self, pk):
+        with self.lock:
+            if not self.disponible:
+                return
+            pos = self._posicion(pk)
+            if pos is not None:
+                self.columnas['vivo'][pos] = 0
+
+    def sincronizar(self):
+        """Construye, reconstruye o aplica cambios de otros workers según corresponda"""
+        ahora = time.monotonic()
+        if not self.construido or ahora - self.ultima_reconstruccion > settings.SNAPSHOT_REBUILD_SECONDS:
+            self.construir()
+            return
+        if not self.disponible or ahora - self.ultima_sincronizacion < settings.SNAPSHOT_REFRESH_SECONDS:
+            return
+
+        # La consulta corre fuera del lock: las lecturas no esperan a la base de datos
+        self.ultima_sincronizacion = ahora
+        marca = self.marca_de_agua
+        cambios = Reporte.objects.all()
+        if marca is not None:
+            cambios = cambios.filter(fecha_actualizacion__gte=marca)
+        filas = list(cambios.order_by('fecha_actualizacion').values_list(*CAMPOS, 'fecha_actualizacion'))
+        if filas:
+            with self.lock:
+                self.aplicar(fila[:-1] for fila in filas)
+                if self.marca_de_agua == marca:
+                    self.marca_de_agua = filas[-1][-1]
+
+    def memoria(self):
+        """Filas, filas vivas y bytes reservados por las columnas"""
+        with self.lock:
+            if self.columnas is None:
+                return {'filas': 0, 'vivas': 0, 'bytes': 0, 'numpy': np is not None}
+            if np is not None:
+                total = sum(columna.nbytes for columna in self.columnas.values())
+                total += sum(grilla[0].nbytes for grilla in self._grillas.values() if grilla)
+                vivas = int(np.count_nonzero(self.columnas['vivo'][:self.n]))
+            else:
+                total = sum(columna.itemsize * len(columna) for columna in self.columnas.values())
+                vivas = sum(self.columnas['vivo'])
+            return {'filas': self.n, 'vivas': vivas, 'bytes': total, 'numpy': np is not None}
+
+    # Consultas
+
+    def _codigos_filtro(self, estado, categoria_id, comuna):
+        """Códigos de los filtros, o False si alguno no puede coincidir con nada"""
+        codigo_estado = _INDICE_ESTADO.get(estado, False) if estado else None
+        codigo_comuna = self._indice_comuna.get(comuna, False) if comuna else None
+        codigo_categoria = int(categoria_id) if categoria_id else None
+        if codigo_estado is False or codigo_comuna is False:
+            return False
+        return codigo_estado, codigo_categoria, codigo_comuna
+
+    def _mascara(self, estado=None, categoria_id=None, comuna=None, bbox=None, desde=None, con_ubicacion=False):
+        """
+        Máscara booleana (numpy) de las filas que cumplen los filtros, o None si
+        son todas (sin filtros ni eliminadas): así se evita copiar las columnas
+        """
+        n = self.n
+        c = self.columnas
+        codigos = self._codigos_filtro(estado, categoria_id, comuna)
+        if codigos is False:
+            return np.zeros(n, dtype=bool)
+        codigo_estado, codigo_categoria, codigo_comuna = codigos
+        vivo = c['vivo'][:n]
+        sin_filtros = not con_ubicacion and bbox is None and desde is None and codigos == (None, None, None)
+        if sin_filtros and vivo.all():
+            return None
+        mascara = vivo.copy()
+        if codigo_estado is not None:
+            mascara &= c['estado'][:n] == codigo_estado
+        if codigo_categoria is not None:
+            mascara &= c['categoria'][:n] == codigo_categoria
+        if codigo_comuna is not None:
+            mascara &= c['comuna'][:n] == codigo_comuna
+        if desde is not None:
+            mascara &= c['fecha'][:n] >= int(desde.timestamp())
+        if bbox is not None:
+            min_lng, min_lat, max_lng, max_lat = bbox
+            lat, lng = c['lat'][:n], c['lng'][:n]
+            mascara &= (lat >= min_lat) & (lat <= max_lat) & (lng >= min_lng) & (lng <= max_lng)
+        elif con_ubicacion:
+            mascara &= ~np.isnan(c['lat'][:n])
+        return mascara
+
+    def _columna(self, nombre, mascara):
+        columna = self.columnas[nombre][:self.n]
+        return columna if mascara is None else columna[mascara]
+
+    def _filas(self, estado=None, categoria_id=None, comuna=None, bbox=None, desde=None, con_ubicacion=False):
+        """Equivalente de _mascara sin numpy: posiciones de las filas que cumplen"""
+        codigos = self._codigos_filtro(estado, categoria_id, comuna)
+        if codigos is False:
+            return
+        codigo_estado, codigo_categoria, codigo_comuna = codigos
+        desde = int(desde.timestamp()) if desde is not None else None
+        c = self.columnas
+        for k in range(self.n):
+            if not c['vivo'][k]:
+                continue
+            if codigo_estado is not None and c['estado'][k] != codigo_estado:
+                continue
+            if codigo_categoria is not None and c['categoria'][k] != codigo_categoria:
+                continue
+            if codigo_comuna is not None and c['comuna'][k] != codigo_comuna:
+                continue
+            if desde is not None and c['fecha'][k] < desde:
+                continue
+            lat, lng = c['lat'][k], c['lng'][k]
+            if bbox is not None:
+                if not (bbox[1] <= lat <= bbox[3] and bbox[0] <= lng <= bbox[2]):
+                    continue
+            elif con_ubicacion and math.isnan(lat):
+                continue
+            yield k
+
+    @_con_lock
+    def densidad(self, radio, min_densidad, estado=None, categoria_id=None, comuna=None, bbox=None, **kwargs):
+        """Reportes por celda de 2*radio grados: [(lat, lng, cantidad)] de mayor a menor"""
+        grid = radio * 2
+        filtros = dict(estado=estado, categoria_id=categoria_id, comuna=comuna, bbox=bbox, con_ubicacion=True)
+        if np is None:
+            celdas = {}
+            for k in self._filas(**filtros):
+                clave = (round(self.columnas['lat'][k] / grid), round(self.columnas['lng'][k] / grid))
+                celdas[clave] = celdas.get(clave, 0) + 1
+            resultado = [(i * grid, j * grid, n) for (i, j), n in celdas.items() if n >= min_densidad]
+            resultado.sort(key=lambda celda: celda[2], reverse=True)
+            return resultado
+
+        grilla = self._grilla(grid)
+        if grilla is None:
+            return self._densidad_dispersa(grid, min_densidad, self._mascara(**filtros))
+
+        # Grilla densa: un bincount de la celda ya calculada de cada fila
+        claves, i0, j0, ancho, celdas = grilla
+        del filtros['con_ubicacion']  # las filas sin ubicación caen en la celda extra
+        mascara = self._mascara(**filtros)
+        if mascara is not None:
+            claves = claves[mascara]
+        conteos = np.bincount(claves, minlength=celdas + 1)[:celdas]
+        claves = np.flatnonzero(conteos >= max(min_densidad, 1))
+        cantidades = conteos[claves]
+        return self._celdas_ordenadas(grid, claves // ancho + i0, claves % ancho + j0, cantidades)
+
+    def _grilla(self, grid):
+        """
+        (claves, i0, j0, ancho, celdas): celda de cada fila en la grilla densa que
+        cubre todos los reportes (las filas sin ubicación van a la celda `celdas`).
+        None si la grilla sería demasiado grande. Se guarda hasta el próximo cambio.
+        """
+        if grid in self._grillas:
+            return self._grillas[grid]
+        lat, lng = self.columnas['lat'][:self.n], self.columnas['lng'][:self.n]
+        sin_ubicacion = np.isnan(lat) | np.isnan(lng)
+        grilla = None
+        if not sin_ubicacion.all():
+            i, j = np.rint(lat / grid), np.rint(lng / grid)
+            i0, j0 = int(np.nanmin(i)), int(np.nanmin(j))
+            alto, ancho = int(np.nanmax(i)) - i0 + 1, int(np.nanmax(j)) - j0 + 1
+            if alto * ancho <= _MAX_CELDAS_DENSAS:
+                claves = (i - i0) * ancho + (j - j0)
+                claves[sin_ubicacion] = alto * ancho
+                grilla = (claves.astype(np.int32), i0, j0, ancho, alto * ancho)
+        if len(self._grillas) >= _MAX_GRILLAS:
+            del self._grillas[next(iter(self._grillas))]
+        self._grillas[grid] = grilla
+        return grilla
+
+    def _densidad_dispersa(self, grid, min_densidad, mascara):
+        """Reportes muy dispersos para una grilla densa: se agrupa ordenando"""
+        i = np.rint(self._columna('lat', mascara) / grid).astype(np.int64)
+        j = np.rint(self._columna('lng', mascara) / grid).astype(np.int64)
+        if not len(i):
+            return []
+        claves, cantidades = np.unique((i + _DESPLAZAMIENTO) * _BASE + (j + _DESPLAZAMIENTO), return_counts=True)
+        seleccion = cantidades >= min_densidad
+        claves, cantidades = claves[seleccion], cantidades[seleccion]
+        return self._celdas_ordenadas(
+            grid, claves // _BASE - _DESPLAZAMIENTO, claves % _BASE - _DESPLAZAMIENTO, cantidades
+        )
+
+    @staticmethod
+    def _celdas_ordenadas(grid, filas, columnas, cantidades):
+        orden = np.argsort(-cantidades, kind='stable')
+        return list(zip(
+            (filas[orden] * grid).tolist(), (columnas[orden] * grid).tolist(), cantidades[orden].tolist()
+        ))
+
+    @_con_lock
+    def conteos(self, por, **filtros):
+        """{valor: cantidad} agrupando por 'estado', 'categoria' o 'comuna'"""
+        if np is None:
+            conteos = {}
+            for k in self._filas(**filtros):
+                codigo = self.columnas[por][k]
+                conteos[codigo] = conteos.get(codigo, 0) + 1
+            pares = conteos.items()
+        else:
+            # +1: el código -1 (sin valor) queda en la posición 0
+            codigos = self._columna(por, self._mascara(**filtros)).astype(np.int64) + 1
+            cuentas = np.bincount(codigos)
+            pares = ((int(codigo) - 1, int(cuentas[codigo])) for codigo in np.flatnonzero(cuentas))
+        return {self._valor(por, codigo): cantidad for codigo, cantidad in pares}
+
+    @_con_lock
+    def conteos_comuna_estado(self, **filtros):
+        """{comuna: {estado: cantidad}} en una sola pasada"""
+        if np is None:
+            resultado = {}
+            for k in self._filas(**filtros):
+                comuna = self.comunas[self.columnas['comuna'][k]]
+                estado = self._valor('estado', self.columnas['estado'][k])
+                por_estado = resultado.setdefault(comuna, {})
+                por_estado[estado] = por_estado.get(estado, 0) + 1
+            return resultado
+        mascara = self._mascara(**filtros)
+        n_estados = len(ESTADOS) + 1
+        codigos = self._columna('comuna', mascara).astype(np.int64) * n_estados
+        codigos += self._columna('estado', mascara) + 1
+        cuentas = np.bincount(codigos, minlength=len(self.comunas) * n_estados).reshape(-1, n_estados)
+        resultado = {}
+        for comuna_codigo, estado_codigo in zip(*np.nonzero(cuentas)):
+            resultado.setdefault(self.comunas[comuna_codigo], {})[
+                self._valor('estado', int(estado_codigo) - 1)
+            ] = int(cuentas[comuna_codigo, estado_codigo])
+        return resultado
+
+    def _valor(self, por, codigo):
+        if por == 'estado':
+            return ESTADOS[codigo] if codigo >= 0 else None
+        if por == 'comuna':
+            return self.comunas[codigo]
+        return codigo if codigo >= 0 else None
+
+
+_snapshot = Snapshot()
+
+
+def obtener_snapshot():
+    """Snapshot sincronizado del worker, o None si está desactivado o no cabe"""
+    if not settings.SNAPSHOT_HABILITADO:
+        return None
+    _snapshot.sincronizar()
+    return _snapshot if _snapshot.disponible else None
+
+
+def notificar_cambio(reporte):
+    _snapshot.aplicar([tuple(getattr(reporte, campo) for campo in CAMPOS)])
+
+
+def notificar_eliminacion(pk):
+    _snapshot.quitar(pk)
+
+
+def memoria():
+    return _snapshot.memoria()
@@ -0,0 +1,208 @@
+"""
+Comuna de un punto a partir de un GeoJSON de límites comunales, sin GDAL.
+
+El archivo (COMUNAS_GEOJSON, en WGS84) se carga una vez por proceso en un
+índice de cuadrícula de COMUNAS_CELDA_GRADOS. Solo se guardan las celdas por
+las que pasa algún borde; el interior de una comuna no ocupa memoria:
+
+- por cada fila de celdas y comuna, los cruces de la línea central de la fila
+  con los bordes (ordenados): con un bisect se sabe si el centro de cualquier
+  celda de la fila está dentro, y
+- por cada celda de borde y comuna, los bordes que pasan por la celda.
+
+Si la celda no tiene bordes, todos sus puntos están dentro (o fuera) igual que
+el centro. Si tiene, basta contar cuántos de esos bordes cruza el segmento que
+va del punto al centro: cada cruce invierte la respuesta. Así una consulta
+revisa unos pocos bordes en vez del polígono completo, y el índice crece con
+el largo de los límites y no con la superficie.
+"""
+import json
+import logging
+import math
+import os
+import threading
+from bisect import bisect_right
+from collections import defaultdict
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+PROPIEDADES_NOMBRE = ('comuna', 'Comuna', 'COMUNA', 'NOM_COMUNA', 'nombre', 'Nombre', 'name')
+
+
+def _nombre(feature):
+    propiedades = feature.get('properties') or {}
+    clave = settings.COMUNAS_PROPIEDAD_NOMBRE
+    if clave:
+        return str(propiedades.get(clave) or '')
+    for clave in PROPIEDADES_NOMBRE:
+        if propiedades.get(clave):
+            return str(propiedades[clave])
+    return ''
+
+
+def _anillos(geometria):
+    """Anillos [(lng, lat), ...] de un Polygon o MultiPolygon (con sus hoyos)"""
+    if geometria is None:
+        return []
+    if geometria['type'] == 'Polygon':
+        poligonos = [geometria['coordinates']]
+    elif geometria['type'] == 'MultiPolygon':
+        poligonos = geometria['coordinates']
+    else:
+        return []
+    return [[(p[0], p[1]) for p in anillo] for poligono in poligonos for anillo in poligono]
+
+
+def _se_cruzan(ax, ay, bx, by, cx, cy, dx, dy):
+    """¿El segmento AB cruza el segmento CD?"""
+    d1 = (dx - cx) * (ay - cy) - (dy - cy) * (ax - cx)
+    d2 = (dx - cx) * (by - cy) - (dy - cy) * (bx - cx)
+    if (d1 > 0) == (d2 > 0):
+        return False
+    d3 = (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+    d4 = (bx - ax) * (dy - ay) - (by - ay) * (dx - ax)
+    return (d3 > 0) != (d4 > 0)
+
+
+class IndiceComunas:
+
+    def __init__(self, features, celda_grados=None):
+        self.celda_grados = celda_grados or settings.COMUNAS_CELDA_GRADOS
+        self.nombres = []
+        self.bboxes = []  # (min_lng, min_lat, max_lng, max_lat)
+        # j -> {indice_comuna: cruces de la línea central de la fila}
+        self.filas = defaultdict(dict)
+        # (i, j) -> {indice_comuna: bordes que pasan por la celda}
+        self.celdas = defaultdict(dict)
+
+        for feature in features:
+            nombre = _nombre(feature)
+            anillos = _anillos(feature.get('geometry'))
+            if nombre and anillos:
+                self._agregar(nombre, anillos)
+
+    @classmethod
+    def desde_archivo(cls, ruta):
+        with open(ruta, encoding='utf-8') as archivo:
+            datos = json.load(archivo)
+        return cls(datos.get('features', []))
+
+    def _celda(self, lng, lat):
+        return (math.floor(lng / self.celda_grados), math.floor(lat / self.celda_grados))
+
+    def _celdas_del_borde(self, x1, y1, x2, y2):
+        """Celdas que recorre el segmento, columna por columna"""
+        tam = self.celda_grados
+        # Un margen mínimo para no perder una celda por redondeo
+        margen = tam * 1e-9
+        a0, a1 = sorted((math.floor(x1 / tam), math.floor(x2 / tam)))
+        for i in range(a0, a1 + 1):
+            if x1 == x2:
+                ya, yb = y1, y2
+            else:
+                # Tramo del segmento dentro de la columna
+                xa = min(max(i * tam, min(x1, x2)), max(x1, x2))
+                xb = min(max((i + 1) * tam, min(x1, x2)), max(x1, x2))
+                ya = y1 + (xa - x1) * (y2 - y1) / (x2 - x1)
+                yb = y1 + (xb - x1) * (y2 - y1) / (x2 - x1)
+            b0 = math.floor((min(ya, yb) - margen) / tam)
+            b1 = math.floor((max(ya, yb) + margen) / tam)
+            for j in range(b0, b1 + 1):
+                yield i, j
+
+    def _agregar(self, nombre, anillos):
+        indice = len(self.nombres)
+        self.nombres.append(nombre)
+        lngs = [p[0] for anillo in anillos for p in anillo]
+        lats = [p[1] for anillo in anillos for p in anillo]
+        self.bboxes.append((min(lngs), min(lats), max(lngs), max(lats)))
+        tam = self.celda_grados
+
+        bordes_por_celda = defaultdict(list)
+        cruces_por_fila = defaultdict(list)
+        for anillo in anillos:
+            for k in range(len(anillo) - 1):
+                (x1, y1), (x2, y2) = anillo[k], anillo[k + 1]
+                if (x1, y1) == (x2, y2):
+                    continue
+                borde = (x1, y1, x2, y2)
+                celda = self._celda(x1, y1)
+                if celda == self._celda(x2, y2):
+                    # Lo habitual: un borde corto que no sale de su celda
+                    bordes_por_celda[celda].append(borde)
+                else:
+                    for celda in self._celdas_del_borde(x1, y1, x2, y2):
+                        bordes_por_celda[celda].append(borde)
+
+                # Filas cuya línea central (y = (j + 0.5) * tam) cruza el borde
+                if y1 == y2:
+                    continue
+                b0 = math.floor(min(y1, y2) / tam - 0.5)
+                b1 = math.floor(max(y1, y2) / tam - 0.5) + 1
+                for j in range(b0, b1 + 1):
+                    y = (j + 0.5) * tam
+                    if (y1 > y) != (y2 > y):
+                        cruces_por_fila[j].append(x1 + (y - y1) * (x2 - x1) / (y2 - y1))
+
+        for j, cruces in cruces_por_fila.items():
+            self.filas[j][indice] = tuple(sorted(cruces))
+        for celda, bordes in bordes_por_celda.items():
+            self.celdas[celda][indice] = tuple(bordes)
+
+    def comuna(self, lat, lng):
+        """Nombre de la comuna que contiene el punto, o None"""
+        if lat is None or lng is None:
+            return None
+        i, j = self._celda(lng, lat)
+        fila = self.filas.get(j, {})
+        celda = self.celdas.get((i, j), {})
+        if not fila and not celda:
+            return None
+
+        cx = (i + 0.5) * self.celda_grados
+        cy = (j + 0.5) * self.celda_grados
+        for indice in sorted(fila.keys() | celda.keys()):
+            min_lng, min_lat, max_lng, max_lat = self.bboxes[indice]
+            if not (min_lng <= lng <= max_lng and min_lat <= lat <= max_lat):
+                continue
+            cruces = fila.get(indice, ())
+            # El centro está dentro si a su derecha hay un número impar de cruces
+            dentro = (len(cruces) - bisect_right(cruces, cx)) % 2 == 1
+            for x1, y1, x2, y2 in celda.get(indice, ()):
+                if _se_cruzan(lng, lat, cx, cy, x1, y1, x2, y2):
+                    dentro = not dentro
+            if dentro:
+                return self.nombres[indice]
+        return None
+
+
+_indice = None
+_indice_cargado = False
+_indice_lock = threading.Lock()
+
+
+def obtener_indice():
+    """Índice del proceso, o None si no hay archivo de comunas configurado"""
+    global _indice, _indice_cargado
+    if _indice_cargado:
+        return _indice
+    with _indice_lock:
+        if not _indice_cargado:
+            ruta = settings.COMUNAS_GEOJSON
+            if ruta and os.path.exists(ruta):
+                _indice = IndiceComunas.desde_archivo(ruta)
+                logger.info('Comunas cargadas: %s desde %s', len(_indice.nombres), ruta)
+            else:
+                logger.warning('No se encontró COMUNAS_GEOJSON (%s): no se asignarán comunas', ruta)
+            _indice_cargado = True
+    return _indice
+
+
+def comuna_de(lat, lng):
+    """Comuna del punto ('' si no hay índice o cae fuera de todas)"""
+    indice = obtener_indice()
+    if indice is None:
+        return ''
+    return indice.comuna(lat, lng) or ''
@@ -0,0 +1,305 @@
+"""
+Consultas compartidas entre las vistas síncronas (DRF) y las asíncronas.
+
+Categorías, estadísticas y heatmap se guardan ANALYTICS_CACHE_SECONDS en el
+cache del proceso; el calentamiento de cada worker (ecoalerta/calentamiento.py)
+los deja listos antes de recibir tráfico. Estadísticas y heatmap se calculan
+sobre la copia columnar en memoria (columnar.py) cuando está disponible.
+"""
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+
+from . import columnar
+from .models import CategoriaResiduo, ConteoArchivo, Reporte, ReporteArchivado
+
+CLAVE_CATEGORIAS = 'consultas:categorias'
+CLAVE_ESTADISTICAS = 'consultas:estadisticas'
+CLAVE_ESTADISTICAS_COMUNA = 'consultas:estadisticas:comuna'
+
+
+def en_cache(clave, calcular):
+    """Resultado de `calcular()`, reutilizado durante ANALYTICS_CACHE_SECONDS"""
+    if not settings.ANALYTICS_CACHE_SECONDS:
+        return calcular()
+    data = cache.get(clave)
+    if data is None:
+        data = calcular()
+        cache.set(clave, data, settings.ANALYTICS_CACHE_SECONDS)
+    return data
+
+
+async def en_cache_async(clave, calcular):
+    """Igual que en_cache, con `calcular` asíncrona"""
+    if not settings.ANALYTICS_CACHE_SECONDS:
+        return await calcular()
+    data = await cache.aget(clave)
+    if data is None:
+        data = await calcular()
+        await cache.aset(clave, data, settings.ANALYTICS_CACHE_SECONDS)
+    return data
+
+
+def categorias():
+    return en_cache(
+        CLAVE_CATEGORIAS,
+        lambda: list(CategoriaResiduo.objects.order_by('id').values('id', 'nombre', 'descripcion'))
+    )
+
+
+async def categorias_async():
+    async def calcular():
+        return [
+            categoria
+            async for categoria in CategoriaResiduo.objects.order_by('id').values('id', 'nombre', 'descripcion')
+        ]
+    return await en_cache_async(CLAVE_CATEGORIAS, calcular)
+
+
+def invalidar_estadisticas():
+    """
+    Descarta las estadísticas en cache tras crear, cambiar o eliminar reportes.
+    Con el cache local de cada proceso solo alcanza al worker que escribió; los
+    demás las renuevan al vencer ANALYTICS_CACHE_SECONDS.
+    """
+    cache.delete_many([CLAVE_ESTADISTICAS, CLAVE_ESTADISTICAS_COMUNA])
+
+
+# Un solo COUNT agregado en lugar de una consulta por estado
+AGREGADOS_ESTADISTICAS = {
+    'total': Count('id'),
+    'nuevos': Count('id', filter=Q(estado='nuevo')),
+    'en_proceso': Count('id', filter=Q(estado='proceso')),
+    'resueltos': Count('id', filter=Q(estado='resuelto')),
+}
+
+
+def sumar_archivados(data, conteos):
+    """Suma a las estadísticas los reportes archivados ({estado: cantidad})"""
+    data['total'] += sum(conteos.values())
+    data['resueltos'] += conteos.get('resuelto', 0)
+    return data
+
+
+def _conteos_archivo_por_estado():
+    return ConteoArchivo.objects.values_list('estado').annotate(n=Sum('cantidad')).order_by()
+
+
+def _estadisticas_de_conteos(por_estado):
+    """Mismo formato que AGREGADOS_ESTADISTICAS a partir de {estado: cantidad}"""
+    return {
+        'total': sum(por_estado.values()),
+        'nuevos': por_estado.get('nuevo', 0),
+        'en_proceso': por_estado.get('proceso', 0),
+        'resueltos': por_estado.get('resuelto', 0),
+    }
+
+
+def estadisticas():
+    def calcular():
+        snapshot = columnar.obtener_snapshot()
+        if snapshot is not None:
+            data = _estadisticas_de_conteos(snapshot.conteos('estado'))
+        else:
+            data = Reporte.objects.aggregate(**AGREGADOS_ESTADISTICAS)
+        return sumar_archivados(data, dict(_conteos_archivo_por_estado()))
+    return en_cache(CLAVE_ESTADISTICAS, calcular)
+
+
+async def estadisticas_async():
+    async def calcular():
+        snapshot = await sync_to_async(columnar.obtener_snapshot)()
+        if snapshot is not None:
+            data = _estadisticas_de_conteos(snapshot.conteos('estado'))
+        else:
+            data = await Reporte.objects.aaggregate(**AGREGADOS_ESTADISTICAS)
+        conteos = {estado: cantidad async for estado, cantidad in _conteos_archivo_por_estado()}
+        return sumar_archivados(data, conteos)
+    return await en_cache_async(CLAVE_ESTADISTICAS, calcular)
+
+
+def estadisticas_por_comuna():
+    return en_cache(CLAVE_ESTADISTICAS_COMUNA, _estadisticas_por_comuna)
+
+
+def _estadisticas_por_comuna():
+    """Las mismas estadísticas agrupadas por comuna ('' = sin comuna asignada)"""
+    snapshot = columnar.obtener_snapshot()
+    if snapshot is not None:
+        filas = {
+            comuna: {'comuna': comuna, **_estadisticas_de_conteos(por_estado)}
+            for comuna, por_estado in snapshot.conteos_comuna_estado().items()
+        }
+    else:
+        filas = {
+            fila['comuna']: fila
+            for fila in Reporte.objects.values('comuna').annotate(**AGREGADOS_ESTADISTICAS).order_by()
+        }
+    archivados = defaultdict(dict)
+    for comuna, estado, cantidad in ConteoArchivo.objects.values_list('comuna', 'estado', 'cantidad'):
+        archivados[comuna][estado] = cantidad
+
+    resultado = []
+    for comuna in set(filas) | set(archivados):
+        data = filas.get(comuna) or {'comuna': comuna, 'total': 0, 'nuevos': 0, 'en_proceso': 0, 'resueltos': 0}
+        resultado.append(sumar_archivados(data, archivados.get(comuna, {})))
+    resultado.sort(key=lambda fila: fila['total'], reverse=True)
+    return resultado
+
+
+# Seguimiento por código: primero la tabla activa y, si no está, el archivo
+CAMPOS_SEGUIMIENTO = (
+    'codigo_seguimiento', 'estado', 'categoria__nombre', 'fecha_creacion', 'fecha_actualizacion'
+)
+
+
+def formatear_seguimiento(fila, archivado):
+    return {
+        'codigo_seguimiento': fila['codigo_seguimiento'],
+        'estado': fila['estado'],
+        'estado_display': dict(Reporte.ESTADO_CHOICES).get(fila['estado']),
+        'categoria_nombre': fila['categoria__nombre'],
+        'fecha_creacion': fila['fecha_creacion'],
+        'fecha_actualizacion': fila['fecha_actualizacion'],
+        'archivado': archivado,
+    }
+
+
+def seguimiento(codigo):
+    codigo = codigo.upper()
+    for modelo in (Reporte, ReporteArchivado):
+        fila = modelo.objects.filter(codigo_seguimiento=codigo).values(*CAMPOS_SEGUIMIENTO).first()
+        if fila is not None:
+            return formatear_seguimiento(fila, modelo is ReporteArchivado)
+    return None
+
+
+async def seguimiento_async(codigo):
+    codigo = codigo.upper()
+    for modelo in (Reporte, ReporteArchivado):
+        fila = await modelo.objects.filter(codigo_seguimiento=codigo).values(*CAMPOS_SEGUIMIENTO).afirst()
+        if fila is not None:
+            return formatear_seguimiento(fila, modelo is ReporteArchivado)
+    return None
+
+
+def parametros_heatmap(params):
+    """Lee los parámetros del heatmap desde query_params / GET (ValueError si son inválidos)"""
+    bbox = params.get('bbox')
+    if bbox:
+        bbox = tuple(float(v) for v in bbox.split(','))
+        if len(bbox) != 4:
+            raise ValueError('bbox debe ser min_lng,min_lat,max_lng,max_lat')
+    return {
+        'radio': float(params.get('radio', 0.01)),  # Radio en grados (~1km)
+        'min_densidad': int(params.get('min_densidad', 1)),
+        'estado': params.get('estado'),
+        'categoria_id': params.get('categoria'),
+        'comuna': params.get('comuna'),
+        'bbox': bbox or None,
+    }
+
+
+def puntos_heatmap(estado=None, categoria_id=None, comuna=None, bbox=None, **kwargs):
+    """Queryset de (lat, lng) de los reportes con ubicación"""
+    queryset = Reporte.objects.filter(
+        ubicacion_lat__isnull=False,
+        ubicacion_lng__isnull=False
+    )
+    if estado:
+        queryset = queryset.filter(estado=estado)
+    if categoria_id:
+        queryset = queryset.filter(categoria_id=categoria_id)
+    if comuna:
+        queryset = queryset.filter(comuna=comuna)
+    if bbox:
+        min_lng, min_lat, max_lng, max_lat = bbox
+        queryset = queryset.filter(
+            ubicacion_lat__range=(min_lat, max_lat),
+            ubicacion_lng__range=(min_lng, max_lng),
+        )
+    return queryset.values_list('ubicacion_lat', 'ubicacion_lng')
+
+
+class AgrupadorHeatmap:
+    """
+    Agrupa puntos por cuadrícula aproximada (sin PostGIS).
+    Se alimenta punto a punto para poder usarse con iteración síncrona o async.
+    """
+    def __init__(self, radio, min_densidad, **kwargs):
+        self.radio = radio
+        self.min_densidad = min_densidad
+        self.grid_size = radio * 2
+        self.celdas = {}
+
+    def agregar(self, lat, lng):
+        if lat and lng:
+            # Redondear a la cuadrícula
+            key = (round(lat / self.grid_size), round(lng / self.grid_size))
+            self.celdas[key] = self.celdas.get(key, 0) + 1
+
+    def resultado(self):
+        # Filtrar por densidad mínima
+        celdas = [
+            (i * self.grid_size, j * self.grid_size, densidad)
+            for (i, j), densidad in self.celdas.items()
+            if densidad >= self.min_densidad
+        ]
+        # Ordenar por densidad
+        celdas.sort(key=lambda celda: celda[2], reverse=True)
+        return formatear_heatmap(celdas, self.radio, self.min_densidad)
+
+
+def formatear_heatmap(celdas, radio, min_densidad, **kwargs):
+    """Respuesta del heatmap a partir de [(lat, lng, densidad)] ya ordenadas"""
+    heatmap_data = [
+        {
+            'lat': lat,
+            'lng': lng,
+            'intensity': densidad,
+            'densidad': densidad
+        }
+        for lat, lng, densidad in celdas
+    ]
+    return {
+        'data': heatmap_data,
+        'total_points': len(heatmap_data),
+        'params': {
+            'radio': radio,
+            'min_densidad': min_densidad
+        }
+    }
+
+
+def _clave_heatmap(params):
+    def valor(v):
+        # bbox es una tupla: sin espacios en la clave (memcached no los acepta)
+        return ','.join(map(str, v)) if isinstance(v, tuple) else v
+    return 'consultas:heatmap:' + ':'.join(f'{k}={valor(params[k])}' for k in sorted(params))
+
+
+def heatmap(params):
+    def calcular():
+        snapshot = columnar.obtener_snapshot()
+        if snapshot is not None:
+            return formatear_heatmap(snapshot.densidad(**params), **params)
+        agrupador = AgrupadorHeatmap(**params)
+        for lat, lng in puntos_heatmap(**params).iterator():
+            agrupador.agregar(lat, lng)
+        return agrupador.resultado()
+    return en_cache(_clave_heatmap(params), calcular)
+
+
+async def heatmap_async(params):
+    async def calcular():
+        snapshot = await sync_to_async(columnar.obtener_snapshot)()
+        if snapshot is not None:
+            return formatear_heatmap(snapshot.densidad(**params), **params)
+        agrupador = AgrupadorHeatmap(**params)
+        async for lat, lng in puntos_heatmap(**params):
+            agrupador.agregar(lat, lng)
+        return agrupador.resultado()
+    return await en_cache_async(_clave_heatmap(params), calcular)
@@ -0,0 +1,173 @@
+"""
+Arranque del dashboard en una sola petición (/api/dashboard/).
+
+Cada sección (primera página de reportes, estadísticas, categorías y heatmap)
+se calcula en paralelo en un pool de hilos: cada hilo usa su propia conexión a
+la base de datos, así las consultas independientes no se esperan entre sí. Las
+secciones se serializan por separado y llevan su propio ETag; si el cliente
+envía el ETag que ya tiene (?etags=seccion:etag,...) la sección vuelve sin
+datos y con `sin_cambios`. La respuesta completa lleva además un ETag HTTP:
+con If-None-Match y sin cambios en ninguna sección se responde 304.
+"""
+import contextvars
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.urls import reverse
+from rest_framework.utils.urls import remove_query_param
+
+from ecoalerta.renderers import FastJSONRenderer
+
+from . import consultas
+
+logger = logging.getLogger(__name__)
+
+SECCIONES = ('reportes', 'estadisticas', 'categorias', 'heatmap')
+# El heatmap solo se pide cuando el mapa de calor está activo
+SECCIONES_POR_DEFECTO = ('reportes', 'estadisticas', 'categorias')
+PARAMETROS_PROPIOS = ('secciones', 'etags')
+
+_renderer = FastJSONRenderer()
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def obtener_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(
+                    max_workers=settings.DASHBOARD_HILOS, thread_name_prefix='dashboard'
+                )
+    return _pool
+
+
+def secciones_pedidas(params):
+    """Secciones de ?secciones=a,b (en el orden de SECCIONES). ValueError si alguna no existe"""
+    valor = params.get('secciones')
+    if not valor:
+        return list(SECCIONES_POR_DEFECTO)
+    pedidas = {s.strip() for s in valor.split(',') if s.strip()}
+    invalidas = pedidas - set(SECCIONES)
+    if invalidas:
+        raise ValueError(f'Secciones inválidas: {", ".join(sorted(invalidas))}')
+    return [s for s in SECCIONES if s in pedidas]
+
+
+def etags_conocidos(params):
+    """{seccion: etag} de ?etags=seccion:etag,..."""
+    conocidos = {}
+    for parte in params.get('etags', '').split(','):
+        seccion, _, etag = parte.strip().partition(':')
+        if etag:
+            conocidos[seccion] = etag
+    return conocidos
+
+
+def seccion_reportes(request):
+    """Primera página (o ?page=) del listado, con los mismos filtros que /api/reportes/"""
+    from .views import ReporteViewSet
+
+    vista = ReporteViewSet(request=request, format_kwarg=None, action='list', kwargs={})
+    page = vista.paginate_queryset(vista.get_queryset())
+    data = vista.get_paginated_response(vista.get_serializer(page, many=True).data).data
+
+    # Los enlaces de paginación apuntan al listado, no a este endpoint
+    listado = request.build_absolute_uri(reverse('reportes-list'))
+    for clave in ('next', 'previous'):
+        if data.get(clave):
+            url = data[clave]
+            for param in PARAMETROS_PROPIOS:
+                url = remove_query_param(url, param)
+            data[clave] = listado + url[url.find('?'):] if '?' in url else listado
+    return data
+
+
+def seccion_estadisticas(request):
+    return consultas.estadisticas()
+
+
+def seccion_categorias(request):
+    return consultas.categorias()
+
+
+def seccion_heatmap(request):
+    return consultas.heatmap(consultas.parametros_heatmap(request.query_params))
+
+
+CALCULOS = {
+    'reportes': seccion_reportes,
+    'estadisticas': seccion_estadisticas,
+    'categorias': seccion_categorias,
+    'heatmap': seccion_heatmap,
+}
+
+
+def _en_hilo(calculo, request):
+    """
+    Corre en un hilo del pool. Con DB_POOL devuelve la conexión al pool al
+    terminar; si no, solo cierra las vencidas (CONN_MAX_AGE) o con error, para
+    que el hilo reutilice su conexión persistente en la siguiente petición.
+    """
+    try:
+        return calculo(request)
+    finally:
+        if settings.DB_POOL:
+            connections.close_all()
+        else:
+            close_old_connections()
+
+
+def _serializar(seccion, calculo, request, en_pool):
+    try:
+        data = _en_hilo(calculo, request) if en_pool else calculo(request)
+    except Exception:
+        logger.exception('Dashboard: falló la sección %s', seccion)
+        return None
+    return _renderer.render(data)
+
+
+def construir(request, secciones, conocidos):
+    """
+    Cuerpo JSON de la respuesta, ya serializado. Cada sección va como
+    {"etag": ..., "data": ...}, {"etag": ..., "sin_cambios": true} o
+    {"error": ...} si falló, sin afectar a las demás.
+    """
+    pool = obtener_pool()
+    futuros = {}
+    # La primera sección se calcula en el hilo de la petición, que ya tiene conexión
+    for seccion in secciones[1:]:
+        # copy_context: los hilos heredan el enrutamiento a réplica de la petición
+        contexto = contextvars.copy_context()
+        futuros[seccion] = pool.submit(
+            contexto.run, _serializar, seccion, CALCULOS[seccion], request, True
+        )
+    cuerpos = {}
+    if secciones:
+        cuerpos[secciones[0]] = _serializar(secciones[0], CALCULOS[secciones[0]], request, False)
+    for seccion, futuro in futuros.items():
+        cuerpos[seccion] = futuro.result()
+
+    partes = []
+    for seccion in secciones:
+        cuerpo = cuerpos[seccion]
+        if cuerpo is None:
+            valor = _renderer.render({'error': f'No se pudo cargar {seccion}'})
+        else:
+            etag = hashlib.md5(cuerpo).hexdigest()
+            if conocidos.get(seccion) == etag:
+                valor = _renderer.render({'etag': etag, 'sin_cambios': True})
+            else:
+                valor = b'{"etag":"' + etag.encode() + b'","data":' + cuerpo + b'}'
+        partes.append(b'"' + seccion.encode() + b'":' + valor)
+    return b'{' + b','.join(partes) + b'}'
+
+
+def etag_http(cuerpo):
+    """ETag del cuerpo completo (encabezado ETag / If-None-Match)"""
+    return f'"{hashlib.md5(cuerpo).hexdigest()}"'
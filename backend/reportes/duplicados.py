@@ -0,0 +1,137 @@
+"""
+Detección y fusión de reportes duplicados.
+
+Al crear un reporte se buscan reportes abiertos de la misma categoría a menos de
+DUPLICADOS_RADIO_METROS y creados en los últimos DUPLICADOS_VENTANA_DIAS. La
+búsqueda usa el índice (categoria, ubicacion_lat, ubicacion_lng) con un
+rectángulo alrededor del punto, y la distancia exacta se calcula solo sobre los
+pocos candidatos que devuelve.
+"""
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, TextField, Value, When
+from django.db.models.functions import Concat
+from django.utils import timezone
+
+from . import prioridad
+from .models import Reporte
+
+METROS_POR_GRADO = 111320.0
+ESTADOS_ABIERTOS = ('nuevo', 'proceso')
+
+
+def distancia_metros(lat1, lng1, lat2, lng2):
+    """Haversine en metros"""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * 6371000.0 * math.asin(math.sqrt(a))
+
+
+def buscar_canonico(categoria_id, lat, lng, radio_metros=None, ventana_dias=None):
+    """Reporte canónico más cercano del que el nuevo reporte sería duplicado, o None"""
+    if categoria_id is None or lat is None or lng is None:
+        return None
+
+    radio = radio_metros or settings.DUPLICADOS_RADIO_METROS
+    ventana = ventana_dias or settings.DUPLICADOS_VENTANA_DIAS
+    dlat = radio / METROS_POR_GRADO
+    dlng = radio / (METROS_POR_GRADO * max(math.cos(math.radians(lat)), 0.01))
+
+    candidatos = Reporte.objects.filter(
+        categoria_id=categoria_id,
+        ubicacion_lat__range=(lat - dlat, lat + dlat),
+        ubicacion_lng__range=(lng - dlng, lng + dlng),
+        fecha_creacion__gte=timezone.now() - timedelta(days=ventana),
+        estado__in=ESTADOS_ABIERTOS,
+        duplicado_de__isnull=True,
+    ).values_list('id', 'ubicacion_lat', 'ubicacion_lng')[:50]
+
+    mejor, mejor_distancia = None, radio
+    for pk, c_lat, c_lng in candidatos:
+        distancia = distancia_metros(lat, lng, c_lat, c_lng)
+        if distancia <= mejor_distancia:
+            mejor, mejor_distancia = pk, distancia
+    return mejor
+
+
+def registrar_duplicado(canonico_id):
+    """Suma un duplicado al contador del reporte canónico (y sube su prioridad)"""
+    Reporte.objects.filter(pk=canonico_id).update(cantidad_duplicados=F('cantidad_duplicados') + 1)
+    prioridad.recalcular([canonico_id])
+
+
+def recalcular_contadores(ids):
+    """Recalcula cantidad_duplicados y la prioridad de los reportes dados"""
+    conteos = dict(
+        Reporte.objects.filter(duplicado_de_id__in=ids)
+        .values_list('duplicado_de_id')
+        .annotate(n=Count('id'))
+    )
+    for pk in ids:
+        Reporte.objects.filter(pk=pk).update(cantidad_duplicados=conteos.get(pk, 0))
+    prioridad.recalcular(ids)
+
+
+@transaction.atomic
+def fusionar(canonico, ids, usuario=None):
+    """
+    Fusiona los reportes `ids` en `canonico`: quedan como duplicados cerrados y
+    sus propios duplicados pasan a apuntar al canónico.
+    """
+    ids = [pk for pk in ids if pk != canonico.pk]
+    if not ids:
+        return 0
+
+    if canonico.duplicado_de_id is not None:
+        # El canónico deja de ser duplicado de otro
+        anterior = canonico.duplicado_de_id
+        Reporte.objects.filter(pk=canonico.pk).update(duplicado_de=None, fecha_actualizacion=timezone.now())
+    else:
+        anterior = None
+
+    antiguos = set(
+        Reporte.objects.filter(pk__in=ids, duplicado_de__isnull=False)
+        .values_list('duplicado_de_id', flat=True)
+    )
+    nota = f'Fusionado con {canonico.codigo_seguimiento}'
+    if usuario is not None:
+        nota += f' por {usuario.username}'
+
+    ahora = timezone.now()
+    # fecha_actualizacion avanza para que los índices en memoria vean el cambio
+    Reporte.objects.filter(duplicado_de_id__in=ids).update(duplicado_de=canonico, fecha_actualizacion=ahora)
+    fusionados = Reporte.objects.filter(pk__in=ids).update(
+        duplicado_de=canonico,
+        estado='cerrado',
+        # La nota se agrega a las existentes
+        notas_internas=Case(
+            When(notas_internas='', then=Value(nota)),
+            default=Concat(F('notas_internas'), Value('\n' + nota)),
+            output_field=TextField(),
+        ),
+        fecha_actualizacion=ahora,
+    )
+
+    afectados = (antiguos | {canonico.pk}) - set(ids)
+    if anterior is not None:
+        afectados.add(anterior)
+    recalcular_contadores(list(afectados) + ids)
+    return fusionados
+
+
+@transaction.atomic
+def separar(reporte):
+    """Deshace un vínculo de duplicado marcado por error"""
+    canonico_id = reporte.duplicado_de_id
+    if canonico_id is None:
+        return False
+    Reporte.objects.filter(pk=reporte.pk).update(duplicado_de=None, fecha_actualizacion=timezone.now())
+    recalcular_contadores([canonico_id, reporte.pk])
+    reporte.refresh_from_db(fields=['duplicado_de', 'cantidad_duplicados', 'prioridad'])
+    return True
@@ -0,0 +1,338 @@
+"""
+Detección de hotspots (zonas de acumulación de reportes) tipo DBSCAN.
+
+Los reportes se agrupan en una cuadrícula con celdas de al menos `eps` metros
+de lado, de modo que los vecinos de un punto solo pueden estar en las 3x3
+celdas que lo rodean. Así cada punto se compara con pocos candidatos y el costo
+total es casi lineal en la cantidad de reportes.
+
+Un reporte es "núcleo" si tiene al menos `min_reportes` reportes (él incluido)
+a menos de `eps` metros. Los núcleos conectados forman un hotspot, y los
+reportes no núcleo a menos de `eps` de un núcleo se suman como borde.
+
+Ejecución incremental: solo se recalculan las celdas con reportes creados,
+modificados o que salieron de la ventana desde la última ejecución, las que
+dejaron reportes eliminados, archivados o movidos (UbicacionRetirada, que
+registran las señales de Reporte), más los hotspots existentes que las tocan.
+La ejecución es completa si cambian eps, min_reportes o la ventana, y al menos
+cada HOTSPOT_COMPLETA_HORAS.
+"""
+import math
+import threading
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import EjecucionHotspots, Hotspot, Reporte, UbicacionRetirada
+
+METROS_POR_GRADO = 111320.0
+# Las celdas se dimensionan para la latitud más extrema de Chile continental,
+# así siguen midiendo al menos eps metros de ancho en todo el país
+LATITUD_REFERENCIA = 56.0
+
+ESTADOS_ABIERTOS = ('nuevo', 'proceso')
+
+_local = threading.local()
+
+
+def registrar_retirada(lat, lng):
+    """Anota una ubicación que dejó de tener un reporte (en la transacción actual)"""
+    if lat is None or lng is None:
+        return
+    retirada = UbicacionRetirada(ubicacion_lat=lat, ubicacion_lng=lng)
+    lote = getattr(_local, 'lote', None)
+    if lote is not None:
+        lote.append(retirada)
+    else:
+        retirada.save()
+
+
+@contextmanager
+def retiradas_en_lote():
+    """Dentro del bloque las retiradas se acumulan y se insertan juntas al salir"""
+    _local.lote = []
+    try:
+        yield
+        UbicacionRetirada.objects.bulk_create(_local.lote)
+    finally:
+        _local.lote = None
+
+
+class DetectorHotspots:
+
+    def __init__(self, eps_metros=None, min_reportes=None, ventana_dias=None):
+        self.eps = eps_metros or settings.HOTSPOT_EPS_METROS
+        self.min_reportes = min_reportes or settings.HOTSPOT_MIN_REPORTES
+        self.ventana_dias = ventana_dias or settings.HOTSPOT_VENTANA_DIAS
+        self.dlat = self.eps / METROS_POR_GRADO
+        self.dlng = self.eps / (METROS_POR_GRADO * math.cos(math.radians(LATITUD_REFERENCIA)))
+
+    # Cuadrícula
+
+    def celda(self, lat, lng):
+        return (math.floor(lat / self.dlat), math.floor(lng / self.dlng))
+
+    @staticmethod
+    def clave(celda):
+        return f'{celda[0]}:{celda[1]}'
+
+    @staticmethod
+    def desde_clave(clave):
+        i, j = clave.split(':')
+        return (int(i), int(j))
+
+    @staticmethod
+    def vecinas(celda):
+        i, j = celda
+        return [(i + di, j + dj) for di in (-1, 0, 1) for dj in (-1, 0, 1)]
+
+    # Ejecución
+
+    def ejecutar(self, completo=False):
+        ahora = timezone.now()
+        inicio_ventana = ahora - timedelta(days=self.ventana_dias)
+        # Lo modificado desde este momento se procesa en la siguiente ejecución
+        marca = ahora
+        anterior = EjecucionHotspots.objects.order_by('-fecha').first()
+        completo = completo or self._requiere_completa(anterior, ahora)
+
+        with transaction.atomic():
+            if completo:
+                puntos = self._cargar_puntos(inicio_ventana)
+                clusters = self.dbscan(puntos)
+                Hotspot.objects.all().delete()
+                celdas_procesadas = len({self.celda(p[1], p[2]) for p in puntos})
+            else:
+                sucias = self._celdas_sucias(anterior, inicio_ventana)
+                region, afectados = self._expandir_region(sucias)
+                puntos = self._cargar_puntos(inicio_ventana, region)
+                clusters = self.dbscan(puntos)
+                Hotspot.objects.filter(id__in=afectados).delete()
+                celdas_procesadas = len(region)
+
+            # Un cluster puede quedar con menos miembros si comparte bordes con otro
+            hotspots = [
+                self._crear_hotspot(puntos, miembros)
+                for miembros in clusters
+                if len(miembros) >= self.min_reportes
+            ]
+            Hotspot.objects.bulk_create(hotspots)
+
+            # Las retiradas anteriores a la marca ya quedaron procesadas
+            UbicacionRetirada.objects.filter(fecha__lte=marca).delete()
+            EjecucionHotspots.objects.create(
+                marca_de_agua=marca,
+                inicio_ventana=inicio_ventana,
+                completa=completo,
+                celdas_procesadas=celdas_procesadas,
+                hotspots_detectados=len(hotspots),
+                eps_metros=self.eps,
+                min_reportes=self.min_reportes,
+                ventana_dias=self.ventana_dias,
+            )
+
+        return {
+            'completa': completo,
+            'reportes_procesados': len(puntos),
+            'celdas_procesadas': celdas_procesadas,
+            'hotspots_recalculados': len(hotspots),
+            'hotspots_totales': Hotspot.objects.count(),
+        }
+
+    def _requiere_completa(self, anterior, ahora):
+        """Sin ejecución previa, con otros parámetros (otra cuadrícula) o completa vencida"""
+        if anterior is None:
+            return True
+        if (anterior.eps_metros, anterior.min_reportes, anterior.ventana_dias) != (
+            self.eps, self.min_reportes, self.ventana_dias
+        ):
+            return True
+        # Red de seguridad por cambios que no pasan por el ORM (SQL directo, restauraciones)
+        limite = ahora - timedelta(hours=settings.HOTSPOT_COMPLETA_HORAS)
+        return not EjecucionHotspots.objects.filter(completa=True, fecha__gte=limite).exists()
+
+    def _celdas_sucias(self, anterior, inicio_ventana):
+        """Celdas con reportes cambiados, que salieron de la ventana o que se retiraron"""
+        cambios = Reporte.objects.filter(
+            Q(fecha_actualizacion__gt=anterior.marca_de_agua)
+            | Q(fecha_creacion__gte=anterior.inicio_ventana, fecha_creacion__lt=inicio_ventana),
+            ubicacion_lat__isnull=False,
+            ubicacion_lng__isnull=False,
+        ).values_list('ubicacion_lat', 'ubicacion_lng')
+        retiradas = UbicacionRetirada.objects.filter(
+            fecha__gt=anterior.marca_de_agua
+        ).values_list('ubicacion_lat', 'ubicacion_lng')
+        sucias = {self.celda(lat, lng) for lat, lng in cambios.iterator(chunk_size=5000)}
+        sucias.update(self.celda(lat, lng) for lat, lng in retiradas.iterator(chunk_size=5000))
+        return sucias
+
+    def _expandir_region(self, sucias):
+        """
+        Región a recalcular: las celdas sucias con 2 anillos de vecinas (un
+        punto nuevo puede volver núcleo a un vecino y este conectar con otro
+        núcleo), más todas las celdas de los hotspots existentes que toca.
+        """
+        if not sucias:
+            return set(), []
+
+        celda_a_hotspot = {}
+        celdas_hotspot = {}
+        for hotspot_id, celdas in Hotspot.objects.values_list('id', 'celdas'):
+            celdas = [self.desde_clave(c) for c in celdas]
+            celdas_hotspot[hotspot_id] = celdas
+            for c in celdas:
+                celda_a_hotspot[c] = hotspot_id
+
+        region = set()
+        for celda in sucias:
+            for vecina in self.vecinas(celda):
+                region.update(self.vecinas(vecina))
+
+        afectados = set()
+        pendientes = deque(region)
+        while pendientes:
+            celda = pendientes.popleft()
+            hotspot_id = celda_a_hotspot.get(celda)
+            if hotspot_id is None or hotspot_id in afectados:
+                continue
+            afectados.add(hotspot_id)
+            for c in celdas_hotspot[hotspot_id]:
+                for vecina in self.vecinas(c):
+                    if vecina not in region:
+                        region.add(vecina)
+                        pendientes.append(vecina)
+
+        return region, list(afectados)
+
+    def _cargar_puntos(self, inicio_ventana, region=None):
+        """(id, lat, lng, categoria_id, estado, fecha_creacion) dentro de la ventana"""
+        queryset = Reporte.objects.filter(
+            ubicacion_lat__isnull=False,
+            ubicacion_lng__isnull=False,
+            fecha_creacion__gte=inicio_ventana,
+        )
+        campos = ('id', 'ubicacion_lat', 'ubicacion_lng', 'categoria_id', 'estado', 'fecha_creacion')
+
+        if region is None:
+            return list(queryset.values_list(*campos).iterator(chunk_size=10000))
+        if not region:
+            return []
+
+        # Una consulta por bloque conexo de la región (usa los índices de lat/lng)
+        puntos = []
+        for bloque in self._bloques(region):
+            min_i = min(c[0] for c in bloque)
+            max_i = max(c[0] for c in bloque)
+            min_j = min(c[1] for c in bloque)
+            max_j = max(c[1] for c in bloque)
+            filas = queryset.filter(
+                ubicacion_lat__gte=min_i * self.dlat,
+                ubicacion_lat__lt=(max_i + 1) * self.dlat,
+                ubicacion_lng__gte=min_j * self.dlng,
+                ubicacion_lng__lt=(max_j + 1) * self.dlng,
+            ).values_list(*campos)
+            puntos.extend(p for p in filas.iterator(chunk_size=10000) if self.celda(p[1], p[2]) in bloque)
+        return puntos
+
+    def _bloques(self, region):
+        pendientes = set(region)
+        while pendientes:
+            inicio = pendientes.pop()
+            bloque = {inicio}
+            cola = deque([inicio])
+            while cola:
+                for vecina in self.vecinas(cola.popleft()):
+                    if vecina in pendientes:
+                        pendientes.remove(vecina)
+                        bloque.add(vecina)
+                        cola.append(vecina)
+            yield bloque
+
+    # DBSCAN sobre cuadrícula
+
+    def dbscan(self, puntos):
+        """Devuelve una lista de clusters, cada uno como lista de índices en `puntos`"""
+        eps2 = self.eps * self.eps
+        lats = [p[1] for p in puntos]
+        lngs = [p[2] for p in puntos]
+        # Escala este-oeste de cada punto (equirectangular, exacta a esta escala)
+        escala_lng = [METROS_POR_GRADO * math.cos(math.radians(lat)) for lat in lats]
+        celdas = [self.celda(lat, lng) for lat, lng in zip(lats, lngs)]
+
+        grilla = defaultdict(list)
+        for idx, celda in enumerate(celdas):
+            grilla[celda].append(idx)
+
+        def cerca(a, b):
+            dy = (lats[a] - lats[b]) * METROS_POR_GRADO
+            dx = (lngs[a] - lngs[b]) * escala_lng[a]
+            return dx * dx + dy * dy <= eps2
+
+        # 1. Núcleos: se deja de contar apenas se alcanza min_reportes
+        nucleo = [False] * len(puntos)
+        for celda, indices in grilla.items():
+            candidatos = [k for v in self.vecinas(celda) for k in grilla.get(v, ())]
+            if len(candidatos) < self.min_reportes:
+                continue
+            for idx in indices:
+                n = 0
+                for k in candidatos:
+                    if cerca(idx, k):
+                        n += 1
+                        if n >= self.min_reportes:
+                            nucleo[idx] = True
+                            break
+
+        # 2. Expansión desde cada núcleo. Los puntos etiquetados salen de la
+        # cuadrícula, así cada punto se asigna una sola vez
+        sin_etiqueta = {celda: set(indices) for celda, indices in grilla.items()}
+        clusters = []
+        for idx in range(len(puntos)):
+            if not nucleo[idx] or idx not in sin_etiqueta[celdas[idx]]:
+                continue
+            sin_etiqueta[celdas[idx]].discard(idx)
+            miembros = []
+            cola = deque([idx])
+            while cola:
+                actual = cola.popleft()
+                miembros.append(actual)
+                if not nucleo[actual]:
+                    continue
+                for vecina in self.vecinas(celdas[actual]):
+                    pendientes = sin_etiqueta.get(vecina)
+                    if not pendientes:
+                        continue
+                    encontrados = [k for k in pendientes if cerca(actual, k)]
+                    for k in encontrados:
+                        pendientes.discard(k)
+                        cola.append(k)
+            clusters.append(miembros)
+        return clusters
+
+    def _crear_hotspot(self, puntos, miembros):
+        lats = [puntos[i][1] for i in miembros]
+        lngs = [puntos[i][2] for i in miembros]
+        fechas = [puntos[i][5] for i in miembros]
+        categorias = defaultdict(int)
+        for i in miembros:
+            categorias[str(puntos[i][3])] += 1
+
+        return Hotspot(
+            centro_lat=sum(lats) / len(lats),
+            centro_lng=sum(lngs) / len(lngs),
+            min_lat=min(lats),
+            min_lng=min(lngs),
+            max_lat=max(lats),
+            max_lng=max(lngs),
+            cantidad_reportes=len(miembros),
+            reportes_abiertos=sum(1 for i in miembros if puntos[i][4] in ESTADOS_ABIERTOS),
+            fecha_primer_reporte=min(fechas),
+            fecha_ultimo_reporte=max(fechas),
+            categorias=dict(categorias),
+            celdas=sorted({self.clave(self.celda(lat, lng)) for lat, lng in zip(lats, lngs)}),
+        )
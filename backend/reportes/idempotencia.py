@@ -0,0 +1,152 @@
+"""
+Idempotency-Key para la creación de reportes.
+
+El formulario ciudadano envía una clave por envío y la repite en los
+reintentos. La primera petición con esa clave la reserva (fila EN_CURSO; la
+restricción unique de la tabla decide quién gana si llegan varias a la vez),
+crea el reporte y guarda la respuesta. Los reintentos reciben esa misma
+respuesta sin que se lea el cuerpo multipart, así la foto no se vuelve a
+procesar ni se crea otro reporte. Un reintento que llega mientras la original
+sigue en curso espera IDEMPOTENCIA_ESPERA_SEGUNDOS a que termine; si no termina,
+recibe 409.
+
+Las claves duran IDEMPOTENCIA_TTL_HORAS; `manage.py limpiar_idempotencia` borra
+las vencidas.
+"""
+import functools
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import ClaveIdempotencia
+
+ENCABEZADO = 'Idempotency-Key'
+LARGO_MAXIMO = 255
+INTERVALO_ESPERA = 0.1
+
+
+def _expira():
+    return timezone.now() + timedelta(hours=settings.IDEMPOTENCIA_TTL_HORAS)
+
+
+def reservar(clave):
+    """
+    Intenta reservar la clave. Devuelve (registro, None) si esta petición debe
+    procesarse, o (None, respuesta) si ya hay una respuesta para el cliente
+    (la original repetida o un 409).
+    """
+    limite = time.monotonic() + settings.IDEMPOTENCIA_ESPERA_SEGUNDOS
+    while True:
+        try:
+            with transaction.atomic():
+                return ClaveIdempotencia.objects.create(clave=clave, expira=_expira()), None
+        except IntegrityError:
+            pass
+
+        registro = ClaveIdempotencia.objects.filter(clave=clave).first()
+        if registro is None:
+            # La original falló y liberó la clave: reintentar la reserva
+            continue
+
+        ahora = timezone.now()
+        if registro.expira <= ahora:
+            # Vencida: se reemplaza (el UPDATE condicional evita que dos la tomen)
+            tomada = ClaveIdempotencia.objects.filter(pk=registro.pk, expira=registro.expira).update(
+                estado=ClaveIdempotencia.EN_CURSO, codigo_respuesta=None, respuesta=None,
+                expira=_expira(), fecha_actualizacion=ahora,
+            )
+            if tomada:
+                registro.refresh_from_db()
+                return registro, None
+            continue
+
+        if registro.estado == ClaveIdempotencia.COMPLETADA:
+            response = Response(registro.respuesta, status=registro.codigo_respuesta)
+            response['Idempotent-Replayed'] = 'true'
+            return None, response
+
+        abandonada = registro.fecha_actualizacion + timedelta(seconds=settings.IDEMPOTENCIA_EN_CURSO_SEGUNDOS)
+        if abandonada <= ahora:
+            # El worker que la reservó murió sin terminar: se toma la reserva
+            tomada = ClaveIdempotencia.objects.filter(
+                pk=registro.pk, estado=ClaveIdempotencia.EN_CURSO,
+                fecha_actualizacion=registro.fecha_actualizacion,
+            ).update(expira=_expira(), fecha_actualizacion=ahora)
+            if tomada:
+                registro.refresh_from_db()
+                return registro, None
+            continue
+
+        if time.monotonic() >= limite:
+            response = Response(
+                {'error': 'Una petición con la misma Idempotency-Key está en curso. Reintenta en unos segundos.'},
+                status=status.HTTP_409_CONFLICT
+            )
+            response['Retry-After'] = '1'
+            return None, response
+        time.sleep(INTERVALO_ESPERA)
+
+
+def completar(registro, response):
+    ClaveIdempotencia.objects.filter(pk=registro.pk).update(
+        estado=ClaveIdempotencia.COMPLETADA,
+        codigo_respuesta=response.status_code,
+        respuesta=response.data,
+        fecha_actualizacion=timezone.now(),
+    )
+
+
+def liberar(registro):
+    """La petición falló: otro intento con la misma clave puede procesarse"""
+    ClaveIdempotencia.objects.filter(pk=registro.pk, estado=ClaveIdempotencia.EN_CURSO).delete()
+
+
+def idempotente(metodo):
+    """
+    Decorador para acciones de ViewSet. Sin encabezado Idempotency-Key la acción
+    se ejecuta normalmente. Solo se guardan las respuestas 2xx: ante un error el
+    cliente puede corregir y reintentar con la misma clave.
+    """
+    @functools.wraps(metodo)
+    def wrapper(self, request, *args, **kwargs):
+        clave = request.headers.get(ENCABEZADO, '').strip()
+        if not clave:
+            return metodo(self, request, *args, **kwargs)
+        if len(clave) > LARGO_MAXIMO:
+            return Response(
+                {'error': f'{ENCABEZADO} no puede superar {LARGO_MAXIMO} caracteres'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        registro, response = reservar(clave)
+        if response is not None:
+            return response
+
+        try:
+            response = metodo(self, request, *args, **kwargs)
+        except BaseException:
+            liberar(registro)
+            raise
+        if status.is_success(response.status_code):
+            completar(registro, response)
+        else:
+            liberar(registro)
+        return response
+    return wrapper
+
+
+def eliminar_vencidas(lote=1000):
+    """Borra las claves vencidas en lotes; devuelve cuántas borró"""
+    total = 0
+    while True:
+        ids = list(
+            ClaveIdempotencia.objects.filter(expira__lte=timezone.now()).values_list('pk', flat=True)[:lote]
+        )
+        if not ids:
+            return total
+        total += ClaveIdempotencia.objects.filter(pk__in=ids).delete()[0]
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reportes.prioridad import actualizar_cola
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula la prioridad de inspección de los reportes abiertos (antigüedad '
+        'y densidad de vecinos). Programarlo periódicamente, p. ej. cada 15 minutos'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000,
+                            help='Reportes por transacción (default: 1000)')
+        parser.add_argument('--pausa', type=float, default=0.0,
+                            help='Segundos de espera entre lotes (default: 0)')
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        procesados, actualizados = actualizar_cola(options['lote'], options['pausa'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{procesados} reportes en la cola, {actualizados} con prioridad actualizada '
+            f'({time.monotonic() - inicio:.1f}s)'
+        ))
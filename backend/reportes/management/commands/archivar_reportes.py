@@ -0,0 +1,51 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from reportes.archivo import archivables, archivar_lote
+
+
+class Command(BaseCommand):
+    help = (
+        'Mueve al archivo los reportes resueltos o cerrados sin cambios en los '
+        'últimos días, en lotes cortos para no bloquear la tabla activa'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=settings.ARCHIVO_DIAS,
+                            help=f'Días sin cambios para archivar (default: {settings.ARCHIVO_DIAS})')
+        parser.add_argument('--lote', type=int, default=500,
+                            help='Reportes por transacción (default: 500)')
+        parser.add_argument('--pausa', type=float, default=0.1,
+                            help='Segundos de espera entre lotes (default: 0.1)')
+        parser.add_argument('--max-lotes', type=int, default=0,
+                            help='Detenerse después de N lotes (default: sin límite)')
+        parser.add_argument('--simular', action='store_true',
+                            help='Solo contar los reportes archivables')
+
+    def handle(self, *args, **options):
+        if options['simular']:
+            total = archivables(options['dias']).count()
+            self.stdout.write(f'{total} reportes archivables')
+            return
+
+        inicio = time.monotonic()
+        movidos = 0
+        lotes = 0
+        while True:
+            cantidad = archivar_lote(options['dias'], options['lote'])
+            if not cantidad:
+                break
+            movidos += cantidad
+            lotes += 1
+            if lotes % 20 == 0:
+                self.stdout.write(f'{movidos} reportes archivados...')
+            if options['max_lotes'] and lotes >= options['max_lotes']:
+                break
+            # Deja pasar a las escrituras normales y a la replicación
+            time.sleep(options['pausa'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{movidos} reportes archivados en {lotes} lotes ({time.monotonic() - inicio:.1f}s)'
+        ))
@@ -0,0 +1,77 @@
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from reportes.archivo import recalcular_conteos
+from reportes.comunas import obtener_indice
+from reportes.models import Reporte, ReporteArchivado
+
+
+class Command(BaseCommand):
+    help = (
+        'Asigna la comuna de los reportes según COMUNAS_GEOJSON. Por defecto '
+        'solo los que no tienen comuna'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todos', action='store_true',
+                            help='Recalcular la comuna de todos los reportes (p. ej. tras cambiar el GeoJSON)')
+        parser.add_argument('--lote', type=int, default=10000,
+                            help='Reportes leídos y actualizados por transacción (default: 10000)')
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        indice = obtener_indice()
+        if indice is None:
+            raise CommandError(f'No se encontró el archivo de comunas: {settings.COMUNAS_GEOJSON}')
+        self.stdout.write(
+            f'{len(indice.nombres)} comunas cargadas en {time.monotonic() - inicio:.1f}s '
+            f'({len(indice.celdas)} celdas)'
+        )
+
+        for modelo in (Reporte, ReporteArchivado):
+            queryset = modelo.objects.filter(ubicacion_lat__isnull=False, ubicacion_lng__isnull=False)
+            if not options['todos']:
+                queryset = queryset.filter(comuna='')
+            procesados, actualizados, segundos = self._asignar(indice, queryset, options['lote'])
+            velocidad = procesados / segundos if segundos else 0
+            self.stdout.write(
+                f'{modelo._meta.verbose_name_plural}: {procesados} procesados, {actualizados} actualizados '
+                f'({velocidad:,.0f} puntos/s)'
+            )
+
+        # Las estadísticas del archivo por comuna salen de ConteoArchivo
+        recalcular_conteos()
+        self.stdout.write(self.style.SUCCESS(f'Listo en {time.monotonic() - inicio:.1f}s'))
+
+    def _asignar(self, indice, queryset, lote):
+        """Recorre por id en lotes y escribe un UPDATE por comuna y lote"""
+        procesados = actualizados = 0
+        segundos = 0.0
+        ultimo_id = 0
+        while True:
+            filas = list(
+                queryset.filter(id__gt=ultimo_id).order_by('id')
+                .values_list('id', 'ubicacion_lat', 'ubicacion_lng', 'comuna')[:lote]
+            )
+            if not filas:
+                break
+            ultimo_id = filas[-1][0]
+
+            t = time.monotonic()
+            por_comuna = defaultdict(list)
+            for pk, lat, lng, actual in filas:
+                comuna = indice.comuna(lat, lng) or ''
+                if comuna != actual:
+                    por_comuna[comuna].append(pk)
+            segundos += time.monotonic() - t
+
+            with transaction.atomic():
+                for comuna, ids in por_comuna.items():
+                    queryset.model.objects.filter(pk__in=ids).update(comuna=comuna)
+            procesados += len(filas)
+            actualizados += sum(len(ids) for ids in por_comuna.values())
+        return procesados, actualizados, segundos
@@ -0,0 +1,165 @@
+import io
+import os
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+RUTAS_SYNC = [
+    '/api/analytics/heatmap/',
+    '/api/reportes/estadisticas/',
+    '/api/categorias/',
+]
+
+RUTAS_ASYNC = [
+    '/api/async/analytics/heatmap/',
+    '/api/async/reportes/estadisticas/',
+    '/api/async/categorias/',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide latencia vs. concurrencia contra un servidor en ejecución. '
+        'Comparar el despliegue sync (wsgi) con el async (asgi) usando --modo'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url-base', default='http://localhost:8000',
+                            help='URL del servidor a medir')
+        parser.add_argument('--modo', choices=['sync', 'async'], default='sync',
+                            help='Conjunto de endpoints a medir')
+        parser.add_argument('--rutas', nargs='*',
+                            help='Rutas explícitas (reemplaza a --modo)')
+        parser.add_argument('--niveles', default='1,5,10,25,50,100',
+                            help='Niveles de concurrencia separados por coma')
+        parser.add_argument('--peticiones', type=int, default=200,
+                            help='Peticiones por nivel de concurrencia')
+        parser.add_argument('--timeout', type=float, default=30.0)
+        parser.add_argument('--inundar', type=int, default=0,
+                            help='Hilos que envían POST /api/reportes/ con foto mientras se mide '
+                                 '(simula una inundación de creaciones anónimas)')
+        parser.add_argument('--foto-kb', type=int, default=500,
+                            help='Tamaño de la foto de cada POST de --inundar')
+        parser.add_argument('--categoria', type=int, default=1,
+                            help='Categoría de los reportes de --inundar')
+
+    def handle(self, *args, **options):
+        rutas = options['rutas'] or (RUTAS_ASYNC if options['modo'] == 'async' else RUTAS_SYNC)
+        url_base = options['url_base'].rstrip('/')
+        niveles = [int(n) for n in options['niveles'].split(',') if n.strip()]
+        if not niveles:
+            raise CommandError('--niveles no puede estar vacío')
+
+        self.timeout = options['timeout']
+        urls = [url_base + ruta for ruta in rutas]
+
+        self.stdout.write(f'Endpoints: {", ".join(rutas)}')
+        inundacion = None
+        if options['inundar']:
+            inundacion = self._iniciar_inundacion(url_base, options)
+            self.stdout.write(f'Inundando POST /api/reportes/ con {options["inundar"]} hilos')
+        self.stdout.write(f'{"concurrencia":>12} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"errores":>8}')
+
+        try:
+            self._medir_niveles(urls, niveles, options['peticiones'])
+        finally:
+            if inundacion:
+                detener, hilos, respuestas = inundacion
+                detener.set()
+                for hilo in hilos:
+                    hilo.join()
+                resumen = ', '.join(f'{codigo}: {n}' for codigo, n in sorted(respuestas.items(), key=str))
+                self.stdout.write(f'Respuestas a la inundación: {resumen or "ninguna"}')
+
+    def _medir_niveles(self, urls, niveles, peticiones):
+        for nivel in niveles:
+            latencias, errores, duracion = self._medir(urls, nivel, peticiones)
+            if latencias:
+                cuantiles = statistics.quantiles(latencias, n=100) if len(latencias) > 1 else latencias * 99
+                p50, p95, p99 = cuantiles[49], cuantiles[94], cuantiles[98]
+            else:
+                p50 = p95 = p99 = float('nan')
+            self.stdout.write(
+                f'{nivel:>12} {len(latencias) / duracion:>8.1f} '
+                f'{p50:>8.1f} {p95:>8.1f} {p99:>8.1f} {errores:>8}'
+            )
+
+    def _peticion(self, url):
+        inicio = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=self.timeout) as response:
+                response.read()
+        except (urllib.error.URLError, OSError):
+            return None
+        return (time.perf_counter() - inicio) * 1000
+
+    def _medir(self, urls, concurrencia, total):
+        objetivos = [urls[i % len(urls)] for i in range(total)]
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+            resultados = list(pool.map(self._peticion, objetivos))
+        duracion = time.perf_counter() - inicio
+        latencias = [r for r in resultados if r is not None]
+        return latencias, len(resultados) - len(latencias), duracion
+
+    @staticmethod
+    def _foto(tamano):
+        """JPEG válido (pasa la validación de ImageField) relleno hasta `tamano` bytes"""
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 64), (40, 120, 40)).save(buffer, format='JPEG')
+        datos = buffer.getvalue()
+        return datos + os.urandom(max(0, tamano - len(datos)))
+
+    def _iniciar_inundacion(self, url_base, options):
+        """Hilos que crean reportes sin pausa hasta que termina la medición"""
+        detener = threading.Event()
+        respuestas = Counter()
+        lock = threading.Lock()
+        foto = self._foto(options['foto_kb'] * 1024)
+        url = url_base + '/api/reportes/'
+
+        def enviar():
+            while not detener.is_set():
+                limite = uuid.uuid4().hex
+                campos = {
+                    'categoria': str(options['categoria']),
+                    'descripcion': 'benchmark inundación',
+                    'lat': '-33.45', 'lng': '-70.66',
+                }
+                partes = [
+                    f'--{limite}\r\nContent-Disposition: form-data; name="{nombre}"\r\n\r\n{valor}\r\n'.encode()
+                    for nombre, valor in campos.items()
+                ]
+                partes.append(
+                    f'--{limite}\r\nContent-Disposition: form-data; name="foto"; filename="foto.jpg"\r\n'
+                    f'Content-Type: image/jpeg\r\n\r\n'.encode() + foto + f'\r\n--{limite}--\r\n'.encode()
+                )
+                peticion = urllib.request.Request(
+                    url, data=b''.join(partes), method='POST',
+                    headers={'Content-Type': f'multipart/form-data; boundary={limite}'},
+                )
+                try:
+                    with urllib.request.urlopen(peticion, timeout=self.timeout) as response:
+                        response.read()
+                        codigo = response.status
+                except urllib.error.HTTPError as e:
+                    codigo = e.code
+                except (urllib.error.URLError, OSError):
+                    codigo = 'error'
+                with lock:
+                    respuestas[codigo] += 1
+
+        hilos = [threading.Thread(target=enviar, daemon=True) for _ in range(options['inundar'])]
+        for hilo in hilos:
+            hilo.start()
+        return detener, hilos, respuestas
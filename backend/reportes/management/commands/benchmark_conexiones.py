@@ -0,0 +1,79 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from ecoalerta.db_pool import pool
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide cuánto ahorra el pool de conexiones por petición: abrir una conexión '
+        'nueva, consultar y cerrarla contra el ciclo de una petición de Django '
+        '(conectar, consultar y cerrar al terminar) con ENGINE ecoalerta.db_pool'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=100,
+                            help='Peticiones simuladas por estrategia (default: 100)')
+        parser.add_argument('--alias', default='default',
+                            help='Base de datos a medir (default, replica_1, ...)')
+        parser.add_argument('--consulta', default='SELECT 1',
+                            help='Consulta de cada petición (default: SELECT 1)')
+
+    def handle(self, *args, **options):
+        wrapper = connections[options['alias']]
+        if wrapper.vendor != 'postgresql':
+            raise CommandError('El benchmark requiere PostgreSQL (DB_HOST, DB_SSLMODE, ...)')
+        wrapper.close()
+
+        repeticiones = options['repeticiones']
+        consulta = options['consulta']
+        parametros = wrapper.get_connection_params()
+        usa_pool = getattr(wrapper, 'usa_pool', False)
+        self.stdout.write(
+            f'{wrapper.settings_dict["HOST"]} ({wrapper.settings_dict["ENGINE"]}), '
+            f'{repeticiones} peticiones: {consulta}'
+        )
+        if not usa_pool:
+            self.stdout.write(self.style.WARNING('DB_POOL=False: la segunda estrategia también abre una conexión'))
+
+        def conexion_nueva():
+            conexion = wrapper.Database.connect(**parametros)
+            try:
+                with conexion.cursor() as cursor:
+                    cursor.execute(consulta)
+                    cursor.fetchall()
+            finally:
+                conexion.close()
+
+        def peticion_django():
+            with wrapper.cursor() as cursor:
+                cursor.execute(consulta)
+                cursor.fetchall()
+            # Lo que hace Django al terminar la petición (CONN_MAX_AGE 0)
+            wrapper.close_if_unusable_or_obsolete()
+
+        self.stdout.write(f'{"estrategia":<24} {"p50 ms":>8} {"p95 ms":>8} {"prom ms":>8}')
+        nueva = self._medir('conexión nueva', conexion_nueva, repeticiones)
+        reutilizada = self._medir('pool' if usa_pool else 'Django sin pool', peticion_django, repeticiones)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Ahorro por petición: {nueva[0] - reutilizada[0]:.1f} ms (p50), '
+            f'{statistics.mean(nueva[1]) - statistics.mean(reutilizada[1]):.1f} ms (promedio)'
+        ))
+        if usa_pool:
+            self.stdout.write(f'Pool: {pool.metricas().get(options["alias"])}')
+
+    def _medir(self, nombre, funcion, repeticiones):
+        funcion()  # la primera abre la conexión del pool
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        p50 = statistics.median(tiempos)
+        p95 = statistics.quantiles(tiempos, n=20)[-1] if len(tiempos) > 1 else tiempos[0]
+        self.stdout.write(f'{nombre:<24} {p50:>8.2f} {p95:>8.2f} {statistics.mean(tiempos):>8.2f}')
+        return p50, tiempos
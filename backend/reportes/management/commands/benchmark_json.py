@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+from rest_framework.renderers import JSONRenderer
+
+from ecoalerta.renderers import FastJSONRenderer, orjson
+
+
+ENDPOINTS = [
+    '/api/reportes/',
+    '/api/reportes/?page=2',
+    '/api/analytics/heatmap/',
+    '/api/analytics/heatmap/?radio=0.002',
+    '/api/reportes/estadisticas/',
+]
+
+
+class Command(BaseCommand):
+    help = 'Mide CPU por request, costo del renderer JSON y bytes transferidos con y sin compresión'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=20)
+        parser.add_argument('--endpoints', nargs='*', default=ENDPOINTS)
+
+    def handle(self, *args, **options):
+        repeticiones = options['repeticiones']
+        client = Client()
+
+        self.stdout.write(f'orjson disponible: {"sí" if orjson else "no"}')
+        self.stdout.write(
+            f'{"endpoint":<40} {"identity":>10} {"gzip":>10} {"br":>10} '
+            f'{"cpu ms":>8} {"json ms":>8} {"orjson ms":>9}'
+        )
+
+        for endpoint in options['endpoints']:
+            tamanos = {}
+            for codificacion in ('identity', 'gzip', 'br'):
+                response = client.get(endpoint, HTTP_ACCEPT_ENCODING=codificacion)
+                if response.get('Content-Encoding', 'identity') == codificacion:
+                    tamanos[codificacion] = len(response.content)
+                else:
+                    tamanos[codificacion] = None
+
+            # CPU por request completo (sin compresión)
+            inicio = time.process_time()
+            for _ in range(repeticiones):
+                response = client.get(endpoint, HTTP_ACCEPT_ENCODING='identity')
+            cpu_ms = (time.process_time() - inicio) / repeticiones * 1000
+
+            # Solo el renderer: stock vs. orjson sobre los mismos datos
+            data = response.data
+            json_ms = self._medir_renderer(JSONRenderer(), data, repeticiones)
+            orjson_ms = self._medir_renderer(FastJSONRenderer(), data, repeticiones)
+
+            def fmt(valor):
+                return f'{valor:>10,}' if valor is not None else f'{"-":>10}'
+
+            self.stdout.write(
+                f'{endpoint:<40} {fmt(tamanos["identity"])} {fmt(tamanos["gzip"])} '
+                f'{fmt(tamanos["br"])} {cpu_ms:>8.2f} {json_ms:>8.3f} {orjson_ms:>9.3f}'
+            )
+
+    @staticmethod
+    def _medir_renderer(renderer, data, repeticiones):
+        inicio = time.process_time()
+        for _ in range(repeticiones):
+            renderer.render(data)
+        return (time.process_time() - inicio) / repeticiones * 1000
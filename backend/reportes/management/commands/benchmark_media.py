@@ -0,0 +1,155 @@
+import os
+import socket
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.http import FileResponse
+
+CARPETA = 'benchmark'
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide el envío de archivos de /media/. Sin --url-base compara en el proceso '
+        'FileResponse (lectura en Python) con sendfile; con --url-base mide un '
+        'servidor en ejecución (respuesta completa, Range e If-None-Match)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamano-mb', type=float, default=5.0,
+                            help='Tamaño del archivo de prueba (default: 5 MB)')
+        parser.add_argument('--repeticiones', type=int, default=50,
+                            help='Envíos por estrategia o peticiones por prueba HTTP')
+        parser.add_argument('--url-base',
+                            help='Servidor a medir, p. ej. http://localhost:8000')
+        parser.add_argument('--concurrencia', type=int, default=4,
+                            help='Peticiones simultáneas en la prueba HTTP')
+
+    def handle(self, *args, **options):
+        ruta, nombre = self._archivo_de_prueba(int(options['tamano_mb'] * 1024 * 1024))
+        tamano = os.path.getsize(ruta)
+        self.stdout.write(f'Archivo: {nombre} ({tamano / 1024 / 1024:.1f} MB)')
+
+        if options['url_base']:
+            self._http(options['url_base'].rstrip('/') + settings.MEDIA_URL + nombre, tamano, options)
+        else:
+            self._local(ruta, tamano, options['repeticiones'])
+
+    def _archivo_de_prueba(self, tamano):
+        nombre = f'{CARPETA}/benchmark_{tamano}.bin'
+        ruta = os.path.join(settings.MEDIA_ROOT, nombre)
+        if not os.path.exists(ruta) or os.path.getsize(ruta) != tamano:
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            with open(ruta, 'wb') as archivo:
+                archivo.write(os.urandom(tamano))
+        return ruta, nombre
+
+    # Comparación en el proceso: el mismo archivo por un socket local
+
+    def _local(self, ruta, tamano, repeticiones):
+        estrategias = [
+            ('FileResponse (lectura en Python)', self._enviar_file_response),
+            ('sendfile (sin copia)', self._enviar_sendfile),
+        ]
+        self.stdout.write(f'{"estrategia":<34} {"MB/s":>10} {"ms/envío":>10}')
+        for nombre, enviar in estrategias:
+            segundos = self._medir_local(ruta, tamano, repeticiones, enviar)
+            self.stdout.write(
+                f'{nombre:<34} {tamano * repeticiones / segundos / 1024 / 1024:>10.0f} '
+                f'{segundos / repeticiones * 1000:>10.2f}'
+            )
+
+    @staticmethod
+    def _enviar_file_response(ruta, conexion):
+        response = FileResponse(open(ruta, 'rb'))
+        try:
+            for chunk in response:
+                conexion.sendall(chunk)
+        finally:
+            response.close()
+
+    @staticmethod
+    def _enviar_sendfile(ruta, conexion):
+        with open(ruta, 'rb') as archivo:
+            conexion.sendfile(archivo)
+
+    @staticmethod
+    def _medir_local(ruta, tamano, repeticiones, enviar):
+        emisor, receptor = socket.socketpair()
+
+        def drenar():
+            pendiente = tamano * repeticiones
+            while pendiente > 0:
+                datos = receptor.recv(1024 * 1024)
+                if not datos:
+                    break
+                pendiente -= len(datos)
+
+        hilo = threading.Thread(target=drenar)
+        hilo.start()
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            enviar(ruta, emisor)
+        hilo.join()
+        segundos = time.perf_counter() - inicio
+        emisor.close()
+        receptor.close()
+        return segundos
+
+    # Servidor en ejecución
+
+    def _http(self, url, tamano, options):
+        repeticiones = options['repeticiones']
+        completa = self._peticion(url, {})
+        if completa is None or completa[0] != 200:
+            self.stdout.write(self.style.ERROR(f'No se pudo descargar {url}'))
+            return
+        etag = completa[1].get('ETag')
+        self.stdout.write(f'Cache-Control: {completa[1].get("Cache-Control")}  ETag: {etag}')
+
+        tramo = min(tamano, 1024 * 1024)
+        pruebas = [
+            ('completa', {}, 200, tamano),
+            ('Range 1 MB', {'Range': f'bytes={tamano // 2 - tramo // 2}-{tamano // 2 + tramo // 2 - 1}'}, 206, tramo),
+            ('If-None-Match', {'If-None-Match': etag}, 304, 0),
+        ]
+        self.stdout.write(f'{"prueba":<16} {"req/s":>8} {"MB/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"errores":>8}')
+        for nombre, encabezados, esperado, bytes_esperados in pruebas:
+            inicio = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['concurrencia']) as pool:
+                resultados = list(pool.map(lambda _: self._peticion(url, encabezados), range(repeticiones)))
+            duracion = time.perf_counter() - inicio
+
+            validos = [r for r in resultados if r and r[0] == esperado and r[2] == bytes_esperados]
+            latencias = sorted(r[3] for r in validos)
+            if len(latencias) > 1:
+                cuantiles = statistics.quantiles(latencias, n=100)
+                p50, p95 = cuantiles[49], cuantiles[94]
+            else:
+                p50 = p95 = latencias[0] if latencias else float('nan')
+            self.stdout.write(
+                f'{nombre:<16} {len(validos) / duracion:>8.1f} '
+                f'{len(validos) * bytes_esperados / duracion / 1024 / 1024:>8.1f} '
+                f'{p50:>8.1f} {p95:>8.1f} {repeticiones - len(validos):>8}'
+            )
+
+    @staticmethod
+    def _peticion(url, encabezados):
+        """(status, headers, bytes recibidos, ms) o None si falla la conexión"""
+        peticion = urllib.request.Request(url, headers=encabezados)
+        inicio = time.perf_counter()
+        try:
+            with urllib.request.urlopen(peticion, timeout=60) as response:
+                cuerpo = response.read()
+                codigo, headers = response.status, response.headers
+        except urllib.error.HTTPError as e:
+            cuerpo, codigo, headers = e.read(), e.code, e.headers
+        except (urllib.error.URLError, OSError):
+            return None
+        return codigo, headers, len(cuerpo), (time.perf_counter() - inicio) * 1000
@@ -0,0 +1,74 @@
+import math
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from reportes import rutas
+
+# Centro de Santiago
+CENTRO = (-33.4489, -70.6693)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara la ruta planificada (vecino más cercano + 2-opt) con visitar los '
+        'reportes en orden aleatorio, sobre puntos sintéticos alrededor de Santiago'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--paradas', type=int, nargs='*', default=[25, 100, 300, 500],
+                            help='Cantidades de paradas a medir')
+        parser.add_argument('--radio-km', type=float, default=10.0,
+                            help='Radio de la zona con reportes (default: 10 km)')
+        parser.add_argument('--aleatorias', type=int, default=20,
+                            help='Rutas aleatorias promediadas como referencia')
+        parser.add_argument('--volver', action='store_true',
+                            help='Rutas que regresan al punto de partida')
+        parser.add_argument('--semilla', type=int, default=1)
+
+    def handle(self, *args, **options):
+        generador = random.Random(options['semilla'])
+        volver = options['volver']
+        self.stdout.write(f'numpy disponible: {"sí" if rutas.np is not None else "no"}')
+        self.stdout.write(
+            f'{"paradas":>8} {"aleatoria km":>13} {"vecino km":>10} {"2-opt km":>9} '
+            f'{"ahorro":>7} {"matriz ms":>10} {"vecino ms":>10} {"ruta ms":>8}'
+        )
+
+        for n in options['paradas']:
+            puntos = [self._punto(generador, options['radio_km']) for _ in range(n)]
+            inicio = CENTRO
+
+            t0 = time.perf_counter()
+            matriz = rutas.matriz_distancias([inicio] + puntos)
+            t1 = time.perf_counter()
+            vecino = rutas.vecino_mas_cercano(matriz)
+            t2 = time.perf_counter()
+            # La ruta completa: matriz, vecino más cercano y 2-opt
+            _, _, total = rutas.planificar(inicio, puntos, volver)
+            t3 = time.perf_counter()
+
+            cierre = [0] if volver else []
+            aleatorias = []
+            for _ in range(options['aleatorias']):
+                orden = list(range(1, n + 1))
+                generador.shuffle(orden)
+                aleatorias.append(rutas.longitud(matriz, [0] + orden + cierre))
+            aleatoria = sum(aleatorias) / len(aleatorias)
+            solo_vecino = rutas.longitud(matriz, vecino + cierre)
+
+            self.stdout.write(
+                f'{n:>8} {aleatoria / 1000:>13.1f} {solo_vecino / 1000:>10.1f} {total / 1000:>9.1f} '
+                f'{1 - total / aleatoria:>7.0%} {(t1 - t0) * 1000:>10.1f} {(t2 - t1) * 1000:>10.1f} '
+                f'{(t3 - t2) * 1000:>8.1f}'
+            )
+
+    @staticmethod
+    def _punto(generador, radio_km):
+        """Punto uniforme en un círculo de radio_km alrededor del centro"""
+        distancia = radio_km * 1000 * math.sqrt(generador.random())
+        angulo = generador.uniform(0, 2 * math.pi)
+        dlat = distancia * math.cos(angulo) / 111320.0
+        dlng = distancia * math.sin(angulo) / (111320.0 * math.cos(math.radians(CENTRO[0])))
+        return (CENTRO[0] + dlat, CENTRO[1] + dlng)
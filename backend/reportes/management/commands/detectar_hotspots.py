@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reportes.hotspots import DetectorHotspots
+
+
+class Command(BaseCommand):
+    help = (
+        'Detecta hotspots de reportes (DBSCAN sobre cuadrícula). Por defecto solo '
+        'recalcula las celdas con cambios desde la última ejecución'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--completo', action='store_true',
+                            help='Recalcular todos los hotspots desde cero')
+        parser.add_argument('--eps', type=float,
+                            help='Distancia máxima entre vecinos en metros (default: HOTSPOT_EPS_METROS)')
+        parser.add_argument('--min-reportes', type=int,
+                            help='Reportes mínimos a menos de eps para ser núcleo (default: HOTSPOT_MIN_REPORTES)')
+        parser.add_argument('--dias', type=int,
+                            help='Ventana de días hacia atrás (default: HOTSPOT_VENTANA_DIAS)')
+
+    def handle(self, *args, **options):
+        detector = DetectorHotspots(
+            eps_metros=options['eps'],
+            min_reportes=options['min_reportes'],
+            ventana_dias=options['dias'],
+        )
+
+        inicio = time.monotonic()
+        resultado = detector.ejecutar(completo=options['completo'])
+        transcurrido = time.monotonic() - inicio
+
+        tipo = 'completa' if resultado['completa'] else 'incremental'
+        self.stdout.write(
+            f'Ejecución {tipo}: {resultado["reportes_procesados"]} reportes en '
+            f'{resultado["celdas_procesadas"]} celdas'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{resultado["hotspots_recalculados"]} hotspots recalculados, '
+            f'{resultado["hotspots_totales"]} en total ({transcurrido:.1f}s)'
+        ))
@@ -0,0 +1,309 @@
+import io
+import math
+import random
+import string
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from reportes import comunas, prioridad
+from reportes.models import CategoriaResiduo, Reporte, Usuario
+
+
+# Centros urbanos de Chile: (nombre, lat, lng, peso relativo, dispersión en grados)
+CENTROS_URBANOS = [
+    ('Santiago', -33.4489, -70.6693, 40, 0.12),
+    ('Valparaíso', -33.0472, -71.6127, 9, 0.05),
+    ('Viña del Mar', -33.0245, -71.5518, 6, 0.03),
+    ('Concepción', -36.8201, -73.0444, 9, 0.06),
+    ('La Serena', -29.9027, -71.2519, 5, 0.04),
+    ('Antofagasta', -23.6509, -70.3975, 5, 0.04),
+    ('Temuco', -38.7359, -72.5904, 5, 0.04),
+    ('Rancagua', -34.1708, -70.7444, 4, 0.03),
+    ('Talca', -35.4264, -71.6554, 4, 0.03),
+    ('Arica', -18.4783, -70.3126, 3, 0.03),
+    ('Iquique', -20.2307, -70.1357, 3, 0.03),
+    ('Puerto Montt', -41.4689, -72.9411, 4, 0.04),
+    ('Chillán', -36.6066, -72.1034, 3, 0.03),
+]
+
+# Categorías de load_initial_data con su peso relativo
+CATEGORIAS = [
+    ('Residuos Domésticos', 'Basura doméstica común', 38),
+    ('Escombros de Construcción', 'Materiales de construcción', 24),
+    ('Mixtos', 'Mezcla de diferentes tipos de residuos', 16),
+    ('Residuos Orgánicos', 'Desechos orgánicos biodegradables', 11),
+    ('Residuos Electrónicos', 'Equipos electrónicos desechados', 7),
+    ('Residuos Peligrosos', 'Materiales tóxicos o peligrosos', 4),
+]
+
+DESCRIPCIONES = {
+    'Residuos Domésticos': [
+        'Bolsas de basura acumuladas en la vereda',
+        'Microbasural en sitio eriazo',
+        'Basura doméstica tirada junto al contenedor',
+    ],
+    'Escombros de Construcción': [
+        'Escombros de demolición en la berma',
+        'Sacos con restos de cemento y ladrillos',
+        'Camión dejó escombros durante la noche',
+    ],
+    'Mixtos': [
+        'Vertedero con residuos de todo tipo',
+        'Acumulación de muebles, bolsas y escombros',
+    ],
+    'Residuos Orgánicos': [
+        'Restos de poda abandonados',
+        'Desechos de feria acumulados',
+    ],
+    'Residuos Electrónicos': [
+        'Televisores y refrigerador abandonados',
+        'Restos de computadores en la calle',
+    ],
+    'Residuos Peligrosos': [
+        'Tambores con aceite usado',
+        'Baterías y envases de pintura abandonados',
+        'Neumáticos quemados junto al canal',
+    ],
+}
+
+CALLES = [
+    'Av. Libertador Bernardo O\'Higgins', 'Av. Independencia', 'Calle Los Aromos',
+    'Pasaje Las Rosas', 'Av. Colón', 'Calle Prat', 'Av. Pedro Montt', 'Calle Freire',
+    'Camino Lo Boza', 'Av. Recoleta', 'Calle Maipú', 'Av. Matta',
+]
+
+# Probabilidad de cada hora del día en hora local (más reportes de mañana y al atardecer)
+PESOS_HORA = [1, 1, 1, 1, 1, 2, 4, 7, 9, 9, 8, 7, 6, 6, 6, 7, 8, 9, 9, 8, 6, 4, 2, 1]
+
+# COPY no aplica los default del modelo: van todas las columnas NOT NULL
+COLUMNAS_COPY = [
+    'codigo_seguimiento', 'categoria_id', 'descripcion', 'email', 'foto',
+    'ubicacion_lat', 'ubicacion_lng', 'direccion', 'comuna', 'estado', 'notas_internas',
+    'fecha_creacion', 'fecha_actualizacion', 'creado_por_id', 'asignado_a_id',
+    'cantidad_duplicados', 'prioridad',
+]
+
+
+@contextmanager
+def sin_fechas_automaticas(model):
+    """Desactiva auto_now/auto_now_add para poder insertar fechas históricas"""
+    campos = [
+        f for f in model._meta.concrete_fields
+        if getattr(f, 'auto_now', False) or getattr(f, 'auto_now_add', False)
+    ]
+    originales = [(f, f.auto_now, f.auto_now_add) for f in campos]
+    for f in campos:
+        f.auto_now = False
+        f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in originales:
+            f.auto_now = auto_now
+            f.auto_now_add = auto_now_add
+
+
+class Command(BaseCommand):
+    help = 'Genera reportes sintéticos a escala de producción, agrupados en centros urbanos de Chile'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cantidad', type=int, default=100000,
+                            help='Número de reportes a generar (default: 100000)')
+        parser.add_argument('--lote', type=int, default=5000,
+                            help='Tamaño de cada lote de inserción (default: 5000)')
+        parser.add_argument('--semilla', type=int, default=42,
+                            help='Semilla para que la generación sea reproducible')
+        parser.add_argument('--dias', type=int, default=365,
+                            help='Ventana de días hacia atrás para las fechas de creación')
+        parser.add_argument('--inspectores', type=int, default=10,
+                            help='Inspectores sintéticos a los que asignar reportes')
+        parser.add_argument('--fotos', type=float, default=0.3,
+                            help='Fracción de reportes con foto de referencia (sin archivo real)')
+        parser.add_argument('--sin-copy', action='store_true',
+                            help='Usar bulk_create aunque la base de datos sea PostgreSQL')
+
+    def handle(self, *args, **options):
+        cantidad = options['cantidad']
+        lote = options['lote']
+        if cantidad <= 0 or lote <= 0:
+            raise CommandError('--cantidad y --lote deben ser positivos')
+
+        self.rng = random.Random(options['semilla'])
+        self.ahora = timezone.now()
+        self.dias = options['dias']
+        self.fraccion_fotos = options['fotos']
+
+        self.categorias = self._preparar_categorias()
+        self.inspectores = self._preparar_inspectores(options['inspectores'])
+        self.codigos_usados = set(
+            Reporte.objects.values_list('codigo_seguimiento', flat=True).iterator()
+        )
+
+        self.pesos_centros = [c[3] for c in CENTROS_URBANOS]
+        self.pesos_categorias = [c[2] for c in CATEGORIAS]
+
+        usar_copy = connection.vendor == 'postgresql' and not options['sin_copy']
+        escribir = self._escribir_copy if usar_copy else self._escribir_bulk
+        metodo = 'COPY' if usar_copy else 'bulk_create'
+        self.stdout.write(f'Generando {cantidad} reportes con {metodo} (lotes de {lote})...')
+
+        inicio = time.monotonic()
+        generados = 0
+        while generados < cantidad:
+            n = min(lote, cantidad - generados)
+            filas = [self._generar_fila() for _ in range(n)]
+            with transaction.atomic():
+                escribir(filas)
+            generados += n
+            transcurrido = time.monotonic() - inicio
+            self.stdout.write(
+                f'  {generados}/{cantidad} reportes '
+                f'({generados / transcurrido * 60:,.0f} filas/min)'
+            )
+
+        # Las filas entran con prioridad 0 (ni COPY ni bulk_create pasan por la
+        # señal pre_save): se calcula la cola completa, densidad incluida
+        self.stdout.write('Calculando la prioridad de los reportes abiertos...')
+        en_cola, _ = prioridad.actualizar_cola(lote)
+        self.stdout.write(f'  {en_cola} reportes en la cola de inspección')
+
+        transcurrido = time.monotonic() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f'\n¡{generados} reportes generados en {transcurrido:.1f}s '
+            f'({generados / transcurrido * 60:,.0f} filas/min)!'
+        ))
+
+    def _preparar_categorias(self):
+        categorias = []
+        for nombre, descripcion, _ in CATEGORIAS:
+            categoria, _ = CategoriaResiduo.objects.get_or_create(
+                nombre=nombre,
+                defaults={'descripcion': descripcion}
+            )
+            categorias.append(categoria)
+        return categorias
+
+    def _preparar_inspectores(self, cantidad):
+        inspectores = []
+        for i in range(1, cantidad + 1):
+            username = f'inspector_sintetico_{i:02d}'
+            inspector = Usuario.objects.filter(username=username).first()
+            if inspector is None:
+                # Sin contraseña utilizable: evita el costo de PBKDF2 por usuario
+                inspector = Usuario(
+                    username=username,
+                    tipo='inspector',
+                    email=f'{username}@ecoalerta.cl'
+                )
+                inspector.set_unusable_password()
+                inspector.save()
+            inspectores.append(inspector.id)
+        return inspectores
+
+    def _generar_codigo(self):
+        rng = self.rng
+        chars = string.ascii_uppercase + string.digits
+        while True:
+            code = ''.join(rng.choices(chars, k=3)) + '-' + ''.join(rng.choices(string.digits, k=4))
+            if code not in self.codigos_usados:
+                self.codigos_usados.add(code)
+                return code
+
+    def _generar_fecha(self):
+        rng = self.rng
+        # Más reportes recientes que antiguos (distribución exponencial truncada)
+        dias_atras = min(rng.expovariate(3.0 / self.dias), self.dias)
+        # Las horas de PESOS_HORA son locales (TIME_ZONE, America/Santiago), no UTC
+        fecha = timezone.localtime(self.ahora - timedelta(days=int(dias_atras)))
+        hora = rng.choices(range(24), weights=PESOS_HORA)[0]
+        fecha = fecha.replace(hour=hora, minute=rng.randrange(60), second=rng.randrange(60))
+        # Los reportes de hoy no pueden quedar en el futuro
+        return min(fecha, self.ahora), dias_atras
+
+    def _generar_estado(self, dias_atras):
+        # Los reportes antiguos tienden a estar resueltos o cerrados
+        rng = self.rng
+        avance = 1 - math.exp(-dias_atras / 30)
+        r = rng.random()
+        if r > avance:
+            return 'nuevo'
+        r = rng.random()
+        if r < 0.25:
+            return 'proceso'
+        if r < 0.75:
+            return 'resuelto'
+        return 'cerrado'
+
+    def _generar_fila(self):
+        rng = self.rng
+        _, lat, lng, _, dispersion = rng.choices(CENTROS_URBANOS, weights=self.pesos_centros)[0]
+        categoria = rng.choices(self.categorias, weights=self.pesos_categorias)[0]
+        fecha_creacion, dias_atras = self._generar_fecha()
+        estado = self._generar_estado(dias_atras)
+
+        asignado_a = None
+        fecha_actualizacion = fecha_creacion
+        if estado != 'nuevo':
+            if self.inspectores:
+                asignado_a = rng.choice(self.inspectores)
+            fecha_actualizacion = min(
+                fecha_creacion + timedelta(hours=rng.uniform(1, 24 * 20)),
+                self.ahora
+            )
+
+        foto = ''
+        if rng.random() < self.fraccion_fotos:
+            foto = f'reportes/sintetico_{rng.randrange(1000):03d}.jpg'
+
+        ubicacion_lat = round(rng.gauss(lat, dispersion), 6)
+        ubicacion_lng = round(rng.gauss(lng, dispersion), 6)
+
+        return {
+            'codigo_seguimiento': self._generar_codigo(),
+            'categoria_id': categoria.id,
+            'descripcion': rng.choice(DESCRIPCIONES[categoria.nombre]),
+            'email': f'vecino{rng.randrange(100000)}@example.cl' if rng.random() < 0.4 else '',
+            'foto': foto,
+            'ubicacion_lat': ubicacion_lat,
+            'ubicacion_lng': ubicacion_lng,
+            'direccion': f'{rng.choice(CALLES)} {rng.randrange(1, 9999)}',
+            'comuna': comunas.comuna_de(ubicacion_lat, ubicacion_lng),
+            'estado': estado,
+            'notas_internas': '',
+            'fecha_creacion': fecha_creacion,
+            'fecha_actualizacion': fecha_actualizacion,
+            'creado_por_id': None,
+            'asignado_a_id': asignado_a,
+            'cantidad_duplicados': 0,
+            'prioridad': 0,
+        }
+
+    def _escribir_bulk(self, filas):
+        with sin_fechas_automaticas(Reporte):
+            Reporte.objects.bulk_create([Reporte(**fila) for fila in filas])
+
+    def _escribir_copy(self, filas):
+        buffer = io.StringIO()
+        for fila in filas:
+            valores = []
+            for columna in COLUMNAS_COPY:
+                valor = fila[columna]
+                if valor is None:
+                    valores.append('\\N')
+                elif hasattr(valor, 'isoformat'):
+                    valores.append(valor.isoformat())
+                else:
+                    valores.append(str(valor).replace('\\', '\\\\').replace('\t', ' ').replace('\n', ' '))
+            buffer.write('\t'.join(valores))
+            buffer.write('\n')
+        buffer.seek(0)
+
+        tabla = Reporte._meta.db_table
+        sql = f'COPY {tabla} ({", ".join(COLUMNAS_COPY)}) FROM STDIN'
+        with connection.cursor() as cursor:
+            cursor.cursor.copy_expert(sql, buffer)
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from reportes.idempotencia import eliminar_vencidas
+
+
+class Command(BaseCommand):
+    help = 'Borra las Idempotency-Key vencidas (más antiguas que IDEMPOTENCIA_TTL_HORAS)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000,
+                            help='Claves borradas por consulta (default: 1000)')
+
+    def handle(self, *args, **options):
+        total = eliminar_vencidas(options['lote'])
+        self.stdout.write(self.style.SUCCESS(f'{total} claves vencidas eliminadas'))
@@ -8,18 +8,18 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         # Crear categorías de residuos
         categorias = [
-            {'nombre': 'Residuos Domésticos', 'descripcion': 'Basura doméstica común'},
-            {'nombre': 'Escombros de Construcción', 'descripcion': 'Materiales de construcción'},
-            {'nombre': 'Residuos Electrónicos', 'descripcion': 'Equipos electrónicos desechados'},
-            {'nombre': 'Residuos Orgánicos', 'descripcion': 'Desechos orgánicos biodegradables'},
-            {'nombre': 'Residuos Peligrosos', 'descripcion': 'Materiales tóxicos o peligrosos'},
-            {'nombre': 'Mixtos', 'descripcion': 'Mezcla de diferentes tipos de residuos'},
+            {'nombre': 'Residuos Domésticos', 'descripcion': 'Basura doméstica común', 'severidad': 2},
+            {'nombre': 'Escombros de Construcción', 'descripcion': 'Materiales de construcción', 'severidad': 3},
+            {'nombre': 'Residuos Electrónicos', 'descripcion': 'Equipos electrónicos desechados', 'severidad': 4},
+            {'nombre': 'Residuos Orgánicos', 'descripcion': 'Desechos orgánicos biodegradables', 'severidad': 2},
+            {'nombre': 'Residuos Peligrosos', 'descripcion': 'Materiales tóxicos o peligrosos', 'severidad': 5},
+            {'nombre': 'Mixtos', 'descripcion': 'Mezcla de diferentes tipos de residuos', 'severidad': 3},
         ]
 
         for cat_data in categorias:
             categoria, created = CategoriaResiduo.objects.get_or_create(
                 nombre=cat_data['nombre'],
-                defaults={'descripcion': cat_data['descripcion']}
+                defaults={'descripcion': cat_data['descripcion'], 'severidad': cat_data['severidad']}
             )
             if created:
                 self.stdout.write(
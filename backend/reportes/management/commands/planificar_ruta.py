@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from reportes.models import Usuario
+from reportes.rutas import ruta_inspector
+
+
+class Command(BaseCommand):
+    help = 'Planifica la ruta del día de un inspector sobre sus reportes abiertos asignados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('inspector', help='Nombre de usuario del inspector')
+        parser.add_argument('--lat', type=float, help='Latitud del punto de partida (default: centro de su zona)')
+        parser.add_argument('--lng', type=float, help='Longitud del punto de partida')
+        parser.add_argument('--volver', action='store_true', help='Terminar en el punto de partida')
+
+    def handle(self, *args, **options):
+        inspector = Usuario.objects.filter(username=options['inspector']).first()
+        if inspector is None:
+            raise CommandError(f'No existe el usuario {options["inspector"]}')
+        if (options['lat'] is None) != (options['lng'] is None):
+            raise CommandError('Indique --lat y --lng juntos')
+        inicio = (options['lat'], options['lng']) if options['lat'] is not None else None
+
+        try:
+            ruta = ruta_inspector(inspector.pk, inicio, volver=options['volver'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f'Partida: {ruta["inicio"]["lat"]:.5f}, {ruta["inicio"]["lng"]:.5f}')
+        for parada in ruta['paradas']:
+            self.stdout.write(
+                f'{parada["orden"]:>4}. {parada["codigo_seguimiento"]}  '
+                f'{parada["categoria_nombre"] or "Sin categoría":<28} '
+                f'+{parada["distancia_metros"] / 1000:.2f} km  {parada["direccion"]}'
+            )
+        if ruta['distancia_regreso_metros'] is not None:
+            self.stdout.write(f'      Regreso  +{ruta["distancia_regreso_metros"] / 1000:.2f} km')
+        if ruta['sin_ubicacion']:
+            self.stdout.write(self.style.WARNING(f'Sin ubicación: {", ".join(ruta["sin_ubicacion"])}'))
+        if ruta['omitidos']:
+            self.stdout.write(self.style.WARNING(f'{ruta["omitidos"]} reportes fuera del límite RUTAS_MAX_PARADAS'))
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(ruta["paradas"])} paradas, {ruta["distancia_total_metros"] / 1000:.1f} km '
+            f'(en orden de prioridad: {ruta["distancia_sin_optimizar_metros"] / 1000:.1f} km), '
+            f'calculada en {ruta["calculo_ms"]:.0f} ms'
+        ))
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max, Min
+
+from reportes.busqueda import poblar_lote, reparar_indice_busqueda
+from reportes.models import Reporte
+
+
+class Command(BaseCommand):
+    help = (
+        'Indexa para la búsqueda de texto completo los reportes existentes, por '
+        'lotes de ids (PostgreSQL, una vez tras la migración 0007). Los reportes '
+        'nuevos o editados los indexa el trigger'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=5000,
+                            help='Rango de ids por transacción (default: 5000)')
+        parser.add_argument('--pausa', type=float, default=0.0,
+                            help='Segundos de espera entre lotes (default: 0)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            # En SQLite la tabla FTS5 se reconstruye completa al repararla
+            reparar_indice_busqueda(connection)
+            self.stdout.write('Solo PostgreSQL necesita poblar la columna de búsqueda')
+            return
+
+        rango = Reporte.objects.aggregate(desde=Min('id'), hasta=Max('id'))
+        if rango['desde'] is None:
+            return
+
+        inicio = time.monotonic()
+        lote = options['lote']
+        indexados = 0
+        for desde in range(rango['desde'], rango['hasta'] + 1, lote):
+            with transaction.atomic():
+                indexados += poblar_lote(connection, desde, desde + lote)
+            if options['pausa']:
+                time.sleep(options['pausa'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{indexados} reportes indexados ({time.monotonic() - inicio:.1f}s)'
+        ))
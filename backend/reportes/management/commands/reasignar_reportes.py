@@ -0,0 +1,109 @@
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from reportes.asignacion import ESTADOS_ABIERTOS, IndiceZonas, MotorAsignacion, cargas_actuales
+from reportes.models import Reporte
+
+
+class Command(BaseCommand):
+    help = (
+        'Asigna los reportes abiertos sin inspector según zonas y capacidad. '
+        'Con --todos redistribuye también los ya asignados'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todos', action='store_true',
+                            help='Redistribuir todos los reportes abiertos, no solo los sin asignar')
+        parser.add_argument('--lote', type=int, default=1000,
+                            help='Ids por UPDATE (default: 1000)')
+        parser.add_argument('--simular', action='store_true',
+                            help='Calcular el reparto sin escribirlo')
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        indice = IndiceZonas()
+        if not indice.zonas:
+            self.stdout.write(self.style.WARNING('No hay zonas de inspector activas'))
+            return
+
+        abiertos = Reporte.objects.filter(estado__in=ESTADOS_ABIERTOS)
+        columnas = ('id', 'ubicacion_lat', 'ubicacion_lng', 'asignado_a_id')
+        por_inspector = defaultdict(list)
+        sin_cupo = 0
+        liberados = 0
+        total = 0
+        if options['todos']:
+            # Se reparte desde cero, pero los que no se pueden mover (sin
+            # ubicación o sin zona cercana) conservan su inspector y cuentan
+            # en su carga desde el principio
+            cargas = defaultdict(int)
+            repartir = []
+            # Los más antiguos primero, para que no queden fuera si se acaba el cupo
+            filas = abiertos.order_by('fecha_creacion').values_list(*columnas)
+            for pk, lat, lng, actual in filas.iterator(chunk_size=10000):
+                candidatos = indice.candidatos(lat, lng) if lat is not None and lng is not None else []
+                if candidatos:
+                    repartir.append((pk, lat, lng, actual, candidatos))
+                    continue
+                if lat is not None and lng is not None:
+                    total += 1
+                    sin_cupo += 1
+                if actual is not None:
+                    cargas[actual] += 1
+            motor = MotorAsignacion(indice, cargas)
+        else:
+            filas = abiertos.filter(
+                asignado_a__isnull=True,
+                ubicacion_lat__isnull=False,
+                ubicacion_lng__isnull=False,
+            ).order_by('fecha_creacion').values_list(*columnas)
+            repartir = ((pk, lat, lng, actual, None) for pk, lat, lng, actual in filas.iterator(chunk_size=10000))
+            motor = MotorAsignacion(indice, cargas_actuales())
+
+        for pk, lat, lng, actual, candidatos in repartir:
+            total += 1
+            elegido = motor.elegir(lat, lng, candidatos)
+            if elegido is None:
+                sin_cupo += 1
+                if actual is None:
+                    continue
+                capacidad = indice.capacidades.get(actual)
+                if capacidad is None or motor.cargas.get(actual, 0) < capacidad:
+                    # Se queda con su inspector actual, que tiene cupo
+                    motor.cargas[actual] = motor.cargas.get(actual, 0) + 1
+                    continue
+                # Su inspector ya se llenó en este reparto: queda sin asignar
+                liberados += 1
+            if elegido != actual:
+                por_inspector[elegido].append(pk)
+
+        cambios = sum(len(ids) for ids in por_inspector.values())
+        self.stdout.write(
+            f'{total} reportes evaluados, {cambios} cambian de inspector, '
+            f'{sin_cupo} sin zona o sin cupo, {liberados} quedan sin inspector '
+            f'({time.monotonic() - inicio:.1f}s)'
+        )
+        if options['simular'] or not cambios:
+            return
+
+        lote = options['lote']
+        ahora = timezone.now()
+        with transaction.atomic():
+            for inspector_id, ids in por_inspector.items():
+                for i in range(0, len(ids), lote):
+                    Reporte.objects.filter(pk__in=ids[i:i + lote]).update(
+                        asignado_a_id=inspector_id,
+                        fecha_actualizacion=ahora,
+                    )
+
+        resumen = ', '.join(
+            f'{inspector_id}: {carga}' for inspector_id, carga in sorted(motor.cargas.items())
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{cambios} reportes reasignados en {time.monotonic() - inicio:.1f}s'
+        ))
+        self.stdout.write(f'Carga por inspector: {resumen}')
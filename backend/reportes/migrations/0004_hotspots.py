@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0003_add_ubicacion_lat_lng'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EjecucionHotspots',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+                ('marca_de_agua', models.DateTimeField()),
+                ('inicio_ventana', models.DateTimeField()),
+                ('completa', models.BooleanField(default=False)),
+                ('celdas_procesadas', models.PositiveIntegerField(default=0)),
+                ('hotspots_detectados', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Ejecución de detección de hotspots',
+                'verbose_name_plural': 'Ejecuciones de detección de hotspots',
+                'ordering': ['-fecha'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Hotspot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('centro_lat', models.FloatField()),
+                ('centro_lng', models.FloatField()),
+                ('min_lat', models.FloatField()),
+                ('min_lng', models.FloatField()),
+                ('max_lat', models.FloatField()),
+                ('max_lng', models.FloatField()),
+                ('cantidad_reportes', models.PositiveIntegerField()),
+                ('reportes_abiertos', models.PositiveIntegerField(default=0)),
+                ('fecha_primer_reporte', models.DateTimeField()),
+                ('fecha_ultimo_reporte', models.DateTimeField()),
+                ('categorias', models.JSONField(default=dict)),
+                ('celdas', models.JSONField(default=list)),
+                ('fecha_calculo', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Hotspot',
+                'verbose_name_plural': 'Hotspots',
+                'ordering': ['-cantidad_reportes'],
+                'indexes': [models.Index(fields=['cantidad_reportes'], name='reportes_ho_cantida_fd083d_idx'), models.Index(fields=['fecha_ultimo_reporte'], name='reportes_ho_fecha_u_6fdc77_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0004_hotspots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reporte',
+            name='cantidad_duplicados',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='reporte',
+            name='duplicado_de',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicados', to='reportes.reporte'),
+        ),
+        migrations.AddIndex(
+            model_name='reporte',
+            index=models.Index(fields=['categoria', 'ubicacion_lat', 'ubicacion_lng'], name='reporte_duplicados_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0005_reporte_duplicados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ZonaInspector',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100)),
+                ('centro_lat', models.FloatField()),
+                ('centro_lng', models.FloatField()),
+                ('radio_metros', models.PositiveIntegerField(default=3000)),
+                ('activa', models.BooleanField(default=True)),
+            ],
+            options={
+                'verbose_name': 'Zona de Inspector',
+                'verbose_name_plural': 'Zonas de Inspectores',
+            },
+        ),
+        migrations.AddField(
+            model_name='usuario',
+            name='capacidad',
+            field=models.PositiveIntegerField(default=50),
+        ),
+        migrations.AddIndex(
+            model_name='reporte',
+            index=models.Index(fields=['asignado_a', 'estado'], name='reporte_carga_idx'),
+        ),
+        migrations.AddField(
+            model_name='zonainspector',
+            name='inspector',
+            field=models.ForeignKey(limit_choices_to={'tipo': 'inspector'}, on_delete=django.db.models.deletion.CASCADE, related_name='zonas', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
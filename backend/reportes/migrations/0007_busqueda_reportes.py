@@ -0,0 +1,108 @@
+"""
+Índice de texto completo para reportes (ver reportes/busqueda.py).
+
+PostgreSQL: columna tsvector + trigger + índice GIN. Los reportes existentes no
+se indexan aquí (reescribiría la tabla completa en una transacción): se pueblan
+por lotes con `manage.py poblar_busqueda`.
+SQLite: tabla FTS5 externa sincronizada con triggers.
+
+El SQL va copiado aquí para que la migración no cambie si cambia busqueda.py.
+"""
+from django.db import migrations
+
+POSTGRES_CREAR = [
+    "ALTER TABLE reportes_reporte ADD COLUMN IF NOT EXISTS busqueda tsvector",
+    """
+    CREATE OR REPLACE FUNCTION reportes_reporte_busqueda() RETURNS trigger AS $$
+    BEGIN
+        NEW.busqueda :=
+            setweight(to_tsvector('simple', coalesce(NEW.codigo_seguimiento, '')), 'A') ||
+            setweight(to_tsvector('spanish', coalesce(NEW.direccion, '')), 'A') ||
+            setweight(to_tsvector('spanish', coalesce(NEW.descripcion, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS reportes_reporte_busqueda_trg ON reportes_reporte",
+    """
+    CREATE TRIGGER reportes_reporte_busqueda_trg
+    BEFORE INSERT OR UPDATE OF codigo_seguimiento, direccion, descripcion
+    ON reportes_reporte
+    FOR EACH ROW EXECUTE PROCEDURE reportes_reporte_busqueda()
+    """,
+    "CREATE INDEX IF NOT EXISTS reporte_busqueda_gin ON reportes_reporte USING gin (busqueda)",
+]
+
+POSTGRES_ELIMINAR = [
+    "DROP INDEX IF EXISTS reporte_busqueda_gin",
+    "DROP TRIGGER IF EXISTS reportes_reporte_busqueda_trg ON reportes_reporte",
+    "DROP FUNCTION IF EXISTS reportes_reporte_busqueda()",
+    "ALTER TABLE reportes_reporte DROP COLUMN IF EXISTS busqueda",
+]
+
+SQLITE_CREAR = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS reportes_reporte_fts USING fts5(
+        codigo_seguimiento, direccion, descripcion,
+        content='reportes_reporte', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS reportes_reporte_fts_ai AFTER INSERT ON reportes_reporte BEGIN
+        INSERT INTO reportes_reporte_fts(rowid, codigo_seguimiento, direccion, descripcion)
+        VALUES (new.id, new.codigo_seguimiento, new.direccion, new.descripcion);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS reportes_reporte_fts_ad AFTER DELETE ON reportes_reporte BEGIN
+        INSERT INTO reportes_reporte_fts(reportes_reporte_fts, rowid, codigo_seguimiento, direccion, descripcion)
+        VALUES ('delete', old.id, old.codigo_seguimiento, old.direccion, old.descripcion);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS reportes_reporte_fts_au
+    AFTER UPDATE OF codigo_seguimiento, direccion, descripcion ON reportes_reporte BEGIN
+        INSERT INTO reportes_reporte_fts(reportes_reporte_fts, rowid, codigo_seguimiento, direccion, descripcion)
+        VALUES ('delete', old.id, old.codigo_seguimiento, old.direccion, old.descripcion);
+        INSERT INTO reportes_reporte_fts(rowid, codigo_seguimiento, direccion, descripcion)
+        VALUES (new.id, new.codigo_seguimiento, new.direccion, new.descripcion);
+    END
+    """,
+    # Base local de desarrollo: indexar lo existente es barato
+    "INSERT INTO reportes_reporte_fts(reportes_reporte_fts) VALUES ('rebuild')",
+]
+
+SQLITE_ELIMINAR = [
+    "DROP TRIGGER IF EXISTS reportes_reporte_fts_au",
+    "DROP TRIGGER IF EXISTS reportes_reporte_fts_ad",
+    "DROP TRIGGER IF EXISTS reportes_reporte_fts_ai",
+    "DROP TABLE IF EXISTS reportes_reporte_fts",
+]
+
+
+def _ejecutar(schema_editor, postgres, sqlite):
+    vendor = schema_editor.connection.vendor
+    sentencias = postgres if vendor == 'postgresql' else sqlite if vendor == 'sqlite' else []
+    for sql in sentencias:
+        schema_editor.execute(sql)
+
+
+def crear(apps, schema_editor):
+    _ejecutar(schema_editor, POSTGRES_CREAR, SQLITE_CREAR)
+
+
+def eliminar(apps, schema_editor):
+    _ejecutar(schema_editor, POSTGRES_ELIMINAR, SQLITE_ELIMINAR)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0006_zonas_inspector'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear, eliminar),
+    ]
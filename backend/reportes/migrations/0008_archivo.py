@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0007_busqueda_reportes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConteoArchivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado', models.CharField(max_length=20, unique=True)),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Conteo de Archivo',
+                'verbose_name_plural': 'Conteos de Archivo',
+            },
+        ),
+        migrations.CreateModel(
+            name='ReporteArchivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('codigo_seguimiento', models.CharField(max_length=10, unique=True)),
+                ('descripcion', models.TextField(blank=True)),
+                ('email', models.EmailField(blank=True, max_length=254)),
+                ('foto', models.ImageField(blank=True, null=True, upload_to='reportes/')),
+                ('ubicacion_lat', models.FloatField(blank=True, null=True)),
+                ('ubicacion_lng', models.FloatField(blank=True, null=True)),
+                ('direccion', models.CharField(blank=True, max_length=255)),
+                ('estado', models.CharField(choices=[('nuevo', 'Nuevo'), ('proceso', 'En Proceso'), ('resuelto', 'Resuelto'), ('cerrado', 'Cerrado')], max_length=20)),
+                ('notas_internas', models.TextField(blank=True)),
+                ('fecha_creacion', models.DateTimeField()),
+                ('fecha_actualizacion', models.DateTimeField()),
+                ('duplicado_de_id', models.BigIntegerField(blank=True, null=True)),
+                ('cantidad_duplicados', models.PositiveIntegerField(default=0)),
+                ('fecha_archivado', models.DateTimeField(auto_now_add=True)),
+                ('asignado_a', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('categoria', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='reportes.categoriaresiduo')),
+                ('creado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Reporte Archivado',
+                'verbose_name_plural': 'Reportes Archivados',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+        migrations.CreateModel(
+            name='NotificacionArchivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('titulo', models.CharField(max_length=200)),
+                ('mensaje', models.TextField()),
+                ('leido', models.BooleanField(default=False)),
+                ('fecha_creacion', models.DateTimeField()),
+                ('reporte', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notificaciones', to='reportes.reportearchivado')),
+            ],
+            options={
+                'verbose_name': 'Notificación Archivada',
+                'verbose_name_plural': 'Notificaciones Archivadas',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+    ]
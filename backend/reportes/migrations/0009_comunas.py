@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0008_archivo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conteoarchivo',
+            name='comuna',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='reporte',
+            name='comuna',
+            field=models.CharField(blank=True, db_index=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='reportearchivado',
+            name='comuna',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='conteoarchivo',
+            name='estado',
+            field=models.CharField(max_length=20),
+        ),
+        migrations.AlterUniqueTogether(
+            name='conteoarchivo',
+            unique_together={('estado', 'comuna')},
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:16
+
+import reportes.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0010_idempotencia'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reporte',
+            name='foto',
+            field=models.ImageField(blank=True, null=True, upload_to=reportes.models.ruta_foto),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:26
+
+from django.db import migrations, models
+
+# Severidad inicial de las categorías de load_initial_data
+SEVERIDADES = {
+    'Residuos Peligrosos': 5,
+    'Residuos Electrónicos': 4,
+    'Escombros de Construcción': 3,
+    'Mixtos': 3,
+    'Residuos Domésticos': 2,
+    'Residuos Orgánicos': 2,
+}
+
+
+def asignar_severidades(apps, schema_editor):
+    CategoriaResiduo = apps.get_model('reportes', 'CategoriaResiduo')
+    for nombre, severidad in SEVERIDADES.items():
+        CategoriaResiduo.objects.filter(nombre=nombre).update(severidad=severidad)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0011_foto_por_contenido'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categoriaresiduo',
+            name='severidad',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'Muy baja'), (2, 'Baja'), (3, 'Media'), (4, 'Alta'), (5, 'Crítica')], default=3),
+        ),
+        migrations.AddField(
+            model_name='reporte',
+            name='prioridad',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='reporte',
+            index=models.Index(condition=models.Q(('duplicado_de__isnull', True), ('estado__in', ['nuevo', 'proceso'])), fields=['-prioridad', 'id'], name='reporte_cola_idx'),
+        ),
+        migrations.RunPython(asignar_severidades, migrations.RunPython.noop),
+    ]
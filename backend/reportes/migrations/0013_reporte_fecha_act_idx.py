@@ -0,0 +1,47 @@
+"""
+Índice de fecha_actualizacion para la marca de agua de los índices en memoria
+(reportes/clustering.py, reportes/columnar.py y los hotspots incrementales).
+
+Cada worker sondea cada pocos segundos los reportes con fecha_actualizacion
+posterior a su marca de agua, y al reconstruir toma el Max de esa columna. Con
+el índice, el sondeo lee solo las filas cambiadas y el Max es una lectura del
+extremo del índice, en vez de recorrer la tabla completa en cada worker.
+"""
+from django.db import migrations, models
+
+INDICE = models.Index(fields=['fecha_actualizacion'], name='reporte_fecha_act_idx')
+
+
+def crear_indice(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        # Sin bloquear las escrituras mientras se construye sobre la tabla completa
+        schema_editor.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS reporte_fecha_act_idx '
+            'ON reportes_reporte (fecha_actualizacion)'
+        )
+    else:
+        schema_editor.add_index(apps.get_model('reportes', 'Reporte'), INDICE)
+
+
+def eliminar_indice(apps, schema_editor):
+    schema_editor.remove_index(apps.get_model('reportes', 'Reporte'), INDICE)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY no puede ejecutarse dentro de una transacción
+    atomic = False
+
+    dependencies = [
+        ('reportes', '0012_prioridad'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='reporte', index=INDICE),
+            ],
+            database_operations=[
+                migrations.RunPython(crear_indice, eliminar_indice),
+            ],
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 21:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0013_reporte_fecha_act_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UbicacionRetirada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ubicacion_lat', models.FloatField()),
+                ('ubicacion_lng', models.FloatField()),
+                ('fecha', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Ubicación retirada',
+                'verbose_name_plural': 'Ubicaciones retiradas',
+            },
+        ),
+        migrations.AddField(
+            model_name='ejecucionhotspots',
+            name='eps_metros',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name='ejecucionhotspots',
+            name='min_reportes',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='ejecucionhotspots',
+            name='ventana_dias',
+            field=models.PositiveIntegerField(null=True),
+        ),
+    ]
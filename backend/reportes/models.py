@@ -1,11 +1,28 @@
 # Models - Usando modelos estándar (sin PostGIS por ahora)
 # TODO: Migrar a PostGIS cuando GDAL esté instalado correctamente en Azure
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+import hashlib
+import os
 import secrets
 import string
 
 
+def ruta_foto(instance, filename):
+    """
+    reportes/<sha256 del contenido>.<ext>: el nombre identifica el contenido,
+    así /media/ puede servirlo con cache inmutable (ecoalerta/media.py)
+    """
+    archivo = instance.foto.file
+    digest = hashlib.sha256()
+    for chunk in archivo.chunks() if hasattr(archivo, 'chunks') else iter(lambda: archivo.read(65536), b''):
+        digest.update(chunk)
+    archivo.seek(0)
+    extension = os.path.splitext(filename)[1].lower()
+    return f'reportes/{digest.hexdigest()[:32]}{extension}'
+
+
 def generate_tracking_code():
     """Genera un código de seguimiento único"""
     chars = string.ascii_uppercase + string.digits
@@ -25,16 +42,50 @@ class Usuario(AbstractUser):
     
     tipo = models.CharField(max_length=20, choices=TIPO_CHOICES, default='ciudadano')
     telefono = models.CharField(max_length=20, blank=True, null=True)
+    # Máximo de reportes abiertos que la asignación automática le entrega
+    capacidad = models.PositiveIntegerField(default=50)
     
     class Meta:
         verbose_name = 'Usuario'
         verbose_name_plural = 'Usuarios'
 
 
+class ZonaInspector(models.Model):
+    """Zona de servicio (círculo) que cubre un inspector"""
+    inspector = models.ForeignKey(
+        Usuario,
+        on_delete=models.CASCADE,
+        related_name='zonas',
+        limit_choices_to={'tipo': 'inspector'}
+    )
+    nombre = models.CharField(max_length=100)
+    centro_lat = models.FloatField()
+    centro_lng = models.FloatField()
+    radio_metros = models.PositiveIntegerField(default=3000)
+    activa = models.BooleanField(default=True)
+    
+    def __str__(self):
+        return f"{self.nombre} ({self.inspector.username})"
+    
+    class Meta:
+        verbose_name = 'Zona de Inspector'
+        verbose_name_plural = 'Zonas de Inspectores'
+
+
 class CategoriaResiduo(models.Model):
     """Categorías de residuos reportados"""
+    SEVERIDAD_CHOICES = [
+        (1, 'Muy baja'),
+        (2, 'Baja'),
+        (3, 'Media'),
+        (4, 'Alta'),
+        (5, 'Crítica'),
+    ]
+    
     nombre = models.CharField(max_length=100)
     descripcion = models.TextField(blank=True)
+    # Peso de la categoría en la prioridad de inspección (reportes/prioridad.py)
+    severidad = models.PositiveSmallIntegerField(choices=SEVERIDAD_CHOICES, default=3)
     
     def __str__(self):
         return self.nombre
@@ -70,7 +121,7 @@ class Reporte(models.Model):
     descripcion = models.TextField(blank=True)
     email = models.EmailField(blank=True)
     foto = models.ImageField(
-        upload_to='reportes/', 
+        upload_to=ruta_foto, 
         blank=True, 
         null=True
     )
@@ -81,6 +132,8 @@ class Reporte(models.Model):
     ubicacion_lat = models.FloatField(null=True, blank=True, db_index=True)
     ubicacion_lng = models.FloatField(null=True, blank=True, db_index=True)
     direccion = models.CharField(max_length=255, blank=True)
+    # Asignada desde COMUNAS_GEOJSON (reportes/comunas.py)
+    comuna = models.CharField(max_length=100, blank=True, db_index=True)
     
     # Propiedad para compatibilidad con código que espera ubicacion como Point
     @property
@@ -132,6 +185,27 @@ class Reporte(models.Model):
         related_name='reportes_asignados'
     )
     
+    # Duplicados: reportes del mismo sitio apuntan al reporte canónico
+    duplicado_de = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='duplicados'
+    )
+    cantidad_duplicados = models.PositiveIntegerField(default=0)
+    
+    # Orden de la cola de inspección (reportes/prioridad.py); 0 fuera de la cola
+    prioridad = models.FloatField(default=0)
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Ubicación leída, para registrar la celda que deja si el reporte se mueve
+        if 'ubicacion_lat' in field_names and 'ubicacion_lng' in field_names:
+            instancia._ubicacion_cargada = (instancia.ubicacion_lat, instancia.ubicacion_lng)
+        return instancia
+    
     def __str__(self):
         return f"{self.codigo_seguimiento} - {self.categoria.nombre if self.categoria else 'Sin categoría'}"
     
@@ -143,6 +217,18 @@ class Reporte(models.Model):
             models.Index(fields=['codigo_seguimiento']),
             models.Index(fields=['estado']),
             models.Index(fields=['fecha_creacion']),
+            # Marca de agua de los índices en memoria (clusters, copia columnar, hotspots)
+            models.Index(fields=['fecha_actualizacion'], name='reporte_fecha_act_idx'),
+            # Búsqueda de duplicados: misma categoría en una franja de latitud
+            models.Index(fields=['categoria', 'ubicacion_lat', 'ubicacion_lng'], name='reporte_duplicados_idx'),
+            # Carga de cada inspector (reportes abiertos asignados)
+            models.Index(fields=['asignado_a', 'estado'], name='reporte_carga_idx'),
+            # Cola de inspección: solo los reportes abiertos que no son duplicados
+            models.Index(
+                fields=['-prioridad', 'id'],
+                name='reporte_cola_idx',
+                condition=models.Q(estado__in=['nuevo', 'proceso'], duplicado_de__isnull=True),
+            ),
         ]
 
 
@@ -166,3 +252,185 @@ class Notificacion(models.Model):
         verbose_name_plural = 'Notificaciones'
         ordering = ['-fecha_creacion']
 
+
+
+class Hotspot(models.Model):
+    """Zona de acumulación de reportes detectada por `detectar_hotspots`"""
+    centro_lat = models.FloatField()
+    centro_lng = models.FloatField()
+    # Rectángulo que contiene a todos los reportes del hotspot
+    min_lat = models.FloatField()
+    min_lng = models.FloatField()
+    max_lat = models.FloatField()
+    max_lng = models.FloatField()
+    
+    cantidad_reportes = models.PositiveIntegerField()
+    reportes_abiertos = models.PositiveIntegerField(default=0)
+    fecha_primer_reporte = models.DateTimeField()
+    fecha_ultimo_reporte = models.DateTimeField()
+    # {categoria_id: cantidad}
+    categorias = models.JSONField(default=dict)
+    # Celdas de la cuadrícula que ocupa, para el recálculo incremental
+    celdas = models.JSONField(default=list)
+    fecha_calculo = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Hotspot ({self.centro_lat:.4f}, {self.centro_lng:.4f}) - {self.cantidad_reportes} reportes"
+    
+    class Meta:
+        verbose_name = 'Hotspot'
+        verbose_name_plural = 'Hotspots'
+        ordering = ['-cantidad_reportes']
+        indexes = [
+            models.Index(fields=['cantidad_reportes']),
+            models.Index(fields=['fecha_ultimo_reporte']),
+        ]
+
+
+class EjecucionHotspots(models.Model):
+    """Registro de cada ejecución de la detección, con su marca de agua"""
+    fecha = models.DateTimeField(auto_now_add=True)
+    # Reportes con fecha_actualizacion posterior se procesan en la siguiente ejecución
+    marca_de_agua = models.DateTimeField()
+    inicio_ventana = models.DateTimeField()
+    completa = models.BooleanField(default=False)
+    # Parámetros usados: si cambian, las celdas guardadas en los hotspots son de
+    # otra cuadrícula y la siguiente ejecución es completa
+    eps_metros = models.FloatField(null=True)
+    min_reportes = models.PositiveIntegerField(null=True)
+    ventana_dias = models.PositiveIntegerField(null=True)
+    celdas_procesadas = models.PositiveIntegerField(default=0)
+    hotspots_detectados = models.PositiveIntegerField(default=0)
+    
+    def __str__(self):
+        return f"Ejecución {self.fecha:%Y-%m-%d %H:%M} - {self.hotspots_detectados} hotspots"
+    
+    class Meta:
+        verbose_name = 'Ejecución de detección de hotspots'
+        verbose_name_plural = 'Ejecuciones de detección de hotspots'
+        ordering = ['-fecha']
+
+
+class UbicacionRetirada(models.Model):
+    """
+    Ubicación que dejó de tener un reporte (eliminado, archivado o movido). La
+    detección incremental de hotspots recalcula sus celdas; luego se borra.
+    """
+    ubicacion_lat = models.FloatField()
+    ubicacion_lng = models.FloatField()
+    fecha = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    class Meta:
+        verbose_name = 'Ubicación retirada'
+        verbose_name_plural = 'Ubicaciones retiradas'
+
+
+class ReporteArchivado(models.Model):
+    """
+    Reporte resuelto o cerrado movido fuera de la tabla activa por
+    `archivar_reportes`. Conserva el id y el código de seguimiento originales.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    codigo_seguimiento = models.CharField(max_length=10, unique=True)
+    categoria = models.ForeignKey(
+        CategoriaResiduo,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='+'
+    )
+    descripcion = models.TextField(blank=True)
+    email = models.EmailField(blank=True)
+    foto = models.ImageField(upload_to='reportes/', blank=True, null=True)
+    ubicacion_lat = models.FloatField(null=True, blank=True)
+    ubicacion_lng = models.FloatField(null=True, blank=True)
+    direccion = models.CharField(max_length=255, blank=True)
+    comuna = models.CharField(max_length=100, blank=True)
+    estado = models.CharField(max_length=20, choices=Reporte.ESTADO_CHOICES)
+    notas_internas = models.TextField(blank=True)
+    fecha_creacion = models.DateTimeField()
+    fecha_actualizacion = models.DateTimeField()
+    creado_por = models.ForeignKey(
+        Usuario,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    asignado_a = models.ForeignKey(
+        Usuario,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    # Id del reporte canónico (puede estar en la tabla activa o archivado)
+    duplicado_de_id = models.BigIntegerField(null=True, blank=True)
+    cantidad_duplicados = models.PositiveIntegerField(default=0)
+    fecha_archivado = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.codigo_seguimiento} (archivado)"
+    
+    class Meta:
+        verbose_name = 'Reporte Archivado'
+        verbose_name_plural = 'Reportes Archivados'
+        ordering = ['-fecha_creacion']
+
+
+class NotificacionArchivada(models.Model):
+    """Notificación de un reporte archivado"""
+    id = models.BigIntegerField(primary_key=True)
+    reporte = models.ForeignKey(
+        ReporteArchivado,
+        on_delete=models.CASCADE,
+        related_name='notificaciones'
+    )
+    titulo = models.CharField(max_length=200)
+    mensaje = models.TextField()
+    leido = models.BooleanField(default=False)
+    fecha_creacion = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = 'Notificación Archivada'
+        verbose_name_plural = 'Notificaciones Archivadas'
+        ordering = ['-fecha_creacion']
+
+
+class ConteoArchivo(models.Model):
+    """Reportes archivados por estado y comuna, para las estadísticas sin recorrer el archivo"""
+    estado = models.CharField(max_length=20)
+    comuna = models.CharField(max_length=100, blank=True)
+    cantidad = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        verbose_name = 'Conteo de Archivo'
+        verbose_name_plural = 'Conteos de Archivo'
+        unique_together = [('estado', 'comuna')]
+
+
+class ClaveIdempotencia(models.Model):
+    """
+    Idempotency-Key recibida al crear un reporte y la respuesta que se entregó,
+    para responder lo mismo a los reintentos sin crear otro reporte
+    """
+    EN_CURSO = 'en_curso'
+    COMPLETADA = 'completada'
+    ESTADO_CHOICES = [
+        (EN_CURSO, 'En curso'),
+        (COMPLETADA, 'Completada'),
+    ]
+    
+    clave = models.CharField(max_length=255, unique=True)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default=EN_CURSO)
+    codigo_respuesta = models.PositiveSmallIntegerField(null=True, blank=True)
+    respuesta = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    expira = models.DateTimeField(db_index=True)
+    
+    def __str__(self):
+        return f"{self.clave} ({self.estado})"
+    
+    class Meta:
+        verbose_name = 'Clave de Idempotencia'
+        verbose_name_plural = 'Claves de Idempotencia'
@@ -0,0 +1,13 @@
+from rest_framework.permissions import BasePermission
+
+
+class EsInspector(BasePermission):
+    """Solo inspectores municipales o staff autenticados"""
+    message = 'Solo inspectores municipales pueden realizar esta acción'
+
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(
+            user and user.is_authenticated
+            and (user.tipo == 'inspector' or user.is_staff)
+        )
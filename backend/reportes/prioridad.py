@@ -0,0 +1,188 @@
+"""
+Prioridad de inspección de los reportes abiertos.
+
+La cola de los inspectores (GET /api/reportes/siguientes/) son los reportes
+abiertos que no son duplicados, ordenados por la columna `prioridad`. Un índice
+parcial sobre esa columna cubre exactamente esos reportes, así los primeros N
+salen de una sola lectura del índice, sin ordenar en memoria. El puntaje suma:
+
+- Severidad de la categoría (CategoriaResiduo.severidad, 1 a 5).
+- Densidad local: otros reportes de la cola en las 3x3 celdas de
+  PRIORIDAD_CELDA_METROS alrededor del reporte (escala logarítmica).
+- Antigüedad en días, hasta PRIORIDAD_MAX_DIAS.
+- Duplicados vinculados (escala logarítmica).
+
+Se recalcula al guardar el reporte (señal pre_save) y, para el canónico, al
+cambiar sus duplicados. La antigüedad avanza y la densidad cambia con los
+reportes vecinos sin que el reporte se guarde: `manage.py actualizar_prioridades`
+recalcula toda la cola y debe programarse periódicamente.
+"""
+import math
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .consultas import en_cache
+from .hotspots import LATITUD_REFERENCIA, METROS_POR_GRADO
+from .models import CategoriaResiduo, Reporte
+
+ESTADOS_ABIERTOS = ('nuevo', 'proceso')
+CLAVE_SEVERIDADES = 'prioridad:severidades'
+SEVERIDAD_SIN_CATEGORIA = 3
+
+PESO_SEVERIDAD = 10.0
+PESO_DENSIDAD = 5.0
+PESO_ANTIGUEDAD = 1.0  # por día
+PESO_DUPLICADOS = 8.0
+
+CAMPOS = (
+    'id', 'estado', 'duplicado_de_id', 'categoria_id', 'ubicacion_lat', 'ubicacion_lng',
+    'fecha_creacion', 'cantidad_duplicados',
+)
+
+
+def cola():
+    """Reportes en la cola de inspección (la misma condición que reporte_cola_idx)"""
+    return Reporte.objects.filter(estado__in=ESTADOS_ABIERTOS, duplicado_de__isnull=True)
+
+
+def severidades():
+    """{categoria_id: severidad}, reutilizado ANALYTICS_CACHE_SECONDS"""
+    return en_cache(CLAVE_SEVERIDADES, lambda: dict(CategoriaResiduo.objects.values_list('id', 'severidad')))
+
+
+def severidad_de(categoria_id, severidades):
+    if categoria_id is None:
+        return SEVERIDAD_SIN_CATEGORIA
+    return severidades.get(categoria_id, SEVERIDAD_SIN_CATEGORIA)
+
+
+# Densidad
+
+def tamano_celda():
+    """(grados de latitud, grados de longitud) de una celda"""
+    metros = settings.PRIORIDAD_CELDA_METROS
+    return (
+        metros / METROS_POR_GRADO,
+        metros / (METROS_POR_GRADO * math.cos(math.radians(LATITUD_REFERENCIA))),
+    )
+
+
+def celda(lat, lng, tamano):
+    return (math.floor(lat / tamano[0]), math.floor(lng / tamano[1]))
+
+
+def vecinos(lat, lng, excluir=None):
+    """Reportes de la cola en las 3x3 celdas alrededor del punto, sin contar `excluir`"""
+    tamano = tamano_celda()
+    i, j = celda(lat, lng, tamano)
+    queryset = cola().filter(
+        ubicacion_lat__gte=(i - 1) * tamano[0], ubicacion_lat__lt=(i + 2) * tamano[0],
+        ubicacion_lng__gte=(j - 1) * tamano[1], ubicacion_lng__lt=(j + 2) * tamano[1],
+    )
+    if excluir is not None:
+        queryset = queryset.exclude(pk=excluir)
+    return queryset.count()
+
+
+def vecinos_en_grilla(celdas, lat, lng, tamano):
+    """Igual que vecinos() con los conteos por celda ya cargados (el reporte incluido)"""
+    i, j = celda(lat, lng, tamano)
+    return sum(celdas.get((i + di, j + dj), 0) for di in (-1, 0, 1) for dj in (-1, 0, 1)) - 1
+
+
+# Puntaje
+
+def puntaje(severidad, cantidad_vecinos, fecha_creacion, duplicados, ahora):
+    dias = (ahora - fecha_creacion).total_seconds() / 86400 if fecha_creacion else 0.0
+    dias = min(max(dias, 0.0), settings.PRIORIDAD_MAX_DIAS)
+    return round(
+        PESO_SEVERIDAD * severidad
+        + PESO_DENSIDAD * math.log2(1 + cantidad_vecinos)
+        + PESO_ANTIGUEDAD * dias
+        + PESO_DUPLICADOS * math.log2(1 + duplicados),
+        3
+    )
+
+
+def en_cola(reporte):
+    return reporte.estado in ESTADOS_ABIERTOS and reporte.duplicado_de_id is None
+
+
+def calcular(reporte, ahora=None):
+    """Prioridad de un reporte (0 si no está en la cola)"""
+    if not en_cola(reporte):
+        return 0.0
+    ahora = ahora or timezone.now()
+    cantidad_vecinos = 0
+    if reporte.ubicacion_lat is not None and reporte.ubicacion_lng is not None:
+        cantidad_vecinos = vecinos(reporte.ubicacion_lat, reporte.ubicacion_lng, excluir=reporte.pk)
+    return puntaje(
+        severidad_de(reporte.categoria_id, severidades()),
+        cantidad_vecinos,
+        # Al crear, fecha_creacion aún no está asignada
+        reporte.fecha_creacion or ahora,
+        reporte.cantidad_duplicados,
+        ahora,
+    )
+
+
+def recalcular(ids):
+    """Recalcula la prioridad de los reportes dados (p. ej. al cambiar sus duplicados)"""
+    ahora = timezone.now()
+    for reporte in Reporte.objects.filter(pk__in=ids).only(*CAMPOS):
+        Reporte.objects.filter(pk=reporte.pk).update(prioridad=calcular(reporte, ahora))
+
+
+def actualizar_cola(lote=1000, pausa=0.0):
+    """
+    Recalcula toda la cola en lotes de `lote` reportes. La densidad se cuenta
+    en memoria con una pasada sobre las ubicaciones; solo se escriben los
+    reportes cuya prioridad cambió. Devuelve (procesados, actualizados).
+    """
+    ahora = timezone.now()
+    tamano = tamano_celda()
+    celdas = Counter(
+        celda(lat, lng, tamano)
+        for lat, lng in cola().filter(
+            ubicacion_lat__isnull=False, ubicacion_lng__isnull=False
+        ).values_list('ubicacion_lat', 'ubicacion_lng').iterator(chunk_size=10000)
+    )
+    severidades_actuales = severidades()
+
+    procesados = actualizados = 0
+    ultimo = 0
+    while True:
+        filas = list(
+            cola().filter(pk__gt=ultimo).order_by('pk').values_list(
+                'id', 'categoria_id', 'ubicacion_lat', 'ubicacion_lng',
+                'fecha_creacion', 'cantidad_duplicados', 'prioridad',
+            )[:lote]
+        )
+        if not filas:
+            return procesados, actualizados
+        ultimo = filas[-1][0]
+
+        cambios = []
+        for pk, categoria_id, lat, lng, fecha_creacion, duplicados, actual in filas:
+            cantidad_vecinos = 0
+            if lat is not None and lng is not None:
+                cantidad_vecinos = vecinos_en_grilla(celdas, lat, lng, tamano)
+            nueva = puntaje(
+                severidad_de(categoria_id, severidades_actuales), cantidad_vecinos,
+                fecha_creacion, duplicados, ahora,
+            )
+            if nueva != actual:
+                cambios.append(Reporte(pk=pk, prioridad=nueva))
+        if cambios:
+            # bulk_update no toca fecha_actualizacion: el envejecimiento no
+            # cuenta como cambio para el archivo ni para las marcas de agua
+            with transaction.atomic():
+                Reporte.objects.bulk_update(cambios, ['prioridad'])
+        procesados += len(filas)
+        actualizados += len(cambios)
+        if pausa:
+            time.sleep(pausa)
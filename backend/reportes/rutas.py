@@ -0,0 +1,211 @@
+"""
+Ruta diaria de inspección.
+
+Dado un punto de partida y los reportes abiertos asignados a un inspector, se
+ordenan las visitas para recorrer poca distancia: primero se arma la ruta del
+vecino más cercano y luego se mejora con 2-opt (invertir un tramo de la ruta
+mientras eso la acorte). Las distancias son haversine entre todos los pares,
+calculadas como matriz con NumPy; sin NumPy se usa la misma fórmula en Python
+(duplicados.distancia_metros), bastante más lento.
+
+La ruta es abierta (termina en la última visita) salvo que se pida volver al
+punto de partida. Para 2-opt la ruta abierta se trata como cerrada con un
+punto ficticio a distancia 0 de todos, así el último tramo puede cambiar
+libremente. 2-opt se detiene cuando ya no encuentra mejoras o al cumplirse
+RUTAS_MAX_SEGUNDOS.
+"""
+import time
+
+from django.conf import settings
+from django.db.models import Q
+
+from .duplicados import distancia_metros
+from .models import ZonaInspector
+from .prioridad import cola
+
+try:
+    import numpy as np
+except ImportError:  # numpy es opcional: sin él se calcula en Python
+    np = None
+
+RADIO_TIERRA = 6371000.0
+MEJORA_MINIMA = 1e-6  # metros: evita ciclos por redondeo
+
+
+def matriz_distancias(puntos):
+    """Distancias haversine en metros entre todos los pares de (lat, lng)"""
+    if np is None:
+        return [[distancia_metros(a[0], a[1], b[0], b[1]) for b in puntos] for a in puntos]
+    coordenadas = np.radians(np.asarray(puntos, dtype=np.float64).reshape(-1, 2))
+    lat, lng = coordenadas[:, 0], coordenadas[:, 1]
+    a = (
+        np.sin((lat[:, None] - lat[None, :]) / 2) ** 2
+        + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin((lng[:, None] - lng[None, :]) / 2) ** 2
+    )
+    return 2 * RADIO_TIERRA * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _con_punto_ficticio(matriz):
+    """Matriz con una fila y columna extra en 0 (final libre de la ruta abierta)"""
+    if np is None:
+        return [fila + [0.0] for fila in matriz] + [[0.0] * (len(matriz) + 1)]
+    return np.pad(matriz, ((0, 1), (0, 1)))
+
+
+def longitud(matriz, ruta):
+    return float(sum(matriz[a][b] for a, b in zip(ruta, ruta[1:])))
+
+
+def vecino_mas_cercano(matriz):
+    """Ruta desde el punto 0 yendo siempre al punto no visitado más cercano"""
+    n = len(matriz)
+    ruta = [0]
+    if np is None:
+        pendientes = set(range(1, n))
+        while pendientes:
+            fila = matriz[ruta[-1]]
+            siguiente = min(pendientes, key=lambda k: (fila[k], k))
+            pendientes.remove(siguiente)
+            ruta.append(siguiente)
+        return ruta
+    visitado = np.zeros(n, dtype=bool)
+    visitado[0] = True
+    for _ in range(n - 1):
+        distancias = np.where(visitado, np.inf, matriz[ruta[-1]])
+        siguiente = int(np.argmin(distancias))
+        visitado[siguiente] = True
+        ruta.append(siguiente)
+    return ruta
+
+
+def dos_opt(matriz, ruta, limite):
+    """
+    Mejora la ruta (extremos fijos) invirtiendo tramos ruta[i:j+1] mientras
+    acorten el total. Con NumPy, para cada i se evalúan todos los j de una vez
+    y se aplica la mejor inversión.
+    """
+    m = len(ruta)
+    if np is None:
+        ruta = list(ruta)
+        mejorado = True
+        while mejorado and time.monotonic() < limite:
+            mejorado = False
+            for i in range(1, m - 2):
+                for j in range(i + 1, m - 1):
+                    a, b, c, d = ruta[i - 1], ruta[i], ruta[j], ruta[j + 1]
+                    if matriz[a][c] + matriz[b][d] - matriz[a][b] - matriz[c][d] < -MEJORA_MINIMA:
+                        ruta[i:j + 1] = reversed(ruta[i:j + 1])
+                        mejorado = True
+                if time.monotonic() >= limite:
+                    break
+        return ruta
+
+    ruta = np.array(ruta)
+    mejorado = True
+    while mejorado and time.monotonic() < limite:
+        mejorado = False
+        for i in range(1, m - 2):
+            a, b = ruta[i - 1], ruta[i]
+            c, d = ruta[i + 1:m - 1], ruta[i + 2:m]
+            delta = matriz[a, c] + matriz[b, d] - matriz[a, b] - matriz[c, d]
+            k = int(np.argmin(delta))
+            if delta[k] < -MEJORA_MINIMA:
+                j = i + 1 + k
+                ruta[i:j + 1] = ruta[i:j + 1][::-1]
+                mejorado = True
+            if time.monotonic() >= limite:
+                break
+    return ruta.tolist()
+
+
+def planificar(inicio, paradas, volver=False, max_segundos=None):
+    """
+    Orden de visita de `paradas` ([(lat, lng)]) partiendo de `inicio`.
+    Devuelve (orden, tramos, total): índices de `paradas` en el orden de
+    visita, la distancia de cada tramo (más el regreso si `volver`) y el total.
+    """
+    if not paradas:
+        return [], [], 0.0
+    max_segundos = settings.RUTAS_MAX_SEGUNDOS if max_segundos is None else max_segundos
+    matriz = matriz_distancias([inicio] + list(paradas))
+    ruta = vecino_mas_cercano(matriz)
+    if volver:
+        ruta.append(0)
+        ruta = dos_opt(matriz, ruta, time.monotonic() + max_segundos)
+    else:
+        ficticio = len(ruta)
+        ruta = dos_opt(_con_punto_ficticio(matriz), ruta + [ficticio], time.monotonic() + max_segundos)[:-1]
+
+    tramos = [float(matriz[a][b]) for a, b in zip(ruta, ruta[1:])]
+    visitas = ruta[1:-1] if volver else ruta[1:]
+    return [k - 1 for k in visitas], tramos, sum(tramos)
+
+
+def inicio_por_defecto(inspector_id):
+    """Centro de la primera zona activa del inspector, o None"""
+    return ZonaInspector.objects.filter(inspector_id=inspector_id, activa=True).order_by('id').values_list(
+        'centro_lat', 'centro_lng'
+    ).first()
+
+
+def ruta_inspector(inspector_id, inicio=None, volver=False):
+    """
+    Ruta sobre los reportes abiertos (no duplicados) asignados al inspector.
+    Si tiene más de RUTAS_MAX_PARADAS se toman los de mayor prioridad.
+    ValueError si no hay punto de partida.
+    """
+    if inicio is None:
+        inicio = inicio_por_defecto(inspector_id)
+        if inicio is None:
+            raise ValueError('Indique lat y lng del punto de partida: el inspector no tiene zonas activas')
+
+    queryset = cola().filter(asignado_a_id=inspector_id)
+    reportes = list(
+        queryset.filter(ubicacion_lat__isnull=False, ubicacion_lng__isnull=False)
+        .select_related('categoria')
+        .order_by('-prioridad', 'id')[:settings.RUTAS_MAX_PARADAS]
+    )
+    sin_ubicacion = list(
+        queryset.filter(Q(ubicacion_lat__isnull=True) | Q(ubicacion_lng__isnull=True))
+        .values_list('codigo_seguimiento', flat=True)
+    )
+    omitidos = 0
+    if len(reportes) == settings.RUTAS_MAX_PARADAS:
+        omitidos = queryset.filter(ubicacion_lat__isnull=False, ubicacion_lng__isnull=False).count() - len(reportes)
+
+    puntos = [(r.ubicacion_lat, r.ubicacion_lng) for r in reportes]
+    inicio_ruta = time.perf_counter()
+    orden, tramos, total = planificar(inicio, puntos, volver)
+    milisegundos = (time.perf_counter() - inicio_ruta) * 1000
+
+    paradas = []
+    for posicion, k in enumerate(orden):
+        reporte = reportes[k]
+        paradas.append({
+            'orden': posicion + 1,
+            'id': reporte.id,
+            'codigo_seguimiento': reporte.codigo_seguimiento,
+            'categoria_nombre': reporte.categoria.nombre if reporte.categoria else None,
+            'direccion': reporte.direccion,
+            'estado': reporte.estado,
+            'prioridad': reporte.prioridad,
+            'lat': reporte.ubicacion_lat,
+            'lng': reporte.ubicacion_lng,
+            'distancia_metros': round(tramos[posicion]),
+        })
+
+    # Referencia: visitar en el orden de la lista (prioridad)
+    secuencia = [inicio] + puntos + ([inicio] if volver and puntos else [])
+    sin_optimizar = sum(distancia_metros(*a, *b) for a, b in zip(secuencia, secuencia[1:]))
+
+    return {
+        'inicio': {'lat': inicio[0], 'lng': inicio[1]},
+        'volver': volver,
+        'paradas': paradas,
+        'distancia_total_metros': round(total),
+        'distancia_regreso_metros': round(tramos[-1]) if volver and tramos else None,
+        'distancia_sin_optimizar_metros': round(sin_optimizar),
+        'sin_ubicacion': sin_ubicacion,
+        'omitidos': omitidos,
+        'calculo_ms': round(milisegundos, 1),
+    }
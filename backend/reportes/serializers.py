@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Reporte, CategoriaResiduo, Usuario, Notificacion
+from .models import Reporte, CategoriaResiduo, Usuario, Notificacion, Hotspot
 
 
 class CategoriaResiduoSerializer(serializers.ModelSerializer):
@@ -19,9 +19,12 @@ class ReporteSerializer(serializers.ModelSerializer):
             'id', 'codigo_seguimiento', 'categoria', 'categoria_nombre',
             'descripcion', 'email', 'foto', 'lat', 'lng', 'direccion',
             'estado', 'notas_internas', 'fecha_creacion', 'fecha_actualizacion',
-            'asignado_a'
+            'asignado_a', 'duplicado_de', 'cantidad_duplicados', 'comuna', 'prioridad'
+        ]
+        read_only_fields = [
+            'codigo_seguimiento', 'fecha_creacion', 'fecha_actualizacion',
+            'duplicado_de', 'cantidad_duplicados', 'comuna', 'prioridad'
         ]
-        read_only_fields = ['codigo_seguimiento', 'fecha_creacion', 'fecha_actualizacion']
     
     def get_lat(self, obj):
         # Usar ubicacion_lat directamente o ubicacion si está disponible
@@ -64,7 +67,7 @@ class ReporteDetalleSerializer(serializers.ModelSerializer):
             'id', 'codigo_seguimiento', 'categoria', 'categoria_nombre',
             'descripcion', 'email', 'foto', 'lat', 'lng', 'direccion',
             'estado', 'notas_internas', 'fecha_creacion', 'fecha_actualizacion',
-            'creado_por_nombre', 'asignado_a'
+            'creado_por_nombre', 'asignado_a', 'duplicado_de', 'cantidad_duplicados', 'comuna'
         ]
     
     def get_lat(self, obj):
@@ -94,3 +97,31 @@ class EstadisticasSerializer(serializers.Serializer):
     nuevos = serializers.IntegerField()
     en_proceso = serializers.IntegerField()
     resueltos = serializers.IntegerField()
+
+
+class HotspotSerializer(serializers.ModelSerializer):
+    categorias = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Hotspot
+        fields = [
+            'id', 'centro_lat', 'centro_lng', 'min_lat', 'min_lng', 'max_lat', 'max_lng',
+            'cantidad_reportes', 'reportes_abiertos', 'fecha_primer_reporte',
+            'fecha_ultimo_reporte', 'categorias', 'fecha_calculo'
+        ]
+    
+    def get_categorias(self, obj):
+        # Nombres desde el contexto para no consultar la categoría por cada hotspot
+        nombres = self.context.get('nombres_categorias', {})
+        return sorted(
+            [
+                {
+                    'categoria': int(categoria_id) if categoria_id != 'None' else None,
+                    'nombre': nombres.get(categoria_id, 'Sin categoría'),
+                    'cantidad': cantidad
+                }
+                for categoria_id, cantidad in obj.categorias.items()
+            ],
+            key=lambda c: c['cantidad'],
+            reverse=True
+        )
@@ -0,0 +1,67 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import asignacion, clustering, columnar, consultas, hotspots, prioridad
+from .authentication import invalidar_cache_usuario
+from .models import CategoriaResiduo, Reporte, Usuario, ZonaInspector
+
+
+@receiver(post_save, sender=Usuario)
+def refrescar_usuario_en_cache(sender, instance, **kwargs):
+    """Cambios de contraseña o de tipo se reflejan en el próximo request con token"""
+    invalidar_cache_usuario(instance.pk)
+
+
+@receiver(pre_save, sender=Reporte)
+def calcular_prioridad(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Cada creación o cambio del reporte recalcula su prioridad de inspección"""
+    if raw or (update_fields is not None and 'prioridad' not in update_fields):
+        return
+    instance.prioridad = prioridad.calcular(instance)
+
+
+@receiver(pre_save, sender=Reporte)
+def registrar_ubicacion_anterior(sender, instance, raw=False, **kwargs):
+    """Si el reporte se movió, su celda anterior se recalcula en los hotspots"""
+    anterior = getattr(instance, '_ubicacion_cargada', None)
+    actual = (instance.ubicacion_lat, instance.ubicacion_lng)
+    if raw or anterior is None or anterior == actual:
+        return
+    hotspots.registrar_retirada(*anterior)
+    instance._ubicacion_cargada = actual
+
+
+@receiver(post_save, sender=Reporte)
+def actualizar_indice_clusters(sender, instance, **kwargs):
+    """Mantiene al día el índice de clusters, la copia columnar y las estadísticas de este worker"""
+    def notificar():
+        clustering.notificar_cambio(instance)
+        columnar.notificar_cambio(instance)
+        consultas.invalidar_estadisticas()
+    transaction.on_commit(notificar)
+
+
+@receiver(post_delete, sender=Reporte)
+def quitar_de_indice_clusters(sender, instance, **kwargs):
+    hotspots.registrar_retirada(instance.ubicacion_lat, instance.ubicacion_lng)
+    pk = instance.pk
+    def notificar():
+        clustering.notificar_eliminacion(pk)
+        columnar.notificar_eliminacion(pk)
+        consultas.invalidar_estadisticas()
+    transaction.on_commit(notificar)
+
+
+@receiver(post_save, sender=ZonaInspector)
+@receiver(post_delete, sender=ZonaInspector)
+def recargar_zonas(sender, **kwargs):
+    """Los otros workers toman los cambios de zonas al vencer ASIGNACION_ZONAS_SECONDS"""
+    transaction.on_commit(asignacion.invalidar_indice)
+
+
+@receiver(post_save, sender=CategoriaResiduo)
+@receiver(post_delete, sender=CategoriaResiduo)
+def invalidar_categorias(sender, **kwargs):
+    transaction.on_commit(lambda: cache.delete_many([consultas.CLAVE_CATEGORIAS, prioridad.CLAVE_SEVERIDADES]))
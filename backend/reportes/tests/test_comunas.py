@@ -0,0 +1,82 @@
+"""
+Índice de comunas (reportes/comunas.py) contra ray casting sobre el polígono
+completo, y tamaño del índice para una comuna de gran superficie.
+"""
+import math
+import random
+
+from django.test import SimpleTestCase
+
+from reportes.comunas import IndiceComunas
+
+
+def _dentro(lng, lat, anillos):
+    """Ray casting par-impar sobre todos los anillos (con hoyos)"""
+    dentro = False
+    for anillo in anillos:
+        for (x1, y1), (x2, y2) in zip(anillo, anillo[1:]):
+            if (y1 > lat) != (y2 > lat) and lng < x1 + (lat - y1) * (x2 - x1) / (y2 - y1):
+                dentro = not dentro
+    return dentro
+
+
+def _estrella(cx, cy, radio, vertices, azar):
+    """Anillo cerrado irregular (no convexo) alrededor de (cx, cy)"""
+    anillo = []
+    for k in range(vertices):
+        angulo = 2 * math.pi * k / vertices
+        r = radio * azar.uniform(0.55, 1.0)
+        anillo.append((cx + r * math.cos(angulo), cy + r * math.sin(angulo)))
+    return anillo + anillo[:1]
+
+
+def _feature(nombre, poligonos):
+    return {
+        'type': 'Feature',
+        'properties': {'comuna': nombre},
+        'geometry': {'type': 'MultiPolygon', 'coordinates': [[list(map(list, a)) for a in p] for p in poligonos]},
+    }
+
+
+class IndiceComunasTestCase(SimpleTestCase):
+
+    def test_coincide_con_ray_casting(self):
+        azar = random.Random(38)
+        comunas = {}
+        # Comunas urbanas en una grilla, algunas con hoyo y otras con dos partes
+        for n in range(25):
+            cx, cy = -70.9 + (n % 5) * 0.1, -33.6 + (n // 5) * 0.1
+            exterior = _estrella(cx, cy, 0.035, 300, azar)
+            poligonos = [[exterior]]
+            if n % 4 == 0:
+                poligonos[0].append(_estrella(cx, cy, 0.01, 40, azar)[::-1])
+            if n % 7 == 0:
+                poligonos.append([_estrella(cx + 0.05, cy + 0.05, 0.01, 30, azar)])
+            comunas[f'Comuna {n}'] = poligonos
+        # Una comuna rural grande con bordes largos en diagonal
+        comunas['Rural'] = [[_estrella(-71.5, -35.5, 1.5, 60, azar)]]
+
+        indice = IndiceComunas(
+            [_feature(nombre, poligonos) for nombre, poligonos in comunas.items()], celda_grados=0.02
+        )
+
+        for k in range(5000):
+            if k % 2:
+                lng, lat = azar.uniform(-73.2, -69.8), azar.uniform(-37.2, -33.0)
+            else:
+                lng, lat = azar.uniform(-71.0, -70.4), azar.uniform(-33.7, -33.1)
+            esperadas = [
+                nombre for nombre, poligonos in comunas.items()
+                if any(_dentro(lng, lat, anillos) for anillos in poligonos)
+            ]
+            self.assertEqual(indice.comuna(lat, lng), esperadas[0] if esperadas else None, (lat, lng))
+
+    def test_superficie_grande_no_materializa_el_interior(self):
+        # Del tamaño de Antártica Chilena: ~37° x 37° con 0.02° son ~3.4M celdas
+        anillo = _estrella(-71.0, -72.0, 18.5, 400, random.Random(1))
+        indice = IndiceComunas([_feature('Antártica', [[anillo]])], celda_grados=0.02)
+
+        # Solo las celdas de borde: del orden del perímetro, no del área
+        self.assertLess(len(indice.celdas), 150000)
+        self.assertEqual(indice.comuna(-72.0, -71.0), 'Antártica')
+        self.assertIsNone(indice.comuna(-72.0, -100.0))
@@ -0,0 +1,305 @@
+"""
+Pool de conexiones por proceso (ecoalerta/db_pool).
+
+PoolConexiones se prueba con conexiones falsas (mismo estado de transacción que
+libpq). Las pruebas contra PostgreSQL real solo corren con DB_POOL_PRUEBAS, la
+configuración de la base en JSON (como DB_REPLICAS):
+
+    DB_POOL_PRUEBAS='{"NAME": "postgres", "USER": "postgres", "HOST": "localhost"}' \\
+        python manage.py test reportes.tests.test_db_pool --settings=ecoalerta.settings_test
+"""
+import json
+import os
+import threading
+import time
+import unittest
+
+from django.test import SimpleTestCase
+
+from ecoalerta.db_pool import pool
+from ecoalerta.db_pool.pool import (
+    TRANSACCION_ABIERTA, TRANSACCION_CON_ERROR, TRANSACCION_INACTIVA, PoolAgotado, PoolConexiones,
+)
+
+CONSULTA_EN_CURSO = 1
+
+
+class _Info:
+    def __init__(self):
+        self.transaction_status = TRANSACCION_INACTIVA
+
+
+class ConexionFalsa:
+    def __init__(self):
+        self.closed = 0
+        self.info = _Info()
+        self.rollbacks = 0
+
+    def close(self):
+        self.closed = 1
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.info.transaction_status = TRANSACCION_INACTIVA
+
+
+def crear():
+    return ConexionFalsa()
+
+
+def sana(conexion):
+    return True
+
+
+def nuevo_pool(**opciones):
+    valores = dict(tamano=2, espera=0.2, vida_maxima=60, inactividad_maxima=60, verificar_tras=60)
+    valores.update(opciones)
+    return PoolConexiones('pruebas', **valores)
+
+
+class PoolConexionesTestCase(SimpleTestCase):
+
+    def test_reutiliza_la_conexion_devuelta(self):
+        p = nuevo_pool()
+        conexion = p.obtener(crear, sana)
+        p.devolver(conexion)
+        self.assertIs(p.obtener(crear, sana), conexion)
+        metricas = p.metricas()
+        self.assertEqual((metricas['creadas'], metricas['reutilizadas'], metricas['en_uso']), (1, 1, 1))
+
+    def test_transaccion_a_medias_se_deshace_al_devolver(self):
+        p = nuevo_pool()
+        for estado in (TRANSACCION_ABIERTA, TRANSACCION_CON_ERROR):
+            conexion = p.obtener(crear, sana)
+            rollbacks = conexion.rollbacks
+            conexion.info.transaction_status = estado
+            p.devolver(conexion)
+            self.assertEqual(conexion.rollbacks, rollbacks + 1)
+            self.assertFalse(conexion.closed)
+            self.assertIs(p.obtener(crear, sana), conexion)
+            p.devolver(conexion)
+
+    def test_consulta_en_curso_o_cerrada_se_descarta(self):
+        p = nuevo_pool()
+        en_curso = p.obtener(crear, sana)
+        en_curso.info.transaction_status = CONSULTA_EN_CURSO
+        p.devolver(en_curso)
+        self.assertTrue(en_curso.closed)
+
+        cerrada = p.obtener(crear, sana)
+        self.assertIsNot(cerrada, en_curso)
+        cerrada.closed = 1
+        p.devolver(cerrada)
+        self.assertIsNot(p.obtener(crear, sana), cerrada)
+        self.assertEqual(p.metricas()['descartadas'], 2)
+
+    def test_agotado_tras_la_espera(self):
+        p = nuevo_pool(tamano=1, espera=0.2)
+        p.obtener(crear, sana)
+        inicio = time.monotonic()
+        with self.assertRaises(PoolAgotado):
+            p.obtener(crear, sana)
+        self.assertGreaterEqual(time.monotonic() - inicio, 0.2)
+        self.assertEqual(p.metricas()['agotado'], 1)
+
+    def test_espera_a_que_otro_hilo_devuelva(self):
+        p = nuevo_pool(tamano=1, espera=5)
+        conexion = p.obtener(crear, sana)
+        threading.Timer(0.05, p.devolver, args=(conexion,)).start()
+        self.assertIs(p.obtener(crear, sana), conexion)
+        self.assertEqual(p.metricas()['esperas'], 1)
+
+    def test_verificacion_fallida_abre_otra(self):
+        p = nuevo_pool(verificar_tras=0)
+        conexion = p.obtener(crear, sana)
+        p.devolver(conexion)
+        nueva = p.obtener(crear, lambda c: False)
+        self.assertIsNot(nueva, conexion)
+        self.assertTrue(conexion.closed)
+        self.assertEqual(p.metricas()['verificaciones_fallidas'], 1)
+
+    def test_inactividad_y_vida_maxima(self):
+        p = nuevo_pool(inactividad_maxima=0.05)
+        conexion = p.obtener(crear, sana)
+        p.devolver(conexion)
+        time.sleep(0.1)
+        self.assertIsNot(p.obtener(crear, sana), conexion)
+        self.assertTrue(conexion.closed)
+
+        p = nuevo_pool(vida_maxima=0.05)
+        conexion = p.obtener(crear, sana)
+        time.sleep(0.1)
+        p.devolver(conexion)
+        self.assertTrue(conexion.closed)
+
+    def test_conexion_ajena_no_se_toca(self):
+        p = nuevo_pool()
+        ajena = ConexionFalsa()
+        p.devolver(ajena)
+        self.assertFalse(ajena.closed)
+        self.assertIn(ajena, pool._heredadas)
+        pool._heredadas.remove(ajena)
+
+    def test_concurrencia_respeta_el_tamano(self):
+        p = nuevo_pool(tamano=3, espera=5)
+        en_uso = set()
+        maximo = [0]
+        errores = []
+        lock = threading.Lock()
+
+        def trabajo():
+            try:
+                for _ in range(50):
+                    conexion = p.obtener(crear, sana)
+                    with lock:
+                        if conexion in en_uso:
+                            errores.append('conexión entregada dos veces')
+                        en_uso.add(conexion)
+                        maximo[0] = max(maximo[0], len(en_uso))
+                    time.sleep(0.0005)
+                    with lock:
+                        en_uso.discard(conexion)
+                    p.devolver(conexion)
+            except Exception as e:
+                errores.append(e)
+
+        hilos = [threading.Thread(target=trabajo) for _ in range(8)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(errores, [])
+        metricas = p.metricas()
+        self.assertLessEqual(maximo[0], 3)
+        self.assertLessEqual(metricas['creadas'], 3)
+        self.assertEqual(metricas['creadas'] + metricas['reutilizadas'], 400)
+        self.assertEqual(metricas['en_uso'], 0)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'Requiere fork')
+    def test_el_hijo_de_un_fork_no_usa_las_conexiones_del_padre(self):
+        opciones = dict(tamano=2, espera=1, vida_maxima=60, inactividad_maxima=60, verificar_tras=60)
+        padre = pool.obtener_pool('pruebas_fork', **opciones)
+        conexion = padre.obtener(crear, sana)
+        padre.devolver(conexion)
+        try:
+            pid = os.fork()
+            if pid == 0:
+                hijo = pool.obtener_pool('pruebas_fork', **opciones)
+                nueva = hijo.obtener(crear, sana)
+                correcto = (
+                    hijo is not padre and nueva is not conexion
+                    and not conexion.closed and conexion in pool._heredadas
+                )
+                os._exit(0 if correcto else 1)
+            _, estado = os.waitpid(pid, 0)
+            self.assertEqual(os.waitstatus_to_exitcode(estado), 0)
+            self.assertIs(padre.obtener(crear, sana), conexion)
+        finally:
+            pool._pools.pop('pruebas_fork', None)
+
+
+def _configuracion_postgres():
+    valor = os.getenv('DB_POOL_PRUEBAS')
+    return json.loads(valor) if valor else None
+
+
+@unittest.skipUnless(_configuracion_postgres(), 'Definir DB_POOL_PRUEBAS para probar contra PostgreSQL')
+class PoolPostgresTestCase(SimpleTestCase):
+    """El backend ecoalerta.db_pool contra un PostgreSQL real"""
+    ALIAS = 'pool_pruebas'
+
+    def setUp(self):
+        from django.db import connections
+        from ecoalerta.db_pool.base import DatabaseWrapper
+
+        configuracion = {'ENGINE': 'ecoalerta.db_pool', **_configuracion_postgres()}
+        self.settings_dict = connections.configure_settings({self.ALIAS: configuracion})[self.ALIAS]
+        self.DatabaseWrapper = DatabaseWrapper
+        self.addCleanup(pool.cerrar_pools)
+
+    def wrapper(self):
+        return self.DatabaseWrapper(self.settings_dict, self.ALIAS)
+
+    def backend_pid(self, wrapper):
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            return cursor.fetchone()[0]
+
+    def test_entrega_y_devolucion(self):
+        wrapper = self.wrapper()
+        pid = self.backend_pid(wrapper)
+        wrapper.close()
+        # La siguiente "petición" usa la misma sesión del servidor
+        self.assertEqual(self.backend_pid(wrapper), pid)
+        wrapper.close()
+        metricas = pool.metricas()[self.ALIAS]
+        self.assertEqual((metricas['creadas'], metricas['reutilizadas'], metricas['en_uso']), (1, 1, 0))
+
+    def test_transaccion_a_medias_no_pasa_a_la_siguiente_peticion(self):
+        wrapper = self.wrapper()
+        wrapper.ensure_connection()
+        conexion = wrapper.connection
+        conexion.autocommit = False
+        with conexion.cursor() as cursor:
+            cursor.execute('CREATE TEMP TABLE pool_pruebas (x int)')
+        self.assertEqual(pool.estado_transaccion(conexion), TRANSACCION_ABIERTA)
+        wrapper.close()
+
+        self.assertIn(pool.estado_transaccion(conexion), (TRANSACCION_INACTIVA, None))
+        with wrapper.cursor() as cursor:
+            # La tabla temporal se deshizo con la transacción
+            cursor.execute("SELECT to_regclass('pg_temp.pool_pruebas')")
+            self.assertIsNone(cursor.fetchone()[0])
+        wrapper.close()
+
+    def test_conexion_cortada_por_el_servidor_se_reemplaza(self):
+        with self.settings(DB_POOL_VERIFICAR_TRAS=0):
+            wrapper = self.wrapper()
+            otro = self.wrapper()
+            pid = self.backend_pid(wrapper)
+            with otro.cursor() as cursor:
+                cursor.execute('SELECT pg_terminate_backend(%s)', [pid])
+            otro.close()
+            # La cortada queda primera en el pool: la verificación la descarta
+            wrapper.close()
+
+            self.assertNotEqual(self.backend_pid(wrapper), pid)
+            wrapper.close()
+        self.assertGreaterEqual(pool.metricas()[self.ALIAS]['verificaciones_fallidas'], 1)
+
+    def test_agotado_es_operational_error(self):
+        from django.db import OperationalError
+
+        with self.settings(DB_POOL_TAMANO=1, DB_POOL_ESPERA=0.2):
+            primero = self.wrapper()
+            primero.ensure_connection()
+            segundo = self.wrapper()
+            with self.assertRaises(OperationalError):
+                segundo.ensure_connection()
+            primero.close()
+            segundo.ensure_connection()
+            segundo.close()
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'Requiere fork')
+    def test_fork_no_comparte_la_sesion(self):
+        wrapper = self.wrapper()
+        pid_padre = self.backend_pid(wrapper)
+        wrapper.close()
+
+        pid = os.fork()
+        if pid == 0:
+            codigo = 1
+            try:
+                hijo = self.wrapper()
+                codigo = 0 if self.backend_pid(hijo) != pid_padre else 2
+                hijo.close()
+            finally:
+                os._exit(codigo)
+        _, estado = os.waitpid(pid, 0)
+        # 0: el hijo abrió su propia sesión
+        self.assertEqual(os.waitstatus_to_exitcode(estado), 0)
+
+        # La sesión del padre sigue viva después de que el hijo terminó
+        self.assertEqual(self.backend_pid(wrapper), pid_padre)
+        wrapper.close()
@@ -0,0 +1,93 @@
+"""
+Detección incremental de hotspots (reportes/hotspots.py): tras altas,
+reportes movidos, archivados y eliminados, la ejecución incremental debe dejar
+los mismos hotspots que una completa.
+"""
+import math
+import random
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from reportes import archivo
+from reportes.hotspots import DetectorHotspots
+from reportes.models import Hotspot, Reporte, UbicacionRetirada
+
+CENTRO = (-33.45, -70.65)
+GRADOS_POR_METRO = 1 / 111320.0
+
+
+def _detector():
+    return DetectorHotspots(eps_metros=150, min_reportes=5, ventana_dias=180)
+
+
+class HotspotsIncrementalTestCase(TestCase):
+
+    def setUp(self):
+        self.azar = random.Random(32)
+
+    def grupo(self, lat, lng, cantidad, radio_metros=50):
+        """Reportes repartidos en un círculo de `radio_metros`"""
+        reportes = []
+        for _ in range(cantidad):
+            angulo = self.azar.uniform(0, 2 * math.pi)
+            r = self.azar.uniform(0, radio_metros) * GRADOS_POR_METRO
+            reportes.append(Reporte.objects.create(
+                descripcion='Microbasural',
+                ubicacion_lat=lat + r * math.sin(angulo),
+                ubicacion_lng=lng + r * math.cos(angulo) / math.cos(math.radians(lat)),
+            ))
+        return reportes
+
+    @staticmethod
+    def hotspots():
+        return sorted(
+            (h.cantidad_reportes, h.reportes_abiertos, round(h.centro_lat, 9), round(h.centro_lng, 9), tuple(h.celdas))
+            for h in Hotspot.objects.all()
+        )
+
+    def test_incremental_coincide_con_completa(self):
+        lat, lng = CENTRO
+        separacion = 0.0035  # ~325 m en longitud: grupos sin vecinos en común
+        self.grupo(lat, lng, 8)  # A
+        self.grupo(lat, lng + separacion, 8)  # B
+        movidos = self.grupo(lat + 0.01, lng, 8)  # C
+        archivados = self.grupo(lat + 0.02, lng, 8)  # D
+        eliminados = self.grupo(lat + 0.03, lng, 10)  # E
+        self.grupo(lat + 0.05, lng + 0.05, 7)  # G: no se toca
+        _detector().ejecutar(completo=True)
+        self.assertEqual(Hotspot.objects.count(), 6)
+
+        # Altas: una cadena que une A y B, y un grupo nuevo F
+        for k in range(1, 9):
+            Reporte.objects.create(
+                descripcion='Microbasural', ubicacion_lat=lat, ubicacion_lng=lng + separacion * k / 9
+            )
+        self.grupo(lat + 0.04, lng, 6)
+        # C pierde sus núcleos: cinco reportes se mueven lejos y forman otro grupo
+        for reporte in movidos[:5]:
+            reporte = Reporte.objects.get(pk=reporte.pk)
+            reporte.ubicacion_lat += 0.06
+            reporte.save()
+        # D se archiva a medias y E pierde tres reportes
+        antiguo = timezone.now() - timedelta(days=400)
+        Reporte.objects.filter(pk__in=[r.pk for r in archivados[:4]]).update(
+            estado='cerrado', fecha_actualizacion=antiguo
+        )
+        self.assertEqual(archivo.archivar_lote(dias=180, lote=100), 4)
+        for reporte in eliminados[:3]:
+            reporte.delete()
+        self.assertEqual(UbicacionRetirada.objects.count(), 5 + 4 + 3)
+
+        resultado = _detector().ejecutar()
+        self.assertFalse(resultado['completa'])
+        incremental = self.hotspots()
+
+        _detector().ejecutar(completo=True)
+        self.assertEqual(incremental, self.hotspots())
+        # A+B, los movidos, E, F y G; C y D ya no llegan al mínimo
+        self.assertEqual(
+            sorted(h[0] for h in incremental), [5, 6, 7, 7, 8 + 8 + 8]
+        )
+        self.assertEqual(UbicacionRetirada.objects.count(), 0)
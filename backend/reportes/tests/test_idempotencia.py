@@ -0,0 +1,118 @@
+"""
+Idempotency-Key en POST /api/reportes/ (reportes/idempotencia.py) con
+peticiones concurrentes: cada hilo usa su propio cliente y conexión.
+"""
+import threading
+import time
+from unittest import mock
+
+from django.db import connections
+from django.test import Client, TransactionTestCase, override_settings
+
+from reportes import duplicados
+from reportes.models import CategoriaResiduo, ClaveIdempotencia, Reporte
+
+CONCURRENTES = 8
+
+
+class IdempotenciaConcurrenteTestCase(TransactionTestCase):
+
+    def setUp(self):
+        self.categoria = CategoriaResiduo.objects.create(nombre='Mixtos')
+        self.datos = {
+            'categoria': self.categoria.id, 'descripcion': 'Microbasural',
+            'lat': '-33.45', 'lng': '-70.66',
+        }
+
+    def _enviar_a_la_vez(self, clave, cantidad):
+        """Lanza `cantidad` POST con la misma clave; devuelve las respuestas"""
+        barrera = threading.Barrier(cantidad)
+        respuestas = [None] * cantidad
+        errores = []
+
+        def enviar(i):
+            try:
+                barrera.wait()
+                respuestas[i] = Client().post(
+                    '/api/reportes/', self.datos, headers={'Idempotency-Key': clave}
+                )
+            except Exception as e:
+                errores.append(e)
+            finally:
+                connections.close_all()
+
+        hilos = [threading.Thread(target=enviar, args=(i,)) for i in range(cantidad)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        self.assertEqual(errores, [])
+        return respuestas
+
+    def test_misma_clave_crea_un_solo_reporte(self):
+        respuestas = self._enviar_a_la_vez('envio-1', CONCURRENTES)
+
+        self.assertEqual(Reporte.objects.count(), 1)
+        self.assertEqual([r.status_code for r in respuestas], [201] * CONCURRENTES)
+        cuerpos = [r.json() for r in respuestas]
+        self.assertTrue(all(cuerpo == cuerpos[0] for cuerpo in cuerpos))
+        self.assertEqual(cuerpos[0]['codigo_seguimiento'], Reporte.objects.get().codigo_seguimiento)
+        repetidas = [r for r in respuestas if r.headers.get('Idempotent-Replayed') == 'true']
+        self.assertEqual(len(repetidas), CONCURRENTES - 1)
+
+        registro = ClaveIdempotencia.objects.get(clave='envio-1')
+        self.assertEqual(registro.estado, ClaveIdempotencia.COMPLETADA)
+
+    def test_claves_distintas_crean_reportes_distintos(self):
+        self._enviar_a_la_vez('envio-a', 1)
+        self._enviar_a_la_vez('envio-b', 1)
+        self.assertEqual(Reporte.objects.count(), 2)
+
+    @override_settings(IDEMPOTENCIA_ESPERA_SEGUNDOS=0.5)
+    def test_reintento_con_original_en_curso_recibe_409(self):
+        original = threading.Event()
+        liberar = threading.Event()
+        respuestas = {}
+
+        buscar_canonico = duplicados.buscar_canonico
+
+        def buscar_lento(*args):
+            # La petición original queda en curso hasta que el reintento responda
+            original.set()
+            liberar.wait(10)
+            return buscar_canonico(*args)
+
+        def enviar_original():
+            try:
+                respuestas['original'] = Client().post(
+                    '/api/reportes/', self.datos, headers={'Idempotency-Key': 'envio-lento'}
+                )
+            finally:
+                connections.close_all()
+
+        with mock.patch.object(duplicados, 'buscar_canonico', buscar_lento):
+            hilo = threading.Thread(target=enviar_original)
+            hilo.start()
+            try:
+                self.assertTrue(original.wait(10))
+                inicio = time.monotonic()
+                reintento = Client().post(
+                    '/api/reportes/', self.datos, headers={'Idempotency-Key': 'envio-lento'}
+                )
+                espera = time.monotonic() - inicio
+            finally:
+                liberar.set()
+                hilo.join()
+
+        self.assertEqual(reintento.status_code, 409)
+        self.assertEqual(reintento.headers['Retry-After'], '1')
+        self.assertGreaterEqual(espera, 0.5)
+        self.assertEqual(respuestas['original'].status_code, 201)
+        self.assertEqual(Reporte.objects.count(), 1)
+
+        # Terminada la original, el reintento recibe su respuesta
+        repetida = Client().post(
+            '/api/reportes/', self.datos, headers={'Idempotency-Key': 'envio-lento'}
+        )
+        self.assertEqual(repetida.status_code, 201)
+        self.assertEqual(repetida.json(), respuestas['original'].json())
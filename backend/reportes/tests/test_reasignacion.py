@@ -0,0 +1,70 @@
+"""
+`manage.py reasignar_reportes --todos` no deja a ningún inspector sobre su
+capacidad, contando los reportes que conservan su inspector.
+"""
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase
+
+from reportes.models import Reporte, Usuario, ZonaInspector
+
+CENTRO = (-33.45, -70.66)
+LEJOS = (-20.21, -70.15)  # Fuera del alcance de cualquier zona
+
+
+class ReasignarTodosTestCase(TestCase):
+
+    def inspector(self, nombre, capacidad):
+        usuario = Usuario.objects.create(username=nombre, tipo='inspector', capacidad=capacidad)
+        ZonaInspector.objects.create(
+            inspector=usuario, nombre=f'Zona {nombre}',
+            centro_lat=CENTRO[0], centro_lng=CENTRO[1], radio_metros=3000,
+        )
+        return usuario
+
+    def reporte(self, ubicacion=CENTRO, asignado_a=None):
+        lat, lng = ubicacion if ubicacion else (None, None)
+        return Reporte.objects.create(
+            descripcion='Microbasural', ubicacion_lat=lat, ubicacion_lng=lng, asignado_a=asignado_a
+        )
+
+    def reasignar(self):
+        call_command('reasignar_reportes', todos=True, stdout=StringIO())
+        cargas = dict(
+            Reporte.objects.filter(asignado_a__isnull=False)
+            .values_list('asignado_a_id').annotate(n=Count('id'))
+        )
+        for usuario in Usuario.objects.filter(tipo='inspector'):
+            self.assertLessEqual(cargas.get(usuario.id, 0), usuario.capacidad, usuario.username)
+        return cargas
+
+    def test_los_que_se_quedan_cuentan_en_la_carga(self):
+        a = self.inspector('a', capacidad=2)
+        b = self.inspector('b', capacidad=5)
+        # Sin ubicación o sin zona cercana: no se mueven
+        self.reporte(ubicacion=None, asignado_a=a)
+        self.reporte(ubicacion=None, asignado_a=a)
+        lejano = self.reporte(ubicacion=LEJOS, asignado_a=b)
+        for _ in range(3):
+            self.reporte()
+
+        cargas = self.reasignar()
+
+        self.assertEqual(cargas, {a.id: 2, b.id: 4})
+        lejano.refresh_from_db()
+        self.assertEqual(lejano.asignado_a_id, b.id)
+
+    def test_inspector_lleno_en_el_reparto_libera_el_reporte(self):
+        a = self.inspector('a', capacidad=1)
+        antiguo = self.reporte()
+        nuevo = self.reporte(asignado_a=a)
+
+        cargas = self.reasignar()
+
+        self.assertEqual(cargas, {a.id: 1})
+        antiguo.refresh_from_db()
+        nuevo.refresh_from_db()
+        self.assertEqual(antiguo.asignado_a_id, a.id)
+        self.assertIsNone(nuevo.asignado_a_id)
@@ -0,0 +1,85 @@
+"""
+Lecturas en réplica y fijación a la primaria (ecoalerta/db_router.py).
+
+La réplica de las pruebas tiene las tablas pero no los datos de la primaria:
+una lista vacía indica que la lectura fue a la réplica.
+"""
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.test import TestCase
+
+from ecoalerta import db_router
+from ecoalerta.middleware import ReplicaPinningMiddleware
+from reportes.models import CategoriaResiduo, Reporte
+
+REPLICA = 'replica_1'
+
+
+class ReplicaTestCase(TestCase):
+    databases = {'default', REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        # El router no migra las réplicas: se crean las tablas a mano
+        with connections[REPLICA].schema_editor() as editor:
+            for modelo in apps.get_models():
+                if modelo._meta.db_table not in connections[REPLICA].introspection.table_names():
+                    editor.create_model(modelo)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categoria = CategoriaResiduo.objects.create(nombre='Mixtos')
+        cls.reporte = Reporte.objects.create(
+            categoria=cls.categoria, descripcion='En la primaria',
+            ubicacion_lat=-33.45, ubicacion_lng=-70.66,
+        )
+
+    def test_lectura_marcada_va_a_la_replica(self):
+        respuesta = self.client.get('/api/reportes/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['count'], 0)
+        self.assertNotIn(ReplicaPinningMiddleware.COOKIE_NAME, respuesta.cookies)
+
+    def test_cookie_fija_las_lecturas_a_la_primaria(self):
+        self.client.cookies[ReplicaPinningMiddleware.COOKIE_NAME] = '1'
+        respuesta = self.client.get('/api/reportes/')
+        self.assertEqual(respuesta.json()['count'], 1)
+
+    def test_escritura_pone_la_cookie_y_escribe_en_la_primaria(self):
+        respuesta = self.client.post('/api/reportes/', {
+            'categoria': self.categoria.id, 'descripcion': 'Nuevo', 'lat': '-33.40', 'lng': '-70.60',
+        })
+        self.assertEqual(respuesta.status_code, 201)
+        cookie = respuesta.cookies[ReplicaPinningMiddleware.COOKIE_NAME]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_LAG_SECONDS)
+        self.assertEqual(Reporte.objects.using('default').count(), 2)
+        self.assertEqual(Reporte.objects.using(REPLICA).count(), 0)
+
+        # La misma sesión lee lo que escribió
+        self.assertEqual(self.client.get('/api/reportes/').json()['count'], 2)
+
+    def test_router(self):
+        router = db_router.ReplicaRouter()
+        # Fuera de una petición todo va a la primaria
+        self.assertEqual(router.db_for_read(Reporte), 'default')
+
+        estado, token = db_router.iniciar_peticion()
+        try:
+            self.assertEqual(router.db_for_read(Reporte), 'default')
+            db_router.marcar_lectura_en_replica()
+            self.assertEqual(router.db_for_read(Reporte), REPLICA)
+            self.assertEqual(router.db_for_write(Reporte), 'default')
+            # Después de escribir, la petición lee de la primaria
+            self.assertTrue(estado.escribio)
+            self.assertEqual(router.db_for_read(Reporte), 'default')
+        finally:
+            db_router.terminar_peticion(token)
+
+        _, token = db_router.iniciar_peticion(fijada_a_primaria=True)
+        try:
+            db_router.marcar_lectura_en_replica()
+            self.assertEqual(router.db_for_read(Reporte), 'default')
+        finally:
+            db_router.terminar_peticion(token)
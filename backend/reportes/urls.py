@@ -1,6 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ReporteViewSet, CategoriaResiduoViewSet, login_view, heatmap_view
+from .views import (
+    ReporteViewSet, CategoriaResiduoViewSet, login_view, heatmap_view, clusters_view, hotspots_view,
+    seguimiento_view, dashboard_view
+)
+from . import views_async
 
 router = DefaultRouter()
 router.register(r'reportes', ReporteViewSet, basename='reportes')
@@ -8,6 +12,15 @@ router.register(r'categorias', CategoriaResiduoViewSet, basename='categorias')
 
 urlpatterns = [
     path('auth/login/', login_view, name='login'),
+    path('dashboard/', dashboard_view, name='dashboard'),
     path('analytics/heatmap/', heatmap_view, name='heatmap'),
+    path('analytics/clusters/', clusters_view, name='clusters'),
+    path('analytics/hotspots/', hotspots_view, name='hotspots'),
+    path('seguimiento/<str:codigo>/', seguimiento_view, name='seguimiento'),
+    # Variantes async (servidas por el worker ASGI)
+    path('async/analytics/heatmap/', views_async.heatmap_async, name='heatmap-async'),
+    path('async/reportes/estadisticas/', views_async.estadisticas_async, name='estadisticas-async'),
+    path('async/categorias/', views_async.categorias_async, name='categorias-async'),
+    path('async/seguimiento/<str:codigo>/', views_async.seguimiento_async, name='seguimiento-async'),
     path('', include(router.urls)),
 ]
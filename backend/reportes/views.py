@@ -1,4 +1,7 @@
+from django.conf import settings
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
 from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
@@ -6,25 +9,42 @@ from rest_framework.permissions import AllowAny
 from django.contrib.auth import authenticate
 from django.db.models import Count, Q
 # NO usar GeoDjango - causa errores con GDAL en Azure
-from django.db import connection
+from django.db import connection, transaction
+from ecoalerta.db_router import LecturaEnReplicaMixin, lectura_en_replica
 
-from .models import Reporte, CategoriaResiduo, Usuario
+from . import asignacion, busqueda, clustering, comunas, consultas, dashboard, duplicados, prioridad, rutas
+from .idempotencia import idempotente
+from .authentication import generar_token
+from .models import Reporte, CategoriaResiduo, Usuario, Hotspot
+from .permissions import EsInspector
+from .consultas import parametros_heatmap
 from .serializers import (
     ReporteSerializer, 
     ReporteDetalleSerializer,
     CategoriaResiduoSerializer,
     LoginSerializer,
-    EstadisticasSerializer
+    EstadisticasSerializer,
+    HotspotSerializer
 )
 
 
-class ReporteViewSet(viewsets.ModelViewSet):
+class ReporteViewSet(LecturaEnReplicaMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestionar reportes de vertederos
     """
     queryset = Reporte.objects.all()
     serializer_class = ReporteSerializer
     permission_classes = [AllowAny]
+    acciones_replica = ('list', 'retrieve', 'estadisticas')
+    acciones_inspector = (
+        'update', 'partial_update', 'destroy', 'actualizar_estado',
+        'duplicados', 'fusionar', 'separar', 'siguientes', 'ruta',
+    )
+    
+    def get_permissions(self):
+        if self.action in self.acciones_inspector:
+            return [EsInspector()]
+        return super().get_permissions()
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -43,12 +63,22 @@ class ReporteViewSet(viewsets.ModelViewSet):
         if categoria_id:
             queryset = queryset.filter(categoria_id=categoria_id)
         
+        comuna = self.request.query_params.get('comuna')
+        if comuna:
+            queryset = queryset.filter(comuna=comuna)
+        
         codigo = self.request.query_params.get('codigo')
         if codigo:
             queryset = queryset.filter(codigo_seguimiento__icontains=codigo)
         
+        # Búsqueda de texto completo en código, dirección y descripción
+        q = self.request.query_params.get('q', '').strip()
+        if q:
+            return busqueda.buscar(queryset, q).order_by('-rango_busqueda', '-fecha_creacion')
+        
         return queryset.order_by('-fecha_creacion')
     
+    @idempotente
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
@@ -63,12 +93,40 @@ class ReporteViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        # Buscar un reporte abierto del mismo sitio (posible duplicado)
+        categoria = serializer.validated_data.get('categoria')
+        try:
+            canonico_id = duplicados.buscar_canonico(
+                categoria.id if categoria else None, float(lat), float(lng)
+            )
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'lat y lng deben ser numéricos'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Asignar inspector: el del reporte original si es duplicado, o el
+        # que corresponda por zona y carga
+        asignado_a_id = None
+        if canonico_id:
+            asignado_a_id = Reporte.objects.filter(pk=canonico_id).values_list('asignado_a_id', flat=True).first()
+        elif settings.ASIGNACION_AUTOMATICA:
+            asignado_a_id = asignacion.elegir_inspector(float(lat), float(lng))
+        
         # Crear el objeto con la ubicación geográfica
-        reporte = serializer.save()
+        with transaction.atomic():
+            reporte = serializer.save(
+                duplicado_de_id=canonico_id,
+                asignado_a_id=asignado_a_id,
+                comuna=comunas.comuna_de(float(lat), float(lng)),
+            )
+            if canonico_id:
+                duplicados.registrar_duplicado(canonico_id)
         
         return Response({
             'codigo_seguimiento': reporte.codigo_seguimiento,
-            'mensaje': 'Reporte creado exitosamente'
+            'mensaje': 'Reporte creado exitosamente',
+            'posible_duplicado': canonico_id is not None
         }, status=status.HTTP_201_CREATED)
     
     @action(detail=True, methods=['patch'])
@@ -88,31 +146,137 @@ class ReporteViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(reporte)
         return Response(serializer.data)
     
+    @action(detail=True, methods=['get'])
+    def duplicados(self, request, pk=None):
+        """Reportes vinculados como duplicados de este reporte"""
+        reporte = self.get_object()
+        queryset = reporte.duplicados.select_related('categoria', 'asignado_a').order_by('fecha_creacion')
+        serializer = ReporteSerializer(queryset, many=True, context={'request': request})
+        return Response(serializer.data)
+    
+    @action(detail=True, methods=['post'])
+    def fusionar(self, request, pk=None):
+        """Fusionar otros reportes en este (quedan como duplicados cerrados)"""
+        reporte = self.get_object()
+        ids = request.data.get('reportes')
+        if not isinstance(ids, list) or not ids:
+            return Response(
+                {'error': 'Debe proporcionar una lista de ids en "reportes"'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            ids = [int(i) for i in ids]
+        except (TypeError, ValueError):
+            return Response({'error': 'Los ids deben ser enteros'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        fusionados = duplicados.fusionar(reporte, ids, usuario=request.user)
+        reporte.refresh_from_db()
+        
+        return Response({
+            'fusionados': fusionados,
+            'reporte': self.get_serializer(reporte).data
+        })
+    
+    @action(detail=True, methods=['post'])
+    def separar(self, request, pk=None):
+        """Quitar el vínculo de duplicado (falso positivo)"""
+        reporte = self.get_object()
+        if not duplicados.separar(reporte):
+            return Response(
+                {'error': 'El reporte no está marcado como duplicado'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(self.get_serializer(reporte).data)
+    
+    @action(detail=False, methods=['get'])
+    def siguientes(self, request):
+        """
+        Próximos reportes a inspeccionar: los abiertos de mayor prioridad.
+        Parámetros opcionales: n (default 20, máximo 100), asignados=mios,
+        comuna y categoria.
+        """
+        try:
+            n = min(max(int(request.query_params.get('n', 20)), 1), 100)
+            categoria_id = int(request.query_params['categoria']) if request.query_params.get('categoria') else None
+        except ValueError:
+            return Response({'error': 'n y categoria deben ser enteros'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Se recorre reporte_cola_idx de mayor a menor prioridad hasta juntar n
+        queryset = prioridad.cola().select_related('categoria', 'asignado_a')
+        if request.query_params.get('asignados') == 'mios':
+            queryset = queryset.filter(asignado_a=request.user)
+        if categoria_id is not None:
+            queryset = queryset.filter(categoria_id=categoria_id)
+        comuna = request.query_params.get('comuna')
+        if comuna:
+            queryset = queryset.filter(comuna=comuna)
+        
+        serializer = ReporteSerializer(
+            queryset.order_by('-prioridad', 'id')[:n], many=True, context={'request': request}
+        )
+        return Response({
+            'data': serializer.data,
+            'total': len(serializer.data)
+        })
+    
+    @action(detail=False, methods=['get'])
+    def ruta(self, request):
+        """
+        Orden de visita de los reportes abiertos asignados, con la distancia total.
+        Parámetros: lat y lng del punto de partida (por defecto el centro de la
+        primera zona activa del inspector), volver=1 para regresar al punto de
+        partida e inspector=<id> (solo staff; por defecto el usuario autenticado).
+        """
+        params = request.query_params
+        try:
+            inicio = None
+            if params.get('lat') or params.get('lng'):
+                inicio = (float(params['lat']), float(params['lng']))
+            inspector_id = int(params.get('inspector') or request.user.pk)
+        except (KeyError, ValueError):
+            return Response(
+                {'error': 'lat y lng deben ser numéricos (ambos) e inspector un id'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if inspector_id != request.user.pk and not request.user.is_staff:
+            return Response(
+                {'error': 'Solo el staff puede ver la ruta de otro inspector'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        try:
+            data = rutas.ruta_inspector(inspector_id, inicio, volver=params.get('volver') in ('1', 'true'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
+    
     @action(detail=False, methods=['get'])
     def estadisticas(self, request):
-        """Obtener estadísticas de reportes"""
-        total = Reporte.objects.count()
-        nuevos = Reporte.objects.filter(estado='nuevo').count()
-        en_proceso = Reporte.objects.filter(estado='proceso').count()
-        resueltos = Reporte.objects.filter(estado='resuelto').count()
-        
-        data = {
-            'total': total,
-            'nuevos': nuevos,
-            'en_proceso': en_proceso,
-            'resueltos': resueltos
-        }
+        """Obtener estadísticas de reportes (?por=comuna para desglosar)"""
+        if request.query_params.get('por') == 'comuna':
+            return Response(consultas.estadisticas_por_comuna())
+        
+        # Incluye los reportes archivados (conteo mantenido al archivar)
+        data = consultas.estadisticas()
         
         return Response(data)
 
 
-class CategoriaResiduoViewSet(viewsets.ReadOnlyModelViewSet):
+class CategoriaResiduoViewSet(LecturaEnReplicaMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet para categorías de residuos (solo lectura)
     """
     queryset = CategoriaResiduo.objects.all()
     serializer_class = CategoriaResiduoSerializer
     permission_classes = [AllowAny]
+    
+    def list(self, request, *args, **kwargs):
+        # Pocas filas que casi nunca cambian: se sirven desde el cache
+        categorias = consultas.categorias()
+        page = self.paginate_queryset(categorias)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(categorias)
 
 
 @api_view(['POST', 'GET'])
@@ -144,6 +308,8 @@ def login_view(request):
             if user.tipo == 'inspector' or user.is_staff:
                 return Response({
                     'success': True,
+                    'token': generar_token(user),
+                    'expira_en': settings.AUTH_TOKEN_MAX_AGE,
                     'user': {
                         'id': user.id,
                         'username': user.username,
@@ -164,71 +330,147 @@ def login_view(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@lectura_en_replica
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def heatmap_view(request):
     """
     Endpoint para obtener datos de densidad de reportes para el mapa de calor.
     Versión simplificada sin PostGIS - agrupa reportes por cuadrícula aproximada.
+    Parámetros opcionales: radio, min_densidad, estado, categoria, comuna y
+    bbox=min_lng,min_lat,max_lng,max_lat.
     """
-    # Parámetros opcionales
-    radio = float(request.query_params.get('radio', 0.01))  # Radio en grados (~1km)
-    min_densidad = int(request.query_params.get('min_densidad', 1))
-    
-    # Aplicar filtros opcionales
-    estado = request.query_params.get('estado')
-    categoria_id = request.query_params.get('categoria')
-    
-    # Query simplificada sin PostGIS - agrupar por cuadrícula aproximada
-    queryset = Reporte.objects.filter(
-        ubicacion_lat__isnull=False,
-        ubicacion_lng__isnull=False
-    )
+    try:
+        params = parametros_heatmap(request.query_params)
+    except ValueError:
+        return Response(
+            {'error': 'Parámetros inválidos: radio y bbox deben ser numéricos, min_densidad entero'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
-    if estado:
-        queryset = queryset.filter(estado=estado)
-    if categoria_id:
-        queryset = queryset.filter(categoria_id=categoria_id)
-    
-    # Agrupar manualmente por cuadrícula (aproximación)
-    grid_size = radio * 2
-    heatmap_dict = {}
-    
-    for reporte in queryset:
-        if reporte.ubicacion_lat and reporte.ubicacion_lng:
-            # Redondear a la cuadrícula
-            grid_lat = round(reporte.ubicacion_lat / grid_size) * grid_size
-            grid_lng = round(reporte.ubicacion_lng / grid_size) * grid_size
-            key = (grid_lat, grid_lng)
-            
-            if key not in heatmap_dict:
-                heatmap_dict[key] = {
-                    'lat': grid_lat,
-                    'lng': grid_lng,
-                    'densidad': 0
-                }
-            heatmap_dict[key]['densidad'] += 1
-    
-    # Filtrar por densidad mínima y formatear
-    heatmap_data = [
-        {
-            'lat': item['lat'],
-            'lng': item['lng'],
-            'intensity': item['densidad'],
-            'densidad': item['densidad']
-        }
-        for item in heatmap_dict.values()
-        if item['densidad'] >= min_densidad
-    ]
+    return Response(consultas.heatmap(params))
+
+
+@lectura_en_replica
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def dashboard_view(request):
+    """
+    Datos iniciales del dashboard en una sola petición.
+    Parámetros: secciones=reportes,estadisticas,categorias,heatmap (por defecto
+    todas menos heatmap), etags=seccion:etag,... con los ETags que el cliente ya
+    tiene, y los filtros de /api/reportes/ y del heatmap (estado, categoria, ...).
+    Con If-None-Match y la respuesta completa sin cambios devuelve 304.
+    """
+    try:
+        secciones = dashboard.secciones_pedidas(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    cuerpo = dashboard.construir(request, secciones, dashboard.etags_conocidos(request.query_params))
+    etag = dashboard.etag_http(cuerpo)
+    # Si nada cambió desde el ETag que trae el cliente: 304 sin cuerpo
+    respuesta = get_conditional_response(request, etag=etag)
+    if respuesta is None:
+        respuesta = HttpResponse(cuerpo, content_type='application/json')
+    respuesta['ETag'] = etag
+    # Guardable, pero siempre se revalida
+    respuesta['Cache-Control'] = 'no-cache'
+    return respuesta
+
+
+@lectura_en_replica
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def clusters_view(request):
+    """
+    Clusters de reportes para el mapa del dashboard.
+    Parámetros: zoom (0-18) y bbox=min_lng,min_lat,max_lng,max_lat; estado opcional.
+    Desde zoom 16 (con bbox obligatorio) devuelve reportes individuales, salvo
+    que pasen de CLUSTER_MAX_PUNTOS.
+    """
+    try:
+        zoom = int(request.query_params.get('zoom', 12))
+        bbox = request.query_params.get('bbox', '-180,-85,180,85')
+        min_lng, min_lat, max_lng, max_lat = [float(v) for v in bbox.split(',')]
+    except ValueError:
+        return Response(
+            {'error': 'zoom debe ser entero y bbox debe ser min_lng,min_lat,max_lng,max_lat'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if zoom >= clustering.ZOOM_PUNTOS and 'bbox' not in request.query_params:
+        return Response(
+            {'error': f'bbox es obligatorio desde zoom {clustering.ZOOM_PUNTOS}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
-    # Ordenar por densidad
-    heatmap_data.sort(key=lambda x: x['densidad'], reverse=True)
+    estado = request.query_params.get('estado') or None
+    if estado and estado not in clustering.ESTADOS:
+        return Response({'error': f'Estado inválido: {estado}'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    indice = clustering.obtener_indice()
+    data = indice.consultar(zoom, (min_lng, min_lat, max_lng, max_lat), estado)
     
     return Response({
-        'data': heatmap_data,
-        'total_points': len(heatmap_data),
+        'data': data,
+        'total': len(data),
         'params': {
-            'radio': radio,
-            'min_densidad': min_densidad
+            'zoom': zoom,
+            'bbox': [min_lng, min_lat, max_lng, max_lat],
+            'estado': estado,
+            'puntos_individuales': zoom >= clustering.ZOOM_PUNTOS and all(d['tipo'] == 'punto' for d in data)
         }
     })
+
+
+@lectura_en_replica
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def seguimiento_view(request, codigo):
+    """Estado de un reporte a partir de su código de seguimiento (activo o archivado)"""
+    data = consultas.seguimiento(codigo)
+    if data is None:
+        return Response({'error': 'Reporte no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(data)
+
+
+@lectura_en_replica
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def hotspots_view(request):
+    """
+    Hotspots detectados por `manage.py detectar_hotspots`.
+    Parámetros opcionales: bbox=min_lng,min_lat,max_lng,max_lat, min_reportes, limite.
+    """
+    queryset = Hotspot.objects.all()
+    
+    try:
+        min_reportes = int(request.query_params.get('min_reportes', 0))
+        limite = max(1, min(int(request.query_params.get('limite', 200)), 1000))
+        bbox = request.query_params.get('bbox')
+        if bbox:
+            min_lng, min_lat, max_lng, max_lat = [float(v) for v in bbox.split(',')]
+            queryset = queryset.filter(
+                centro_lat__gte=min_lat, centro_lat__lte=max_lat,
+                centro_lng__gte=min_lng, centro_lng__lte=max_lng
+            )
+    except ValueError:
+        return Response(
+            {'error': 'Parámetros inválidos: bbox=min_lng,min_lat,max_lng,max_lat, min_reportes y limite enteros'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if min_reportes:
+        queryset = queryset.filter(cantidad_reportes__gte=min_reportes)
+    
+    nombres = {str(c.id): c.nombre for c in CategoriaResiduo.objects.all()}
+    serializer = HotspotSerializer(
+        queryset.order_by('-cantidad_reportes')[:limite],
+        many=True,
+        context={'nombres_categorias': nombres}
+    )
+    
+    return Response({
+        'data': serializer.data,
+        'total': len(serializer.data)
+    })
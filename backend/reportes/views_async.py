@@ -0,0 +1,70 @@
+"""
+Variantes asíncronas de los endpoints de lectura más usados.
+
+Bajo un worker ASGI (gunicorn + UvicornWorker) una petición que espera a la
+base de datos no bloquea el worker completo, por lo que un solo proceso atiende
+muchas peticiones concurrentes. Devuelven el mismo JSON que sus equivalentes DRF.
+"""
+import functools
+
+from django.http import HttpResponseNotAllowed, JsonResponse
+
+from ecoalerta.db_router import lectura_en_replica
+
+from . import consultas
+from .consultas import parametros_heatmap
+
+
+def solo_get(view_func):
+    """Equivalente async de require_GET (compatible con Django 4.2)"""
+    @functools.wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return HttpResponseNotAllowed(['GET'])
+        return await view_func(request, *args, **kwargs)
+    return wrapper
+
+
+@lectura_en_replica
+@solo_get
+async def heatmap_async(request):
+    """Mapa de calor (equivalente a /api/analytics/heatmap/)"""
+    try:
+        params = parametros_heatmap(request.GET)
+    except ValueError:
+        return JsonResponse(
+            {'error': 'Parámetros inválidos: radio y bbox deben ser numéricos, min_densidad entero'},
+            status=400
+        )
+    return JsonResponse(await consultas.heatmap_async(params))
+
+
+@lectura_en_replica
+@solo_get
+async def estadisticas_async(request):
+    """Estadísticas (equivalente a /api/reportes/estadisticas/)"""
+    data = await consultas.estadisticas_async()
+    return JsonResponse(data)
+
+
+@lectura_en_replica
+@solo_get
+async def categorias_async(request):
+    """Categorías (equivalente a /api/categorias/, sin paginar)"""
+    categorias = await consultas.categorias_async()
+    return JsonResponse({
+        'count': len(categorias),
+        'next': None,
+        'previous': None,
+        'results': categorias
+    })
+
+
+@lectura_en_replica
+@solo_get
+async def seguimiento_async(request, codigo):
+    """Estado de un reporte a partir de su código de seguimiento (activo o archivado)"""
+    data = await consultas.seguimiento_async(codigo)
+    if data is None:
+        return JsonResponse({'error': 'Reporte no encontrado'}, status=404)
+    return JsonResponse(data)
@@ -13,13 +13,10 @@ cd /home/site/wwwroot || {
 echo "Directorio: $(pwd)"
 echo "Contenido: $(ls -la | head -10)"
 
-# Instalar dependencias del sistema
-echo "Instalando dependencias del sistema..."
-apt-get update -qq 2>&1 | head -5
-
-# Instalar libpq-dev para PostgreSQL
+# Instalar libpq-dev para PostgreSQL (apt-get solo si falta, no en cada arranque)
 if ! dpkg -l | grep -q "^ii.*libpq-dev"; then
     echo "Instalando libpq-dev..."
+    apt-get update -qq 2>&1 | head -5
     apt-get install -y -qq libpq-dev 2>&1 | head -5 || echo "⚠️ No se pudo instalar libpq-dev (continuando)"
 fi
 
@@ -77,11 +74,16 @@ except Exception as e:
     echo "⚠️ ADVERTENCIA: Problema al verificar Django (continuando)"
 }
 
-# Ejecutar migraciones (continuar aunque falle)
-echo "Ejecutando migraciones..."
-python manage.py migrate --noinput 2>&1 | tail -10 || {
-    echo "⚠️ ADVERTENCIA: Error en migraciones (continuando)"
-}
+# Ejecutar migraciones solo si hay pendientes (continuar aunque falle)
+if python manage.py migrate --check > /dev/null 2>&1; then
+    echo "Migraciones al día"
+else
+    echo "Ejecutando migraciones..."
+    # Sin statement_timeout: crear índices sobre tablas grandes puede tardar
+    DB_STATEMENT_TIMEOUT_MS=0 python manage.py migrate --noinput 2>&1 | tail -10 || {
+        echo "⚠️ ADVERTENCIA: Error en migraciones (continuando)"
+    }
+fi
 
 # Recopilar archivos estáticos (continuar aunque falle)
 echo "Recopilando archivos estáticos..."
@@ -100,10 +102,22 @@ echo "=== INICIANDO GUNICORN ==="
 # Azure App Service usa la variable de entorno PORT
 PORT="${PORT:-8000}"
 echo "Usando puerto: $PORT"
-echo "Comando: gunicorn ecoalerta.wsgi:application --bind 0.0.0.0:$PORT --workers 2"
-exec gunicorn ecoalerta.wsgi:application \
+# ASGI_WORKERS=1 sirve la app por ASGI (UvicornWorker): las vistas async de
+# /api/async/ atienden muchas peticiones concurrentes por worker
+if [ "${ASGI_WORKERS:-0}" = "1" ]; then
+    APP_MODULE="ecoalerta.asgi:application"
+    WORKER_ARGS="--worker-class uvicorn.workers.UvicornWorker"
+else
+    APP_MODULE="ecoalerta.wsgi:application"
+    WORKER_ARGS=""
+fi
+# gunicorn.conf.py: precarga la app y calienta cada worker (ver /api/health/)
+echo "Comando: gunicorn $APP_MODULE -c gunicorn.conf.py --bind 0.0.0.0:$PORT --workers 2 $WORKER_ARGS"
+exec gunicorn $APP_MODULE \
+    -c gunicorn.conf.py \
     --bind 0.0.0.0:$PORT \
     --workers 2 \
+    $WORKER_ARGS \
     --timeout 120 \
     --access-logfile - \
     --error-logfile - \
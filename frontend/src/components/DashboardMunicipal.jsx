@@ -1,5 +1,5 @@
 import { useState, useEffect, useRef } from 'react'
-import { MapContainer, TileLayer, Marker, Popup, useMap } from 'react-leaflet'
+import { MapContainer, TileLayer, Marker, Popup, useMap, useMapEvents } from 'react-leaflet'
 import 'leaflet/dist/leaflet.css'
 import './DashboardMunicipal.css'
 import { API_ENDPOINTS } from '../config'
@@ -243,6 +243,86 @@ function HeatmapLayer({ data, enabled }) {
   return null
 }
 
+// Icono de cluster con la cantidad de reportes
+const clusterIcon = (cantidad) => L.divIcon({
+  html: `<div><span>${cantidad}</span></div>`,
+  className: 'marker-cluster',
+  iconSize: L.point(40, 40),
+})
+
+// Componente que pide al backend los clusters del área visible
+function ClusterLayer({ filtroEstado, onVerDetalle }) {
+  const [items, setItems] = useState([])
+  const map = useMapEvents({
+    moveend: () => fetchClusters(),
+  })
+
+  const fetchClusters = async () => {
+    const bounds = map.getBounds()
+    const params = new URLSearchParams({
+      zoom: map.getZoom(),
+      bbox: [bounds.getWest(), bounds.getSouth(), bounds.getEast(), bounds.getNorth()].join(','),
+    })
+    if (filtroEstado) {
+      params.append('estado', filtroEstado)
+    }
+    try {
+      const response = await fetch(`${API_ENDPOINTS.CLUSTERS}?${params.toString()}`, { credentials: 'include' })
+      const data = await response.json()
+      setItems(data.data || [])
+    } catch (error) {
+      console.error('Error al cargar clusters:', error)
+    }
+  }
+
+  useEffect(() => {
+    fetchClusters()
+  }, [filtroEstado])
+
+  const handleDetalle = async (id) => {
+    try {
+      const response = await fetch(`${API_ENDPOINTS.REPORTES}${id}/`, { credentials: 'include' })
+      onVerDetalle(await response.json())
+    } catch (error) {
+      console.error('Error al cargar reporte:', error)
+    }
+  }
+
+  return items.map((item, index) => item.tipo === 'cluster' ? (
+    <Marker
+      key={`c-${index}-${item.lat}-${item.lng}`}
+      position={[item.lat, item.lng]}
+      icon={clusterIcon(item.cantidad)}
+      eventHandlers={{
+        click: () => map.setView([item.lat, item.lng], Math.min(map.getZoom() + 2, 18)),
+      }}
+    />
+  ) : (
+    <Marker key={item.id} position={[item.lat, item.lng]}>
+      <Popup>
+        <div>
+          <b>Reporte #{item.id}</b><br/>
+          <small>Estado: {item.estado}</small><br/>
+          <button
+            onClick={() => handleDetalle(item.id)}
+            style={{
+              marginTop: '5px',
+              padding: '5px 10px',
+              background: '#228B22',
+              color: 'white',
+              border: 'none',
+              borderRadius: '4px',
+              cursor: 'pointer'
+            }}
+          >
+            Ver Detalle
+          </button>
+        </div>
+      </Popup>
+    </Marker>
+  ))
+}
+
 function DashboardMunicipal() {
   const [vistaActual, setVistaActual] = useState('mapa')
   const [reporteSeleccionado, setReporteSeleccionado] = useState(null)
@@ -260,13 +340,15 @@ function DashboardMunicipal() {
   const [heatmapData, setHeatmapData] = useState([])
   const [loadingHeatmap, setLoadingHeatmap] = useState(false)
 
-  // Cargar reportes y estadísticas
+  // ETags por sección de /api/dashboard/: lo que no cambió no se vuelve a descargar
+  const etagsRef = useRef({})
+
+  // Cargar reportes, estadísticas (y heatmap si está activo) en una sola petición
   useEffect(() => {
-    fetchReportes()
-    fetchEstadisticas()
+    fetchDashboard()
   }, [filtroEstado])
 
-  // Cargar datos del heatmap cuando se activa
+  // Cargar datos del heatmap cuando se activa (los cambios de filtro los trae fetchDashboard)
   useEffect(() => {
     if (heatmapEnabled && vistaActual === 'mapa') {
       console.log('Heatmap enabled, fetching data...')
@@ -275,7 +357,7 @@ function DashboardMunicipal() {
       // Limpiar datos cuando se desactiva
       setHeatmapData([])
     }
-  }, [heatmapEnabled, filtroEstado, vistaActual])
+  }, [heatmapEnabled, vistaActual])
 
   // Handler para cuando se cambia el checkbox
   const handleHeatmapToggle = (checked) => {
@@ -339,30 +421,51 @@ function DashboardMunicipal() {
     }
   }
 
-  const fetchReportes = async () => {
+  const fetchDashboard = async () => {
     setLoading(true)
     try {
-      const url = filtroEstado ? `${API_ENDPOINTS.REPORTES}?estado=${filtroEstado}` : API_ENDPOINTS.REPORTES
-      const response = await fetch(url)
+      const secciones = ['reportes', 'estadisticas']
+      if (heatmapEnabled && vistaActual === 'mapa') {
+        secciones.push('heatmap')
+      }
+      const params = new URLSearchParams({ secciones: secciones.join(',') })
+      if (filtroEstado) {
+        params.append('estado', filtroEstado)
+      }
+      const etags = Object.entries(etagsRef.current).map(([seccion, etag]) => `${seccion}:${etag}`)
+      if (etags.length > 0) {
+        params.append('etags', etags.join(','))
+      }
+
+      // credentials: la cookie de lectura-tras-escritura mantiene los datos frescos
+      const response = await fetch(`${API_ENDPOINTS.DASHBOARD}?${params.toString()}`, { credentials: 'include' })
       const data = await response.json()
-      setReportes(Array.isArray(data) ? data : data.results || [])
+
+      for (const [seccion, contenido] of Object.entries(data)) {
+        if (contenido.error) {
+          console.error(`Error al cargar ${seccion}:`, contenido.error)
+          delete etagsRef.current[seccion]
+          continue
+        }
+        etagsRef.current[seccion] = contenido.etag
+        if (contenido.sin_cambios) {
+          continue
+        }
+        if (seccion === 'reportes') {
+          setReportes(contenido.data.results || [])
+        } else if (seccion === 'estadisticas') {
+          setEstadisticas(contenido.data)
+        } else if (seccion === 'heatmap') {
+          setHeatmapData(contenido.data.data || [])
+        }
+      }
     } catch (error) {
-      console.error('Error al cargar reportes:', error)
+      console.error('Error al cargar el dashboard:', error)
     } finally {
       setLoading(false)
     }
   }
 
-  const fetchEstadisticas = async () => {
-    try {
-      const response = await fetch(API_ENDPOINTS.ESTADISTICAS)
-      const data = await response.json()
-      setEstadisticas(data)
-    } catch (error) {
-      console.error('Error al cargar estadísticas:', error)
-    }
-  }
-
   const handleVerDetalle = (reporte) => {
     console.log('handleVerDetalle llamado con:', reporte)
     setReporteSeleccionado(reporte)
@@ -379,8 +482,10 @@ function DashboardMunicipal() {
     try {
       const response = await fetch(`${API_ENDPOINTS.REPORTES}${reporteSeleccionado.id}/actualizar_estado/`, {
         method: 'PATCH',
+        credentials: 'include',
         headers: {
           'Content-Type': 'application/json',
+          'Authorization': `Bearer ${localStorage.getItem('token')}`,
         },
         body: JSON.stringify({
           estado: nuevoEstado,
@@ -388,9 +493,14 @@ function DashboardMunicipal() {
         })
       })
 
+      if (response.status === 401 || response.status === 403) {
+        alert('Sesión expirada. Vuelve a iniciar sesión.')
+        window.location.href = '/login'
+        return
+      }
+
       if (response.ok) {
-        fetchReportes()
-        fetchEstadisticas()
+        fetchDashboard()
         setShowModal(false)
         alert('Cambios guardados exitosamente')
       }
@@ -532,37 +642,10 @@ function DashboardMunicipal() {
                   />
                   {/* Capa de Heatmap */}
                   <HeatmapLayer data={heatmapData} enabled={heatmapEnabled} />
-                  {/* Marcadores de reportes - siempre visibles cuando el mapa de calor está desactivado */}
-                  {!heatmapEnabled && reportes
-                    .filter(reporte => reporte.lat && reporte.lng)
-                    .map(reporte => (
-                    <Marker 
-                      key={reporte.id || reporte.codigo_seguimiento} 
-                      position={[reporte.lat, reporte.lng]}
-                    >
-                      <Popup>
-                        <div>
-                          <b>{reporte.codigo_seguimiento}</b><br/>
-                          {reporte.categoria_nombre}<br/>
-                          <small>{reporte.direccion || 'Sin dirección'}</small><br/>
-                          <button 
-                            onClick={() => handleVerDetalle(reporte)}
-                            style={{
-                              marginTop: '5px',
-                              padding: '5px 10px',
-                              background: '#228B22',
-                              color: 'white',
-                              border: 'none',
-                              borderRadius: '4px',
-                              cursor: 'pointer'
-                            }}
-                          >
-                            Ver Detalle
-                          </button>
-                        </div>
-                      </Popup>
-                    </Marker>
-                  ))}
+                  {/* Clusters de reportes (calculados en el backend) - visibles cuando el mapa de calor está desactivado */}
+                  {!heatmapEnabled && (
+                    <ClusterLayer filtroEstado={filtroEstado} onVerDetalle={handleVerDetalle} />
+                  )}
                 </MapContainer>
               )}
             </div>
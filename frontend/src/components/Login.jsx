@@ -46,6 +46,8 @@ function Login() {
       if (data.success) {
         // Guardar datos del usuario en localStorage
         localStorage.setItem('user', JSON.stringify(data.user))
+        // Token firmado para las acciones de inspector (Authorization: Bearer)
+        localStorage.setItem('token', data.token)
         console.log('Usuario guardado, navegando a dashboard...')
         navigate('/dashboard')
       } else {
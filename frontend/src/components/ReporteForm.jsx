@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { useNavigate } from 'react-router-dom'
 import { MapContainer, TileLayer, Marker, useMapEvents } from 'react-leaflet'
 import 'leaflet/dist/leaflet.css'
@@ -36,6 +36,8 @@ function ReporteForm() {
   const [codigoSeguimiento, setCodigoSeguimiento] = useState('')
   const [loading, setLoading] = useState(false)
   const [categorias, setCategorias] = useState([])
+  // Misma clave en los reintentos de un envío: el backend no crea el reporte dos veces
+  const idempotencyKeyRef = useRef(null)
 
   const handleLocationSelect = (latlng) => {
     setUbicacion(latlng)
@@ -92,14 +94,20 @@ function ReporteForm() {
       formData.append('lat', ubicacion.lat)
       formData.append('lng', ubicacion.lng)
 
+      if (!idempotencyKeyRef.current) {
+        idempotencyKeyRef.current = crypto.randomUUID()
+      }
+
       const response = await fetch(API_ENDPOINTS.REPORTES, {
         method: 'POST',
+        headers: { 'Idempotency-Key': idempotencyKeyRef.current },
         body: formData
       })
 
       const data = await response.json()
 
       if (data.codigo_seguimiento) {
+        idempotencyKeyRef.current = null
         setCodigoSeguimiento(data.codigo_seguimiento)
         setShowModal(true)
       } else {
@@ -11,5 +11,7 @@ export const API_ENDPOINTS = {
   REPORTES: `${API_URL}/api/reportes/`,
   CATEGORIAS: `${API_URL}/api/categorias/`,
   ESTADISTICAS: `${API_URL}/api/reportes/estadisticas/`,
+  DASHBOARD: `${API_URL}/api/dashboard/`,
   HEATMAP: `${API_URL}/api/analytics/heatmap/`,
+  CLUSTERS: `${API_URL}/api/analytics/clusters/`,
 };